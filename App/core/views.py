@@ -8,8 +8,8 @@ from datetime import date
 import csv
 from io import TextIOWrapper
 from ml_utils.data_prep import parse_planning_file, load_datasets, prepare_resources, prepare_teachers
+from ml_utils.model_registry import default_registry
 from ml_utils.dbscan_analyzer import (
-    load_dbscan_model,
     prepare_analysis_features,
     predict_cluster,
     generate_analysis_explanation
@@ -363,8 +363,8 @@ def api_analyze(request):
     return JsonResponse({"success": False, "error": f"Invalid JSON: {str(e)}"}, status=400)
   
   try:
-    # Load model
-    dbscan_model = load_dbscan_model()
+    # Shared model instance (loaded once, reloaded when the artifact changes)
+    dbscan_model = default_registry().get("dbscan")
     if dbscan_model is None:
       return JsonResponse({
         "success": False,
@@ -1,16 +1,32 @@
 from pathlib import Path
 import pandas as pd
 
+# Input columns of the served models, in the order the serving code builds them.
+ROOM_FEATURES = ["Nb_personnes", "Capacite", "End_Type_ressource", "End_Type_cours",
+                 "End_Videoprojecteur", "End_besoin_projecteur"]
+TEACHER_FEATURES = ["Anciennete", "Score_appreciation", "score_niveau", "score_heure", "score_pse"]
+
 
 def _project_root():
     # return repository root (assumes this file is in App/ml_utils)
     return Path(__file__).resolve().parents[2]
 
 
+def resources_csv_path():
+    """Path of the raw resources dataset read by load_datasets."""
+    return _project_root() / "Datasets" / "Resources.csv"
+
+
+def dataset_paths():
+    """Paths of the three files read by load_datasets: (resources, teachers, courses)."""
+    data_dir = _project_root() / "Datasets"
+    return resources_csv_path(), data_dir / "teachers.csv", data_dir / "courses.csv"
+
+
 def load_datasets():
     root = _project_root()
     data_dir = root / "Datasets"
-    resources_raw = pd.read_csv(data_dir / "Resources.csv")
+    resources_raw = pd.read_csv(resources_csv_path())
     # The raw file contains one row per scheduled use of a resource; normalize
     # to one row per physical resource (Identifiant_ressource) to avoid
     # duplicate recommendations of the same room multiple times.
@@ -44,18 +60,17 @@ def load_datasets():
         grouped["Id"] = grouped["Identifiant_ressource"]
         resources = grouped
     else:
-        resources = pd.read_csv(data_dir / "Resources.csv")
-    teachers = pd.read_csv(data_dir / "teachers.csv")
-    courses = pd.read_csv(data_dir / "courses.csv")
+        resources = pd.read_csv(resources_csv_path())
+    _, teachers_path, courses_path = dataset_paths()
+    teachers = pd.read_csv(teachers_path)
+    courses = pd.read_csv(courses_path)
     return resources, teachers, courses
 
 
 def prepare_resources(resources: pd.DataFrame) -> pd.DataFrame:
     """Apply same feature engineering as in the notebook 'optimisation & recommandation'.
 
-    Produces columns required by the room model:
-    ["Nb_personnes","Capacite","End_Type_ressource","End_Type_cours",
-     "End_Videoprojecteur","End_besoin_projecteur"] and a Score column.
+    Produces the columns required by the room model (``ROOM_FEATURES``) and a Score column.
     """
     df = resources.copy()
 
@@ -141,8 +156,7 @@ def prepare_resources(resources: pd.DataFrame) -> pd.DataFrame:
 def prepare_teachers(teachers: pd.DataFrame, resources: pd.DataFrame, courses: pd.DataFrame) -> pd.DataFrame:
     """Merge teachers with resources and courses and compute the scores used by the teacher model.
 
-    Produces columns required by the teacher model:
-    ["Anciennete","Score_appreciation","score_niveau","score_heure","score_pse"]
+    Produces the columns required by the teacher model (``TEACHER_FEATURES``).
     """
     # The notebook merges teachers with resources on Enseignant_id and then with courses on nom_cours
     df_t = teachers.copy()
@@ -7,6 +7,9 @@ import sys
 import numpy as np
 from pathlib import Path
 
+# DBSCAN input columns, in the order prepare_analysis_features builds them
+STUDENT_FEATURES = ["average", "presence", "projects", "distance", "works", "status"]
+
 
 def _project_root():
     """Return repository root"""
@@ -22,7 +25,7 @@ def _ensure_models_on_path():
 
 
 def load_dbscan_model(model_path=None):
-    """Load DBSCAN model from JSON file"""
+    """Load DBSCAN model from a JSON or binary .npz file"""
     _ensure_models_on_path()
     
     if model_path is None:
@@ -35,6 +38,10 @@ def load_dbscan_model(model_path=None):
         dbscan = DBSCAN()
         model_path = Path(model_path)
         
+        # Binary artifact: arrays are memory-mapped, nothing to convert
+        if model_path.suffix == ".npz":
+            return DBSCAN.load_binary(str(model_path))
+        
         # Try to load from JSON if file exists
         if model_path.exists():
             try:
@@ -105,9 +112,9 @@ def prepare_analysis_features(form_data):
         
         status = 1 if form_data.get('status', 'Admis') == 'Admis' else 0
         
-        # Feature vector: [average, presence, projects, distance, works, status]
-        features = [average, presence, projects, distance, works, status]
-        return np.array(features, dtype=float)
+        features = {"average": average, "presence": presence, "projects": projects,
+                    "distance": distance, "works": works, "status": status}
+        return np.array([features[name] for name in STUDENT_FEATURES], dtype=float)
     except Exception as e:
         print(f"Error preparing features: {e}")
         return None
@@ -137,36 +144,44 @@ def predict_cluster(student_features, dbscan_model):
         # Reshape to 2D array for consistency
         student = student_features.reshape(1, -1)
         
-        # Find nearest neighbors in training data
-        distances = []
-        for i, training_point in enumerate(dbscan_model.X_):
-            dist = np.sqrt(np.sum((student - training_point) ** 2))
-            distances.append({
-                'index': i,
-                'distance': float(dist),
-                'cluster_id': int(dbscan_model.labels_[i])
-            })
+        # Distances to every training point in one pass (X_ may be a float32 memory map)
+        X = np.asarray(dbscan_model.X_)
+        labels = np.asarray(dbscan_model.labels_)
+        dist = np.sqrt(np.sum((X - student) ** 2, axis=1))
         
-        # Sort by distance
-        distances.sort(key=lambda x: x['distance'])
+        # 5 nearest neighbors, ties broken by index as a stable sort of all distances would
+        k = min(5, len(dist))
+        if k:
+            kth = np.partition(dist, k - 1)[k - 1]
+            candidates = np.flatnonzero(dist <= kth)
+            nearest_idx = candidates[np.argsort(dist[candidates], kind='stable')[:k]]
+        else:
+            nearest_idx = np.empty(0, dtype=np.intp)
+        distances = [
+            {'index': int(i), 'distance': float(dist[i]), 'cluster_id': int(labels[i])}
+            for i in nearest_idx
+        ]
         
         # Determine cluster assignment
         nearest = distances[0] if distances else None
         cluster_id = nearest['cluster_id'] if nearest else -1
         
-        # Get cluster information
-        unique_clusters = np.unique(dbscan_model.labels_)
-        cluster_sizes = {
-            int(cid): int(np.sum(dbscan_model.labels_ == cid))
-            for cid in unique_clusters
-        }
+        # Get cluster information (precomputed sizes of a compact artifact when present)
+        sizes = getattr(dbscan_model, 'cluster_sizes_', None)
+        if sizes is None:
+            unique_clusters, counts = np.unique(labels, return_counts=True)
+            cluster_sizes = {int(cid): int(n) for cid, n in zip(unique_clusters, counts)}
+        else:
+            n_noise = len(labels) - int(np.sum(sizes))
+            cluster_sizes = {-1: n_noise} if n_noise else {}
+            cluster_sizes.update((cid, int(n)) for cid, n in enumerate(sizes) if n)
         
         return {
             'cluster_id': cluster_id,
             'is_noise': cluster_id == -1,
             'nearest_distance': float(nearest['distance']) if nearest else None,
-            'top_k_neighbors': distances[:5],  # Top 5 nearest neighbors
-            'n_clusters': int(len([c for c in unique_clusters if c != -1])),
+            'top_k_neighbors': distances,  # Top 5 nearest neighbors
+            'n_clusters': len([c for c in cluster_sizes if c != -1]),
             'cluster_sizes': cluster_sizes,
             'total_noise_points': int(cluster_sizes.get(-1, 0)),
             'features': {
@@ -0,0 +1,80 @@
+"""Small thread-safe LRU cache with hit/miss statistics.
+
+Used to memoize request-independent computations (e.g. room scoring for a given
+form key). The cache is tied to a *generation*: any value describing the inputs
+the cached results depend on (dataset file signature, model instance...). When
+``validate`` sees a different generation, all entries are dropped.
+"""
+
+import threading
+from collections import OrderedDict
+
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Bounded mapping that evicts the least recently used entry."""
+
+    def __init__(self, maxsize=256):
+        if maxsize < 1:
+            raise ValueError("maxsize must be >= 1")
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = _MISSING
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def validate(self, generation):
+        """Drop every entry if ``generation`` differs from the one the entries were computed for."""
+        with self._lock:
+            if self._generation is _MISSING or self._generation != generation:
+                if self._data:
+                    self.invalidations += 1
+                self._data.clear()
+                self._generation = generation
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, generation=_MISSING):
+        """Store a value. If ``generation`` is given and is no longer current, the value is discarded."""
+        with self._lock:
+            if generation is not _MISSING and generation != self._generation:
+                return
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
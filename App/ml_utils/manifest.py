@@ -0,0 +1,245 @@
+"""Manifest of the deployed model artifacts (``Artifacts/manifest.json``).
+
+The manifest lists each model the application serves with its class, the
+artifact path (relative to ``Artifacts/``), the artifact format (``json`` or
+``npz``), the sha256 of the file and the feature columns the model expects,
+in order::
+
+    {
+      "version": 1,
+      "models": {
+        "teachers": {
+          "class": "GradientBoostingRegressor",
+          "path": "meilleurs models/gradient_boosting_regressor_model_teachers.json",
+          "format": "json",
+          "sha256": "…",
+          "features": ["Anciennete", "Score_appreciation", "score_niveau", "score_heure", "score_pse"]
+        }
+      }
+    }
+
+The model registry loads a model on the first request that needs it. It refuses
+an artifact whose content hash differs from the manifest, and it refuses a
+loaded model whose class does not match the entry, whose entry lists other
+columns than the ones the serving code builds (``SERVING_FEATURES``), or which
+reads more columns than the entry lists. Deploying
+a retrained artifact therefore means writing the file, then refreshing the
+manifest with ``python "Training&Saving/manifeste_artefacts.py"``. The
+manifest is re-read when it changes.
+"""
+
+import copy
+import json
+import os
+import threading
+from pathlib import Path
+
+from .data_prep import ROOM_FEATURES, TEACHER_FEATURES
+from .dbscan_analyzer import STUDENT_FEATURES
+from .model_registry import _file_hash, binary_or_json
+
+MANIFEST_VERSION = 1
+FORMATS = {".json": "json", ".npz": "npz"}
+
+
+# Columns the serving code builds for each model, in order (predictor._rank_rooms,
+# TeacherRanking.build, dbscan_analyzer.prepare_analysis_features).
+SERVING_FEATURES = {
+    "rooms": ROOM_FEATURES,
+    "teachers": TEACHER_FEATURES,
+    "dbscan": STUDENT_FEATURES,
+}
+
+# Models served by the application: manifest name -> (class, artifact under Artifacts/).
+# Used to create the manifest; the manifest file itself is the reference afterwards.
+DEFAULT_MODELS = {
+    "rooms": ("decisionTreeRegressor", "meilleurs models/decision_tree_class_model.json"),
+    "teachers": ("GradientBoostingRegressor", "meilleurs models/gradient_boosting_regressor_model_teachers.json"),
+    "dbscan": ("DBSCAN", "meilleurs models/DBSCAN.json"),
+}
+
+
+def artifacts_dir():
+    return Path(__file__).resolve().parents[2] / "Artifacts"
+
+
+def default_manifest_path():
+    return artifacts_dir() / "manifest.json"
+
+
+class ManifestEntry:
+    """One model of the manifest (see the module docstring for the fields)."""
+
+    def __init__(self, name, model_class, path, format, sha256, features):
+        self.name = name
+        self.model_class = model_class
+        self.path = Path(path)
+        self.format = format
+        self.sha256 = sha256
+        self.features = list(features)
+
+    @classmethod
+    def from_dict(cls, name, data, root):
+        missing = {"class", "path", "format", "sha256", "features"} - set(data)
+        if missing:
+            raise ValueError(f"Manifest entry '{name}' is missing {sorted(missing)}")
+        path = Path(data["path"])
+        return cls(name, data["class"], path if path.is_absolute() else root / path,
+                   data["format"], data["sha256"], data["features"])
+
+    def to_dict(self, root):
+        try:
+            path = self.path.relative_to(root).as_posix()
+        except ValueError:
+            path = str(self.path)
+        return {"class": self.model_class, "path": path, "format": self.format,
+                "sha256": self.sha256, "features": self.features}
+
+    def check_features(self):
+        """Raise ValueError if the listed columns are not the ones the serving code builds for this model."""
+        serving = SERVING_FEATURES.get(self.name)
+        if serving is not None and self.features != serving:
+            raise ValueError(f"The manifest lists {self.features} for '{self.name}', "
+                             f"the application builds {serving}")
+
+    def check_model(self, model):
+        """Raise ValueError if a loaded model does not match this entry's class or feature schema."""
+        # compact models keep the name of the class they were built from
+        loaded_class = getattr(model, "classe", None) or type(model).__name__
+        if loaded_class != self.model_class:
+            raise ValueError(f"{self.path} holds a {loaded_class}, the manifest expects a {self.model_class}")
+        self.check_features()
+        # tree models only reveal the highest column they test: a lower bound of their width
+        n_features = model_feature_count(model)
+        if n_features is not None and n_features > len(self.features):
+            raise ValueError(f"{self.path} uses {n_features} features, the manifest lists {len(self.features)}")
+
+
+def model_feature_count(model):
+    """Number of input columns a loaded model reads (None if it cannot be told cheaply).
+
+    For tree models this is 1 + the highest feature index tested by a node, which
+    is a lower bound of the training width; for DBSCAN it is the width of X_.
+    """
+    X = getattr(model, "X_", None)
+    if X is not None:
+        return len(X[0]) if len(X) else None
+    feature = getattr(model, "feature", None)  # ModeleCompact: node arrays of the whole forest
+    if feature is None:
+        from .predictor import _ensure_models_on_path
+        _ensure_models_on_path()
+        from description_arbres import decrire
+        from node_table import tables_en_cache
+        try:
+            trees, read, _, _, _ = decrire(model)
+        except (TypeError, ValueError):
+            return None
+        # the predict cache: already memory-mapped for a binary artifact
+        tables = tables_en_cache(model, trees, read)
+        used = [t.feature[t.left >= 0] for t in tables]
+    else:
+        used = [feature[model.left >= 0]]
+    used = [f for f in used if f.size]
+    return 1 + max(int(f.max()) for f in used) if used else 0
+
+
+class Manifest:
+    """Entries of a manifest file, re-read when the file changes (mtime / size)."""
+
+    def __init__(self, path=None):
+        self.path = Path(path) if path is not None else default_manifest_path()
+        self._signature = None
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def exists(self):
+        return self.path.exists()
+
+    def _signature_now(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def entries(self):
+        """{name: ManifestEntry}; raises if the file is missing or malformed."""
+        signature = self._signature_now()
+        with self._lock:
+            if signature is None:
+                raise FileNotFoundError(f"No artifact manifest at {self.path}")
+            if signature != self._signature:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") != MANIFEST_VERSION:
+                    raise ValueError(f"Unsupported manifest version in {self.path}: {data.get('version')}")
+                root = self.path.parent
+                self._entries = {name: ManifestEntry.from_dict(name, entry, root)
+                                 for name, entry in data.get("models", {}).items()}
+                self._signature = signature
+            return dict(self._entries)
+
+    def entry(self, name):
+        try:
+            return self.entries()[name]
+        except KeyError:
+            raise KeyError(f"Model '{name}' is not in the manifest {self.path}") from None
+
+    def artifact_path(self, name):
+        """Path of the artifact of ``name``, read from the current manifest."""
+        return self.entry(name).path
+
+    def expected_hash(self, name):
+        """sha256 the artifact of ``name`` must have, read from the current manifest."""
+        return self.entry(name).sha256
+
+    def write(self, entries):
+        """Write ``entries`` ({name: ManifestEntry}) atomically."""
+        root = self.path.parent
+        data = {"version": MANIFEST_VERSION,
+                "models": {name: entry.to_dict(root) for name, entry in sorted(entries.items())}}
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        os.replace(tmp, self.path)
+
+
+def checked_loader(manifest, name, loader):
+    """Wrap a registry loader so the loaded model is checked against the manifest entry."""
+    def load(path):
+        model = loader(path)
+        if model is not None:
+            manifest.entry(name).check_model(model)
+        return model
+    return load
+
+
+def refresh(manifest, prefer_binary=True, paths=None):
+    """Recompute the path, format and sha256 of every entry from the files on disk.
+
+    A missing manifest starts from ``DEFAULT_MODELS``. ``paths`` ({name: artifact})
+    moves entries to new files first, e.g. a model extended into a new JSON. With
+    ``prefer_binary`` an entry points at the ``.npz`` twin of its JSON artifact when
+    that twin is up to date (see ``model_registry.binary_or_json``). Returns the
+    refreshed entries; the caller writes them.
+    """
+    if manifest.exists():
+        entries = {name: copy.copy(entry) for name, entry in manifest.entries().items()}
+    else:
+        root = manifest.path.parent
+        entries = {name: ManifestEntry(name, model_class, root / path, None, None, SERVING_FEATURES[name])
+                   for name, (model_class, path) in DEFAULT_MODELS.items()}
+    for name, path in (paths or {}).items():
+        if name not in entries:
+            raise KeyError(f"Model '{name}' is not in the manifest {manifest.path}")
+        entries[name].path = Path(path).resolve()
+    for entry in entries.values():
+        source = entry.path.with_suffix(".json")
+        if source.exists():
+            entry.path = binary_or_json(source) if prefer_binary else source
+        entry.format = FORMATS.get(entry.path.suffix, entry.format)
+        entry.sha256 = _file_hash(entry.path)
+        if entry.sha256 is None:
+            raise FileNotFoundError(f"Artifact of '{entry.name}' not found: {entry.path}")
+    return entries
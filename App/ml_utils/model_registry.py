@@ -0,0 +1,267 @@
+"""Process-wide registry of loaded models with hot reload.
+
+Each artifact is loaded once per process and the same model instance is shared by
+every request. On ``get`` the registry checks the artifact file cheaply (``os.stat``:
+mtime and size, at most once every ``check_interval`` seconds). An artifact path can
+be given as a callable (e.g. the manifest entry), re-read on every check: a model
+moved to another file, like a warm-started ensemble or its ``.npz`` twin, is picked
+up as a change. When the file has changed it hashes the content. If the hash differs from the loaded version, it loads
+the new model and swaps it in atomically. Requests already holding the old instance
+keep using it, and later requests get the new one. A failed reload keeps the
+previous model until the file changes again.
+
+Shared instances must be treated as read-only: numpy arrays held by a model are
+marked non-writeable after loading.
+"""
+
+import functools
+import hashlib
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def _file_signature(path):
+    """Cheap change detector: (mtime_ns, size), or None if the file is missing."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _artifact_signature(path):
+    """``_file_signature`` tagged with the path: moving an entry to another file is a change."""
+    signature = _file_signature(path) if path is not None else None
+    return (str(path),) + signature if signature is not None else None
+
+
+def _file_hash(path):
+    h = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+    except OSError:
+        return None
+    return h.hexdigest()
+
+
+def _freeze(model):
+    """Mark the numpy arrays held by a shared model as read-only."""
+    for value in vars(model).values() if hasattr(model, "__dict__") else ():
+        if isinstance(value, np.ndarray):
+            value.setflags(write=False)
+    return model
+
+
+class _Entry:
+    def __init__(self, path, loader, expected_hash=None):
+        self.path_source = path if callable(path) else Path(path)
+        self.last_path = None if callable(path) else Path(path)
+        self.loader = loader
+        self.expected_hash = expected_hash
+        # (model, signature, content hash) swapped as a whole: readers never see a mix
+        self.state = None
+        self.last_check = 0.0
+        self.lock = threading.Lock()  # serializes (re)loads of this entry only
+
+
+class ModelRegistry:
+    """Thread-safe registry of models loaded from artifact files.
+
+    Usage::
+
+        registry = ModelRegistry()
+        registry.register("dbscan", path, load_dbscan_model)
+        model = registry.get("dbscan")
+    """
+
+    def __init__(self, check_interval=1.0):
+        self.check_interval = check_interval
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, path, loader, expected_hash=None):
+        """Declare an artifact. Nothing is loaded until the first ``get``.
+
+        ``path`` is the artifact file, or a callable returning its current path (e.g.
+        from the artifact manifest), called on every check.
+        ``loader(path)`` returns the model (None or an exception means failure).
+        ``expected_hash()``, if given, returns the sha256 the artifact must have
+        (e.g. from the artifact manifest): a file with another content is not loaded.
+        """
+        with self._lock:
+            self._entries[name] = _Entry(path, loader, expected_hash)
+
+    def names(self):
+        with self._lock:
+            return list(self._entries)
+
+    def _entry(self, name):
+        with self._lock:
+            try:
+                return self._entries[name]
+            except KeyError:
+                raise KeyError(f"Unknown model '{name}'. Registered: {sorted(self._entries)}") from None
+
+    def get(self, name):
+        """Return the shared model instance, reloading it first if its artifact changed."""
+        entry = self._entry(name)
+        now = time.monotonic()
+        state = entry.state
+        if state is not None and now - entry.last_check < self.check_interval:
+            return state[0]
+        entry.last_check = now
+        if state is None or _artifact_signature(self._path(entry)) != state[1]:
+            self._reload(entry)
+        return entry.state[0] if entry.state is not None else None
+
+    def version(self, name):
+        """Content hash of the artifact the current model was loaded from (None if missing)."""
+        state = self._entry(name).state
+        return state[2] if state is not None else None
+
+    def reload(self, name):
+        """Force a reload check of one model, ignoring ``check_interval``."""
+        entry = self._entry(name)
+        self._reload(entry)
+        return entry.state[0] if entry.state is not None else None
+
+    @staticmethod
+    def _path(entry):
+        """Current artifact path of an entry; the last known one if it cannot be read now."""
+        if callable(entry.path_source):
+            try:
+                entry.last_path = Path(entry.path_source())
+            except Exception:
+                logger.exception("Reading the artifact path of %s failed", entry.last_path)
+        return entry.last_path
+
+    @staticmethod
+    def _hash_matches(entry, path, digest):
+        if entry.expected_hash is None:
+            return True
+        try:
+            expected = entry.expected_hash()
+        except Exception:
+            logger.exception("Reading the expected hash of %s failed", path)
+            return False
+        if digest != expected:
+            logger.error("Not loading %s: sha256 %s does not match the manifest (%s)",
+                         path, (digest or "")[:12], (expected or "")[:12])
+            return False
+        return True
+
+    def _reload(self, entry):
+        with entry.lock:
+            path = self._path(entry)
+            signature = _artifact_signature(path)
+            state = entry.state
+            if state is not None and signature == state[1]:
+                return  # another thread already reloaded this version
+            digest = _file_hash(path) if signature is not None else None
+            if state is not None and digest == state[2]:
+                # touched but identical content: keep the model, remember the new signature
+                entry.state = (state[0], signature, digest)
+                return
+            if not self._hash_matches(entry, path, digest):
+                # artifact and manifest out of step (e.g. mid-deploy): keep the old signature so the
+                # next check compares again, and serve the previous version meanwhile
+                if state is None:
+                    entry.state = (None, None, None)
+                return
+            try:
+                model = entry.loader(str(path))
+            except Exception:
+                logger.exception("Loading model artifact %s failed", path)
+                model = None
+            if model is None:
+                # keep serving the previous version (if any); retry once the file changes again
+                entry.state = (state[0], signature, state[2]) if state is not None else (None, signature, None)
+                return
+            entry.state = (_freeze(model), signature, digest)
+            if state is not None:
+                logger.info("Reloaded model artifact %s (version %s)", path, (digest or "")[:12])
+
+
+def binary_or_json(path):
+    """The binary ``.npz`` twin of a JSON artifact when it exists and is not older, else ``path``.
+
+    Binary artifacts (written by ``save_binary`` or ``Training&Saving/convertir_binaire.py``)
+    are memory-mapped instead of parsed, so workers start faster and share their pages.
+    """
+    path = Path(path)
+    binary = path.with_suffix(".npz")
+    source, converted = _file_signature(path), _file_signature(binary)
+    if converted is None:
+        return path
+    if source is not None and converted[0] < source[0]:
+        logger.warning("Ignoring %s: older than %s, convert it again", binary, path)
+        return path
+    return binary
+
+
+# Set to "1" to serve the tree models in their compact reduced-precision form.
+COMPACT_MODELS_ENV = "ML_COMPACT_MODELS"
+
+_default_registry = None
+_default_lock = threading.Lock()
+
+
+def default_registry():
+    """Process-wide registry with the application's models (rooms, teachers, dbscan).
+
+    Models are declared from the artifact manifest (``Artifacts/manifest.json``,
+    see ``manifest``): each one is loaded by the first request that uses it, and
+    its hash, class and features are checked against the manifest. The artifact
+    path is read from the manifest on every check, so an entry moved to a new file
+    is reloaded. Without
+    a manifest, the artifacts of ``Artifacts/meilleurs models`` are registered
+    unchecked. The tree models score small batches through their compiled modules
+    (``Models/tree_compiler.py``, generated on first load and cached by artifact
+    hash) and large batches through their vectorized ``predict``, which is also
+    used for every batch if compilation fails. With
+    ``ML_COMPACT_MODELS=1`` in the environment, they are loaded in their compact
+    form (float32 node arrays) instead.
+    """
+    global _default_registry
+    if _default_registry is None:
+        with _default_lock:
+            if _default_registry is None:
+                from .dbscan_analyzer import load_dbscan_model
+                from .manifest import Manifest, checked_loader
+                from .predictor import load_room_model, load_teacher_model
+
+                # opt-in float32 tree models: much smaller per worker, checked against the float64 models
+                compact = os.environ.get(COMPACT_MODELS_ENV, "") == "1"
+                loaders = {
+                    "rooms": functools.partial(load_room_model, compact=compact, compiled=True),
+                    "teachers": functools.partial(load_teacher_model, compact=compact, compiled=True),
+                    "dbscan": load_dbscan_model,
+                }
+                registry = ModelRegistry()
+                manifest = Manifest()
+                if manifest.exists():
+                    for name, entry in manifest.entries().items():
+                        if name not in loaders:
+                            logger.warning("No loader for manifest model '%s', skipped", name)
+                            continue
+                        registry.register(name, functools.partial(manifest.artifact_path, name),
+                                          checked_loader(manifest, name, loaders[name]),
+                                          expected_hash=functools.partial(manifest.expected_hash, name))
+                else:
+                    logger.warning("No artifact manifest at %s: models are loaded without hash checks", manifest.path)
+                    artifacts = manifest.path.parent / "meilleurs models"
+                    registry.register("rooms", binary_or_json(artifacts / "decision_tree_class_model.json"), loaders["rooms"])
+                    registry.register("teachers", binary_or_json(artifacts / "gradient_boosting_regressor_model_teachers.json"),
+                                      loaders["teachers"])
+                    registry.register("dbscan", binary_or_json(artifacts / "DBSCAN.json"), loaders["dbscan"])
+                _default_registry = registry
+    return _default_registry
@@ -1,12 +1,20 @@
 """ML Prediction module - loads trained models and generates recommendations."""
 
 from pathlib import Path
+import logging
+import os
 import sys
 import json
+import threading
 import numpy as np
 import pandas as pd
 
-from .data_prep import load_datasets, prepare_resources, prepare_teachers
+from .data_prep import ROOM_FEATURES, load_datasets, prepare_resources, resources_csv_path
+from .lru_cache import LRUCache
+from .teacher_ranking import TeacherRankingStore
+from .topk import first_present, numeric_columns, top_k_unique
+
+logger = logging.getLogger(__name__)
 
 
 def _project_root():
@@ -27,32 +35,85 @@ def _ensure_models_on_path():
             sys.path.insert(0, pstr)
 
 
+def _load_artifact(model_class, path):
+    """Load one artifact with the model class' ``load``.
+
+    ``load`` is a classmethod returning a new model for some classes and an
+    in-place method returning ``self`` for others: keep whichever it returns.
+    A ``.npz`` path is a binary artifact (see Models/format_binaire.py): it is
+    memory-mapped by ``load_binary`` instead of parsed.
+    """
+    if Path(path).suffix == ".npz":
+        return model_class.load_binary(str(path))
+    model = model_class()
+    if hasattr(model, "load"):
+        loaded = model.load(str(path))
+        if loaded is not None:
+            model = loaded
+    return model
+
+
+def _compact(model):
+    """Reduced-precision copy of a tree model (see Models/modele_compact.py); the Node graph is dropped."""
+    from modele_compact import compacter
+    return compacter(model)
+
+
+def _compiled(model, path):
+    """The model with ``predict`` running its generated if/else module (see Models/tree_compiler.py).
+
+    Only small batches run the module: batches of more than
+    ``tree_compiler.LIGNES_MAX_COMPILE`` rows (every room or teacher row at once)
+    keep the model's vectorized ``predict``, which is faster there. The module is generated on the first load of an artifact and cached under
+    ``Artifacts/compiles``, keyed on the sha256 of the artifact at ``path``; later
+    loads of the same file import it. If it cannot be generated or does not
+    reproduce ``predict`` exactly, the loaded model is returned unchanged.
+    """
+    from tree_compiler import ModeleCompile, compiler
+    try:
+        return ModeleCompile(model, compiler(model, chemin_artifact=path))
+    except Exception:
+        logger.warning("Compiling %s failed, serving its predict instead", path, exc_info=True)
+        return model
+
+
+def _finish_tree_model(model, path, compact, compiled):
+    if compact:
+        return _compact(model)
+    return _compiled(model, path) if compiled else model
+
+
+def load_room_model(path, compact=False, compiled=False):
+    """Load the room scoring tree (decisionTreeRegressor) from a JSON or binary .npz artifact.
+
+    compact=True returns the float32 ModeleCompact form instead, checked against the loaded tree.
+    compiled=True serves the tree through its compiled module, falling back to ``predict``.
+    """
+    _ensure_models_on_path()
+    from DecisionTreeRegressor import decisionTreeRegressor
+    model = _load_artifact(decisionTreeRegressor, path)
+    return _finish_tree_model(model, path, compact, compiled)
+
+
+def load_teacher_model(path, compact=False, compiled=False):
+    """Load the teacher scoring ensemble (GradientBoostingRegressor) from a JSON or binary .npz artifact.
+
+    compact=True returns the float32 ModeleCompact form instead, checked against the loaded ensemble.
+    compiled=True serves the ensemble through its compiled module, falling back to ``predict``.
+    """
+    _ensure_models_on_path()
+    from GradientBoostingRegressor import GradientBoostingRegressor
+    model = _load_artifact(GradientBoostingRegressor, path)
+    return _finish_tree_model(model, path, compact, compiled)
+
+
 def load_models(decision_tree_path=None, gradient_boosting_path=None):
     """Load ML models from trained artifacts.
     
     Returns: (dt_model for rooms, gb_model for teachers)
-    Falls back to None if models don't exist.
+    Falls back to None (and logs the error) if a model cannot be loaded.
+    The web views use the lazy ``model_registry.default_registry()`` instead.
     """
-    _ensure_models_on_path()
-    
-    NotebookRegTree = None
-    NotebookGB = None
-    
-    try:
-        from DecisionTreeRegressor import decisionTreeRegressor as NotebookRegTree_class
-        NotebookRegTree = NotebookRegTree_class
-    except Exception:
-        pass
-    
-    try:
-        from GradientBoostingRegressor import GradientBoostingRegressor as NotebookGB_class
-        NotebookGB = NotebookGB_class
-    except Exception:
-        pass
-    
-    dt_model = None
-    gb_model = None
-    
     root = _project_root()
     
     if decision_tree_path is None:
@@ -60,88 +121,141 @@ def load_models(decision_tree_path=None, gradient_boosting_path=None):
     if gradient_boosting_path is None:
         gradient_boosting_path = root / "Artifacts" / "modele_ia.json"
     
+    dt_model = None
+    gb_model = None
+    
     # Load decision tree (for rooms)
-    if NotebookRegTree is not None:
-        try:
-            dt_model = NotebookRegTree()
-            if hasattr(dt_model, "load"):
-                dt_model.load(str(decision_tree_path))
-        except Exception:
-            pass
+    try:
+        dt_model = load_room_model(decision_tree_path)
+    except Exception:
+        logger.exception("Loading the room model %s failed", decision_tree_path)
     
     # Load gradient boosting (for teachers)
-    if NotebookGB is not None:
-        try:
-            gb_model = NotebookGB()
-            if hasattr(gb_model, "load"):
-                gb_model.load(str(gradient_boosting_path))
-        except Exception:
-            pass
+    try:
+        gb_model = load_teacher_model(gradient_boosting_path)
+    except Exception:
+        logger.exception("Loading the teacher model %s failed", gradient_boosting_path)
     
     return dt_model, gb_model
 
 
-def predict_top_rooms_and_teachers(form_data: dict, dt_model, gb_model, top_n=3):
-    """Predict top N rooms and teachers using ML models with correct feature engineering.
-    
-    Form data expected:
-    - Nb_personnes: class size
-    - Type_cours: CM/TD/TP
-    - filiere: student track
-    - niveau: academic level
-    - nom_matiere: subject name
-    
-    Returns dict with 'rooms' and 'teachers' lists, each item normalized with expected keys.
-    """
-    resources, teachers, courses = load_datasets()
-    res_prepared = prepare_resources(resources)
-    teachers_prepared = prepare_teachers(teachers, resources, courses)
-    
-    # ========== PREDICT ROOMS ==========
-    # Features: [Nb_personnes, Capacite, End_Type_ressource, End_Type_cours, End_Videoprojecteur, End_besoin_projecteur]
-    
+# Ranked room lists keyed on the only form values room scoring depends on.
+# Entries are dropped when the resources dataset file or the room model changes.
+ROOM_CACHE = LRUCache(maxsize=256)
+
+
+# Prepared resources frame of the current generation, shared by the cached room rankings.
+_resources = None  # (generation, frame)
+_resources_lock = threading.Lock()
+
+# Teacher ranking of the current teachers dataset and teacher model (see teacher_ranking).
+TEACHER_RANKINGS = TeacherRankingStore()
+
+
+def room_cache_stats():
+    """Hit/miss/eviction counters of the room scoring cache."""
+    return ROOM_CACHE.stats()
+
+
+def compute_besoin_projecteur(type_cours, filiere):
+    if type_cours == "CM":
+        return "OUI"
+    elif type_cours == "TD":
+        return "OUI" if filiere in ["GIT", "SDIA", "GESI", "EEAT", "Météorologie"] else "NON"
+    elif type_cours == "TP":
+        return "OUI" if filiere in ["GIT", "SDIA", "GESI"] else "NON"
+    return "NON"
+
+
+def _room_cache_key(form_data):
+    """(Nb_personnes, Type_cours, besoin_projecteur): everything room scoring reads from the form."""
     form_type_cours = form_data.get("Type_cours", "CM")
     form_filiere = form_data.get("filiere", "GIT")
-    
-    def compute_besoin_projecteur(type_cours, filiere):
-        if type_cours == "CM":
-            return "OUI"
-        elif type_cours == "TD":
-            return "OUI" if filiere in ["GIT", "SDIA", "GESI", "EEAT", "Météorologie"] else "NON"
-        elif type_cours == "TP":
-            return "OUI" if filiere in ["GIT", "SDIA", "GESI"] else "NON"
-        return "NON"
-    
-    form_besoin_projecteur = compute_besoin_projecteur(form_type_cours, form_filiere)
-    
-    room_features = []
-    room_rows = []
-    
-    for _, row in res_prepared.iterrows():
-        try:
-            nb_personnes = float(form_data.get("Nb_personnes", 30))
-            capacite = float(row.get("Capacite", 60))
-            end_type_ressource = float(row.get("End_Type_ressource", 1))
-            
-            # Map Type_cours to numeric
-            type_cours_map = {"CM": 2, "TD": 1, "TP": 0}
-            end_type_cours = float(type_cours_map.get(form_type_cours, 0))
-            
-            end_videoprojecteur = float(1 if row.get("Videoprojecteur") == "OUI" else 0)
-            end_besoin_projecteur = float(1 if form_besoin_projecteur == "OUI" else 0)
-            
-            x = [nb_personnes, capacite, end_type_ressource, end_type_cours, 
-                 end_videoprojecteur, end_besoin_projecteur]
-            room_features.append(x)
-            room_rows.append(row)
-        except Exception:
-            continue
-    
-    room_X = np.array(room_features)
+    try:
+        nb_personnes = float(form_data.get("Nb_personnes", 30))
+    except (TypeError, ValueError):
+        nb_personnes = None  # every row is skipped, as when float() fails inside the loop
+    return (nb_personnes, form_type_cours, compute_besoin_projecteur(form_type_cours, form_filiere))
+
+
+def _room_cache_generation(dt_model):
+    path = resources_csv_path()
+    try:
+        st = os.stat(path)
+        signature = (st.st_mtime_ns, st.st_size)
+    except OSError:
+        signature = None
+    # the model is compared by identity: a registry reload hands out a new instance
+    return (signature, dt_model)
+
+
+class _RoomRanking:
+    """Scores of every candidate room row for one form key.
+
+    The distinct-id ranking is extended lazily: ``top(k)`` partitions the scores for
+    the largest ``k`` asked so far and later calls with ``k`` or fewer rooms are a slice.
+    """
+
+    def __init__(self, frame, ids, scores):
+        self.frame = frame
+        self.ids = ids
+        self.scores = scores
+        self._ranked = (0, np.empty(0, dtype=np.intp))  # (k asked, winning positions)
+
+    def top(self, k):
+        asked, positions = self._ranked
+        if k > asked and len(positions) == asked:
+            positions = top_k_unique(self.ids, self.scores, k)
+            self._ranked = (k, positions)
+        # row dicts are only built for the returned rooms
+        return [(self.ids[i], float(self.scores[i]), self.frame.iloc[i].to_dict()) for i in positions[:k]]
+
+
+def _prepared_resources(generation, datasets):
+    global _resources
+    current = _resources
+    if current is not None and current[0] == generation:
+        return current[1]
+    with _resources_lock:
+        current = _resources
+        if current is not None and current[0] == generation:
+            return current[1]
+        frame = prepare_resources(datasets()[0])
+        _resources = (generation, frame)
+        return frame
+
+
+def _rank_rooms(res_prepared, key, dt_model):
+    """Score every room row for one form key (model input: the ``ROOM_FEATURES`` columns, in order)."""
+    nb_personnes, form_type_cours, form_besoin_projecteur = key
+    
+    # Map Type_cours to numeric
+    type_cours_map = {"CM": 2, "TD": 1, "TP": 0}
+    end_type_cours = float(type_cours_map.get(form_type_cours, 0))
+    end_besoin_projecteur = float(1 if form_besoin_projecteur == "OUI" else 0)
+    
+    room_X, valid = numeric_columns(res_prepared, {"Capacite": 60, "End_Type_ressource": 1})
+    if nb_personnes is None:
+        valid[:] = False
+    if "Videoprojecteur" in res_prepared.columns:
+        end_videoprojecteur = (res_prepared["Videoprojecteur"] == "OUI").to_numpy(dtype=float)
+    else:
+        end_videoprojecteur = np.zeros(len(res_prepared))
+    n = len(res_prepared)
+    columns = {
+        "Nb_personnes": np.full(n, nb_personnes if nb_personnes is not None else np.nan),
+        "Capacite": room_X[:, 0],
+        "End_Type_ressource": room_X[:, 1],
+        "End_Type_cours": np.full(n, end_type_cours),
+        "End_Videoprojecteur": end_videoprojecteur,
+        "End_besoin_projecteur": np.full(n, end_besoin_projecteur),
+    }
+    room_X = np.column_stack([columns[name] for name in ROOM_FEATURES])[valid]
+    room_rows = res_prepared[valid]
     
     # Get scores from model or fallback
     room_scores = None
-    if dt_model is not None and hasattr(dt_model, "predict"):
+    if dt_model is not None and hasattr(dt_model, "predict") and len(room_X) > 0:
         try:
             room_scores = dt_model.predict(room_X)
         except Exception:
@@ -152,82 +266,55 @@ def predict_top_rooms_and_teachers(form_data: dict, dt_model, gb_model, top_n=3)
                 pass
     
     if room_scores is None:
-        room_scores = np.array([float(r.get("Score", 0)) for r in room_rows])
-    
-    # Build rooms list
-    rooms_list = []
-    for rrow, score in zip(room_rows, room_scores):
-        room_id = rrow.get("Identifiant_ressource") or rrow.get("Id") or rrow.get("Nom_ressource", "room")
-        rooms_list.append((room_id, float(score), rrow.to_dict()))
-    
-    # Sort and deduplicate
-    rooms_sorted_raw = sorted(rooms_list, key=lambda t: t[1], reverse=True)
-    rooms_seen = set()
-    rooms_sorted = []
-    for rid, sc, rrow in rooms_sorted_raw:
-        if rid in rooms_seen:
-            continue
-        rooms_seen.add(rid)
-        rooms_sorted.append((rid, sc, rrow))
-    rooms_sorted = rooms_sorted[:top_n]
+        if "Score" in room_rows.columns:
+            room_scores = room_rows["Score"].to_numpy(dtype=float, na_value=np.nan)
+        else:
+            room_scores = np.zeros(len(room_rows))
     
-    # ========== PREDICT TEACHERS ==========
-    # Features: [Anciennete, Score_appreciation, score_niveau, score_heure, score_pse]
+    room_ids = first_present(room_rows, ["Identifiant_ressource", "Id", "Nom_ressource"], "room")
+    return _RoomRanking(room_rows, room_ids, np.asarray(room_scores, dtype=float))
+
+
+def predict_top_rooms_and_teachers(form_data: dict, dt_model, gb_model, top_n=3,
+                                   teacher_filters=None, gb_model_version=None):
+    """Predict top N rooms and teachers using ML models with correct feature engineering.
     
-    teacher_features = []
-    teacher_rows = []
+    Form data expected:
+    - Nb_personnes: class size
+    - Type_cours: CM/TD/TP
+    - filiere: student track
+    - niveau: academic level
+    - nom_matiere: subject name
     
-    for _, trow in teachers_prepared.iterrows():
-        try:
-            anciennete = float(trow.get("Anciennete", 0))
-            score_appreciation = float(trow.get("Score_appreciation", 0))
-            score_niveau = float(trow.get("score_niveau", 0))
-            score_heure = float(trow.get("score_heure", 0))
-            score_pse = float(trow.get("score_pse", 0))
-            
-            x = [anciennete, score_appreciation, score_niveau, score_heure, score_pse]
-            teacher_features.append(x)
-            teacher_rows.append(trow)
-        except Exception:
-            continue
+    teacher_filters: optional {column: value} restriction of the teacher ranking
+    (e.g. {"Specialite": ...}). gb_model_version: content hash of the teacher model
+    artifact; when given, the teacher ranking is also persisted under Artifacts/rankings.
     
-    teacher_X = np.array(teacher_features) if teacher_features else np.array([])
+    Returns dict with 'rooms' and 'teachers' lists, each item normalized with expected keys.
+    """
+    datasets = []
+
+    def get_datasets():
+        # loaded only when one of the caches has to be (re)built
+        if not datasets:
+            datasets.append(load_datasets())
+        return datasets[0]
     
-    # Get teacher scores from model or fallback
-    teacher_scores = None
-    if gb_model is not None and hasattr(gb_model, "predict") and len(teacher_X) > 0:
-        try:
-            teacher_scores = gb_model.predict(teacher_X)
-        except Exception:
-            try:
-                teacher_scores = [float(gb_model.predict([xi])[0]) for xi in teacher_X]
-                teacher_scores = np.array(teacher_scores)
-            except Exception:
-                pass
+    # ========== PREDICT ROOMS ==========
+    # Memoized: the ranking only depends on the rooms table, the room model and the form key
+    key = _room_cache_key(form_data)
+    generation = _room_cache_generation(dt_model)
+    ROOM_CACHE.validate(generation)
+    rooms_ranked = ROOM_CACHE.get(key)
+    if rooms_ranked is None:
+        rooms_ranked = _rank_rooms(_prepared_resources(generation, get_datasets), key, dt_model)
+        ROOM_CACHE.put(key, rooms_ranked, generation)
+    rooms_sorted = rooms_ranked.top(top_n)
     
-    if teacher_scores is None and len(teacher_X) > 0:
-        # Fallback: simple heuristic based on availability
-        teacher_scores = np.array([
-            float(t.get("Heures_restantes", 0)) / max(1, float(t.get("Heures_totales_assignees", 1)))
-            for t in teacher_rows
-        ])
-    
-    # Build teachers list
-    teachers_list = []
-    for trow, score in zip(teacher_rows, teacher_scores if teacher_scores is not None else [0]*len(teacher_rows)):
-        teacher_id = trow.get("Matricule_enseignant") or trow.get("id", "teacher")
-        teachers_list.append((teacher_id, float(score), trow.to_dict()))
-    
-    # Sort and deduplicate
-    teachers_sorted_raw = sorted(teachers_list, key=lambda t: t[1], reverse=True)
-    teachers_seen = set()
-    teachers_sorted = []
-    for tid, sc, trow in teachers_sorted_raw:
-        if tid in teachers_seen:
-            continue
-        teachers_seen.add(tid)
-        teachers_sorted.append((tid, sc, trow))
-    teachers_sorted = teachers_sorted[:top_n]
+    # ========== PREDICT TEACHERS ==========
+    # Teacher scores do not depend on the form: ranked once per dataset/model version
+    ranking = TEACHER_RANKINGS.get(gb_model, model_version=gb_model_version, datasets=get_datasets)
+    teachers_sorted = ranking.top(top_n, teacher_filters)
     
     return {
         "rooms": [{"id": rid, "score": sc, "data": rrow} for rid, sc, rrow in rooms_sorted],
@@ -0,0 +1,211 @@
+"""Precomputed teacher ranking.
+
+Teacher recommendations do not depend on the form: every request used to merge
+teachers x resources x courses, score the joined frame with the teacher model and
+deduplicate. ``TeacherRanking`` does that once and keeps the result as ranked
+arrays (ids, scores, row data). A request then reduces to a slice, optionally
+filtered on a teacher column (``Specialite``, ``Departement``...).
+
+``TeacherRankingStore`` keeps the ranking for the current dataset/model version in
+memory. When the model version is known (for example the artifact hash from the
+model registry), it also persists the ranking as JSON, so other workers and
+restarts reuse it.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from .data_prep import TEACHER_FEATURES, dataset_paths, prepare_teachers
+from .topk import first_present, numeric_columns, top_k_unique
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parents[2] / "Artifacts" / "rankings"
+
+
+def _json_default(value):
+    # numpy / pandas scalars in row dicts
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+class TeacherRanking:
+    """Deduplicated teachers sorted by decreasing score."""
+
+    def __init__(self, ids, scores, rows, version=None):
+        self.ids = np.asarray(ids, dtype=object)
+        self.scores = np.asarray(scores, dtype=float)
+        self.rows = list(rows)
+        self.version = version
+        self._columns = {}  # column name -> object array, built on first filter
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.rows)
+
+    @classmethod
+    def build(cls, teachers_prepared, gb_model, version=None):
+        """Score every row of the prepared teachers frame and keep the best row per teacher."""
+        teacher_X, valid = numeric_columns(teachers_prepared, {name: 0 for name in TEACHER_FEATURES})
+        teacher_X = teacher_X[valid]
+        teacher_rows = teachers_prepared[valid]
+
+        # Get teacher scores from model or fallback
+        teacher_scores = None
+        if gb_model is not None and hasattr(gb_model, "predict") and len(teacher_X) > 0:
+            try:
+                teacher_scores = gb_model.predict(teacher_X)
+            except Exception:
+                try:
+                    teacher_scores = [float(gb_model.predict([xi])[0]) for xi in teacher_X]
+                    teacher_scores = np.array(teacher_scores)
+                except Exception:
+                    pass
+
+        if teacher_scores is None and len(teacher_X) > 0:
+            # Fallback: simple heuristic based on availability
+            hours, _ = numeric_columns(teacher_rows, {"Heures_restantes": 0, "Heures_totales_assignees": 1})
+            teacher_scores = hours[:, 0] / np.fmax(1, hours[:, 1])  # fmax: max(1, nan) == 1
+        if teacher_scores is None:
+            teacher_scores = np.zeros(len(teacher_rows))
+        teacher_scores = np.asarray(teacher_scores, dtype=float)
+
+        # Deduplicate: best row per teacher, sorted by score
+        teacher_ids = first_present(teacher_rows, ["Matricule_enseignant", "id"], "teacher")
+        positions = top_k_unique(teacher_ids, teacher_scores)
+        rows = [teacher_rows.iloc[i].to_dict() for i in positions]  # row dicts only for the kept teachers
+        return cls(teacher_ids[positions], teacher_scores[positions], rows, version)
+
+    def _column(self, name):
+        with self._lock:
+            column = self._columns.get(name)
+            if column is None:
+                column = np.array([row.get(name) for row in self.rows], dtype=object)
+                self._columns[name] = column
+            return column
+
+    def top(self, n, filters=None):
+        """Best ``n`` teachers as (id, score, row dict); ``filters`` maps column -> required value."""
+        if filters:
+            mask = np.ones(len(self.rows), dtype=bool)
+            for name, value in filters.items():
+                if value is not None and value != "":
+                    mask &= self._column(name) == value
+            positions = np.flatnonzero(mask)[:n]
+        else:
+            positions = range(min(n, len(self.rows)))
+        # callers get their own row dicts: the ranking is shared between requests
+        return [(self.ids[i], float(self.scores[i]), dict(self.rows[i])) for i in positions]
+
+    def save(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "format": FORMAT_VERSION,
+            "version": self.version,
+            "ids": self.ids.tolist(),
+            "scores": self.scores.tolist(),
+            "rows": self.rows,
+        }
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, default=_json_default)
+        os.replace(tmp, path)  # atomic: concurrent workers never read a partial file
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("format") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported teacher ranking format in {path}")
+        return cls(data["ids"], data["scores"], data["rows"], data.get("version"))
+
+
+def _files_signature(paths):
+    signature = []
+    for p in paths:
+        try:
+            st = os.stat(p)
+            signature.append((str(p), st.st_mtime_ns, st.st_size))
+        except OSError:
+            signature.append((str(p), None, None))
+    return tuple(signature)
+
+
+def _files_hash(paths):
+    h = hashlib.sha256()
+    for p in paths:
+        h.update(str(Path(p).name).encode("utf-8"))
+        try:
+            h.update(Path(p).read_bytes())
+        except OSError:
+            h.update(b"<missing>")
+    return h.hexdigest()
+
+
+class TeacherRankingStore:
+    """Current teacher ranking, rebuilt only when the datasets or the teacher model change."""
+
+    def __init__(self, cache_dir=None, paths=None):
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else DEFAULT_CACHE_DIR
+        self._paths = paths
+        self._current = None  # (generation, ranking)
+        self._lock = threading.Lock()
+
+    def paths(self):
+        return self._paths if self._paths is not None else dataset_paths()
+
+    def get(self, gb_model, model_version=None, datasets=None):
+        """Ranking for the current datasets and ``gb_model``.
+
+        Args:
+            gb_model: teacher model (compared by identity between calls)
+            model_version: stable identifier of the model content (e.g. artifact sha256);
+                enables the on-disk cache shared by processes
+            datasets: callable returning (resources, teachers, courses), only called on a rebuild
+        """
+        paths = self.paths()
+        generation = (_files_signature(paths), gb_model, model_version)
+        current = self._current
+        if current is not None and current[0] == generation:
+            return current[1]
+        with self._lock:
+            current = self._current
+            if current is not None and current[0] == generation:
+                return current[1]
+            ranking = self._load_or_build(paths, gb_model, model_version, datasets)
+            self._current = (generation, ranking)
+            return ranking
+
+    def _load_or_build(self, paths, gb_model, model_version, datasets):
+        cache_path = None
+        version = None
+        if model_version is not None:
+            version = hashlib.sha256(f"{_files_hash(paths)}:{model_version}".encode("utf-8")).hexdigest()
+            cache_path = self.cache_dir / f"teachers_{version[:16]}.json"
+            if cache_path.exists():
+                try:
+                    ranking = TeacherRanking.load(cache_path)
+                    if ranking.version == version:
+                        return ranking
+                except Exception:
+                    logger.exception("Ignoring unreadable teacher ranking %s", cache_path)
+
+        if datasets is None:
+            from .data_prep import load_datasets as datasets
+        resources, teachers, courses = datasets()
+        ranking = TeacherRanking.build(prepare_teachers(teachers, resources, courses), gb_model, version)
+        if cache_path is not None:
+            try:
+                ranking.save(cache_path)
+            except OSError:
+                logger.exception("Could not persist teacher ranking to %s", cache_path)
+        return ranking
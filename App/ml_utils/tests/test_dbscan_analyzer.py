@@ -0,0 +1,81 @@
+"""predict_cluster on DBSCAN models loaded from a JSON file and from its binary .npz conversion."""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+APP = Path(__file__).resolve().parents[2]
+if str(APP) not in sys.path:
+    sys.path.insert(0, str(APP))
+
+from ml_utils.dbscan_analyzer import (_ensure_models_on_path, load_dbscan_model, predict_cluster,
+                                      prepare_analysis_features)
+
+
+def _students(rng, n):
+    # average, presence, projects, distance, works, status; values exact in float32
+    return np.column_stack([
+        np.round(rng.uniform(6, 18, n) * 2) / 2,
+        np.round(rng.uniform(0.5, 1, n) * 4) / 4,
+        rng.integers(0, 4, n),
+        rng.integers(0, 3, n),
+        rng.integers(0, 2, n),
+        rng.integers(0, 2, n),
+    ]).astype(float)
+
+
+@pytest.fixture
+def models(tmp_path):
+    """The same fitted DBSCAN saved as JSON and as binary, each loaded back by load_dbscan_model."""
+    _ensure_models_on_path()
+    from DBSCAN import DBSCAN
+    X = _students(np.random.default_rng(0), 400)
+    dbscan = DBSCAN(eps=1.0, min_points=4)
+    dbscan.fit(X)
+    assert dbscan.labels_.max() >= 1 and (dbscan.labels_ == -1).any()
+    dbscan.save(str(tmp_path / "dbscan.json"))
+    dbscan.save_binary(str(tmp_path / "dbscan.npz"))
+    return dbscan, load_dbscan_model(tmp_path / "dbscan.json"), load_dbscan_model(tmp_path / "dbscan.npz")
+
+
+def test_binary_and_json_models_give_the_same_result(models):
+    _, from_json, from_binary = models
+    assert from_binary.X_.dtype == np.float32
+    for student in _students(np.random.default_rng(1), 30):
+        assert predict_cluster(student, from_binary) == predict_cluster(student, from_json)
+
+
+def test_cluster_is_the_nearest_training_point(models):
+    fitted, _, from_binary = models
+    X, labels = np.asarray(fitted.X_), np.asarray(fitted.labels_)
+    for student in _students(np.random.default_rng(2), 20):
+        result = predict_cluster(student, from_binary)
+        dist = np.sqrt(np.sum((X - student) ** 2, axis=1))
+        order = np.argsort(dist, kind="stable")[:5]
+        assert [n["index"] for n in result["top_k_neighbors"]] == order.tolist()
+        assert result["cluster_id"] == labels[order[0]]
+        assert result["is_noise"] == (labels[order[0]] == -1)
+        assert result["nearest_distance"] == pytest.approx(dist[order[0]])
+
+
+def test_cluster_summary(models):
+    fitted, _, from_binary = models
+    labels = np.asarray(fitted.labels_)
+    result = predict_cluster(_students(np.random.default_rng(3), 1)[0], from_binary)
+    ids, counts = np.unique(labels, return_counts=True)
+    assert result["cluster_sizes"] == {int(c): int(n) for c, n in zip(ids, counts)}
+    assert result["n_clusters"] == int(labels.max()) + 1
+    assert result["total_noise_points"] == int(np.sum(labels == -1))
+
+
+def test_form_to_cluster(models):
+    _, _, from_binary = models
+    form = {"average": "12.5", "presence": "75", "projects": "2", "distance": "5-15", "works": "Oui", "status": "Admis"}
+    result = predict_cluster(prepare_analysis_features(form), from_binary)
+    assert result["features"] == {"average": 12.5, "presence": 75.0, "projects": 2.0, "distance": "5-15km",
+                                  "works": True, "status": "Admis"}
+
+
+def test_missing_model():
+    assert predict_cluster(np.zeros(6), None)["error"] == "Model not loaded"
@@ -0,0 +1,50 @@
+"""Manifest entries must list the columns the serving code builds, in order."""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+APP = Path(__file__).resolve().parents[2]
+if str(APP) not in sys.path:
+    sys.path.insert(0, str(APP))
+
+from ml_utils.manifest import DEFAULT_MODELS, SERVING_FEATURES, ManifestEntry, model_feature_count
+from ml_utils.predictor import load_teacher_model
+
+
+class _Fitted:
+    def __init__(self, width):
+        self.X_ = np.zeros((3, width))
+
+
+def _entry(name, features):
+    return ManifestEntry(name, "_Fitted", f"{name}.json", "json", None, features)
+
+
+@pytest.mark.parametrize("name", sorted(DEFAULT_MODELS))
+def test_serving_columns_accepted(name):
+    features = SERVING_FEATURES[name]
+    _entry(name, features).check_model(_Fitted(len(features)))
+
+
+@pytest.mark.parametrize("name", sorted(DEFAULT_MODELS))
+def test_renamed_or_reordered_columns_refused(name):
+    features = list(SERVING_FEATURES[name])
+    renamed = [features[0].lower() + "_x"] + features[1:]
+    for listed in (renamed, features[::-1], features[:-1]):
+        with pytest.raises(ValueError, match="the application builds"):
+            _entry(name, listed).check_model(_Fitted(len(features)))
+
+
+def test_wider_model_refused():
+    with pytest.raises(ValueError, match="uses 7 features"):
+        _entry("dbscan", SERVING_FEATURES["dbscan"]).check_model(_Fitted(7))
+
+
+def test_feature_count_of_a_tree_model():
+    path = APP.parent / "Artifacts" / "meilleurs models" / "gradient_boosting_regressor_model_teachers.json"
+    if not path.exists():
+        pytest.skip("teacher artifact not available")
+    count = model_feature_count(load_teacher_model(str(path)))
+    assert 0 < count <= len(SERVING_FEATURES["teachers"])
@@ -0,0 +1,68 @@
+"""ModelRegistry hot reload: an artifact rewritten in place or moved to a new file by the manifest."""
+import functools
+import json
+import sys
+from pathlib import Path
+
+APP = Path(__file__).resolve().parents[2]
+if str(APP) not in sys.path:
+    sys.path.insert(0, str(APP))
+
+from ml_utils.manifest import Manifest
+from ml_utils.model_registry import ModelRegistry, _file_hash
+
+
+def _load_text(path):
+    return {"content": Path(path).read_text()}
+
+
+def _write_manifest(manifest_path, artifact):
+    entry = {"class": "dict", "path": artifact.name, "format": "json",
+             "sha256": _file_hash(artifact), "features": []}
+    manifest_path.write_text(json.dumps({"version": 1, "models": {"model": entry}}))
+
+
+def _registry(manifest):
+    registry = ModelRegistry(check_interval=0)
+    registry.register("model", functools.partial(manifest.artifact_path, "model"), _load_text,
+                      expected_hash=functools.partial(manifest.expected_hash, "model"))
+    return registry
+
+
+def test_reload_when_the_file_is_rewritten(tmp_path):
+    artifact = tmp_path / "model.json"
+    artifact.write_text("v1")
+    registry = ModelRegistry(check_interval=0)
+    registry.register("model", artifact, _load_text)
+    first = registry.get("model")
+    assert first["content"] == "v1"
+    assert registry.get("model") is first
+    artifact.write_text("v2 longer")
+    assert registry.get("model")["content"] == "v2 longer"
+
+
+def test_reload_when_the_manifest_moves_the_entry(tmp_path):
+    old, new = tmp_path / "model.json", tmp_path / "model_12arbres.json"
+    old.write_text("ten trees")
+    manifest_path = tmp_path / "manifest.json"
+    _write_manifest(manifest_path, old)
+    registry = _registry(Manifest(manifest_path))
+    assert registry.get("model")["content"] == "ten trees"
+
+    # continuer_boosting writes a new file and moves the entry; the old file is left untouched
+    new.write_text("twelve trees")
+    _write_manifest(manifest_path, new)
+    assert registry.get("model")["content"] == "twelve trees"
+    assert registry.version("model") == _file_hash(new)
+    assert registry.reload("model")["content"] == "twelve trees"
+
+
+def test_artifact_not_matching_the_manifest_is_not_served(tmp_path):
+    artifact = tmp_path / "model.json"
+    artifact.write_text("v1")
+    manifest_path = tmp_path / "manifest.json"
+    _write_manifest(manifest_path, artifact)
+    registry = _registry(Manifest(manifest_path))
+    assert registry.get("model")["content"] == "v1"
+    artifact.write_text("v2 deployed without refreshing the manifest")
+    assert registry.get("model")["content"] == "v1"
@@ -0,0 +1,113 @@
+"""Room ranking memoization: LRU order, and invalidation when resources.csv or the room model changes."""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+APP = Path(__file__).resolve().parents[2]
+if str(APP) not in sys.path:
+    sys.path.insert(0, str(APP))
+
+from ml_utils import predictor
+from ml_utils.lru_cache import LRUCache
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = LRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "b" is now the least recently used
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    stats = cache.stats()
+    assert (stats["size"], stats["evictions"], stats["hits"], stats["misses"]) == (2, 1, 3, 1)
+
+
+def test_new_generation_drops_every_entry():
+    cache = LRUCache(maxsize=4)
+    cache.validate("g1")
+    cache.put("a", 1, "g1")
+    cache.validate("g1")
+    assert cache.get("a") == 1
+    cache.validate("g2")
+    assert cache.get("a") is None
+    assert cache.stats()["invalidations"] == 1
+    cache.put("b", 2, "g1")  # computed for a generation that is no longer current
+    assert len(cache) == 0
+
+
+class _RoomModel:
+    def predict(self, X):
+        return np.asarray(X)[:, 1]  # Capacite
+
+
+class _NoTeachers:
+    def get(self, *args, **kwargs):
+        return self
+
+    def top(self, *args, **kwargs):
+        return []
+
+
+@pytest.fixture
+def rooms(tmp_path, monkeypatch):
+    """predict_top_rooms_and_teachers on a copy of resources.csv, counting dataset loads and room scorings."""
+    csv = tmp_path / "resources.csv"
+    csv.write_bytes((APP.parent / "Datasets" / "resources.csv").read_bytes())
+    counts = {"loads": 0, "rankings": 0}
+
+    def load_datasets():
+        counts["loads"] += 1
+        return (pd.read_csv(csv),)
+
+    rank_rooms = predictor._rank_rooms
+
+    def counted_rank_rooms(*args):
+        counts["rankings"] += 1
+        return rank_rooms(*args)
+
+    monkeypatch.setattr(predictor, "resources_csv_path", lambda: csv)
+    monkeypatch.setattr(predictor, "load_datasets", load_datasets)
+    monkeypatch.setattr(predictor, "_rank_rooms", counted_rank_rooms)
+    monkeypatch.setattr(predictor, "ROOM_CACHE", LRUCache(maxsize=8))
+    monkeypatch.setattr(predictor, "TEACHER_RANKINGS", _NoTeachers())
+    monkeypatch.setattr(predictor, "_resources", None)
+
+    def top(model, **form):
+        form = {"Nb_personnes": 40, "Type_cours": "CM", "filiere": "GIT", **form}
+        return predictor.predict_top_rooms_and_teachers(form, model, None)["rooms"]
+
+    return top, counts, csv
+
+
+def test_same_form_key_is_scored_once(rooms):
+    top, counts, _ = rooms
+    model = _RoomModel()
+    first = top(model)
+    assert top(model) == first
+    assert top(model, niveau="L3", nom_matiere="Maths") == first  # fields room scoring does not read
+    assert counts == {"loads": 1, "rankings": 1}
+    top(model, Nb_personnes=10)
+    assert counts == {"loads": 1, "rankings": 2}  # new key, same prepared resources
+
+
+def test_rescored_when_resources_file_changes(rooms):
+    top, counts, csv = rooms
+    model = _RoomModel()
+    top(model)
+    frame = pd.read_csv(csv)
+    frame.loc[0, "Capacite"] = 10_000
+    frame.to_csv(csv, index=False)
+    best = top(model)[0]
+    assert counts == {"loads": 2, "rankings": 2}
+    assert best["data"]["Capacite"] == 10_000
+
+
+def test_rescored_when_model_instance_changes(rooms):
+    top, counts, _ = rooms
+    top(_RoomModel())
+    top(_RoomModel())  # a registry reload hands out a new instance
+    assert counts["rankings"] == 2
@@ -0,0 +1,94 @@
+"""On-disk teacher ranking cache: reused across stores, ignored when the model version or a dataset changes."""
+import shutil
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+APP = Path(__file__).resolve().parents[2]
+if str(APP) not in sys.path:
+    sys.path.insert(0, str(APP))
+
+from ml_utils.teacher_ranking import TeacherRankingStore
+
+
+class _TeacherModel:
+    def predict(self, X):
+        return np.asarray(X, dtype=float).sum(axis=1)
+
+
+@pytest.fixture
+def datasets(tmp_path):
+    """Copies of the three dataset files and a loader counting its calls."""
+    data = APP.parent / "Datasets"
+    paths = tuple(tmp_path / name for name in ("resources.csv", "teachers.csv", "courses.csv"))
+    for path in paths:
+        shutil.copy(data / path.name, path)
+    calls = []
+
+    def load():
+        calls.append(1)
+        return tuple(pd.read_csv(path) for path in paths)
+
+    return paths, load, calls
+
+
+def _no_datasets():
+    raise AssertionError("the ranking should have been read from the cache")
+
+
+def _ranking(store, version, load):
+    return store.get(_TeacherModel(), model_version=version, datasets=load)
+
+
+def test_second_store_reads_the_persisted_ranking(tmp_path, datasets):
+    paths, load, calls = datasets
+    cache_dir = tmp_path / "rankings"
+    built = _ranking(TeacherRankingStore(cache_dir, paths), "v1", load)
+    assert len(calls) == 1 and len(list(cache_dir.glob("teachers_*.json"))) == 1
+
+    loaded = _ranking(TeacherRankingStore(cache_dir, paths), "v1", _no_datasets)
+    assert loaded.version == built.version
+    assert loaded.ids.tolist() == built.ids.tolist()
+    np.testing.assert_array_equal(loaded.scores, built.scores)
+    assert [row for _, _, row in loaded.top(5)] == [row for _, _, row in built.top(5)]
+
+
+def test_other_model_version_is_rebuilt(tmp_path, datasets):
+    paths, load, calls = datasets
+    cache_dir = tmp_path / "rankings"
+    first = _ranking(TeacherRankingStore(cache_dir, paths), "v1", load)
+    second = _ranking(TeacherRankingStore(cache_dir, paths), "v2", load)
+    assert len(calls) == 2
+    assert second.version != first.version
+    assert len(list(cache_dir.glob("teachers_*.json"))) == 2
+
+
+def test_changed_dataset_is_rebuilt(tmp_path, datasets):
+    paths, load, calls = datasets
+    cache_dir = tmp_path / "rankings"
+    _ranking(TeacherRankingStore(cache_dir, paths), "v1", load)
+    teachers = pd.read_csv(paths[1]).iloc[:-1]
+    teachers.to_csv(paths[1], index=False)
+    _ranking(TeacherRankingStore(cache_dir, paths), "v1", load)
+    assert len(calls) == 2
+
+
+def test_same_store_keeps_the_ranking_in_memory(tmp_path, datasets):
+    paths, load, calls = datasets
+    store = TeacherRankingStore(tmp_path / "rankings", paths)
+    model = _TeacherModel()
+    ranking = store.get(model, model_version="v1", datasets=load)
+    assert store.get(model, model_version="v1", datasets=_no_datasets) is ranking
+    assert len(calls) == 1
+
+
+def test_unversioned_ranking_is_not_persisted(tmp_path, datasets):
+    paths, load, calls = datasets
+    cache_dir = tmp_path / "rankings"
+    _ranking(TeacherRankingStore(cache_dir, paths), None, load)
+    _ranking(TeacherRankingStore(cache_dir, paths), None, load)
+    assert len(calls) == 2
+    assert not cache_dir.exists()
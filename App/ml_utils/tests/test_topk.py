@@ -0,0 +1,52 @@
+"""top_k_unique must match a full stable sort followed by first-row-per-id deduplication."""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+APP = Path(__file__).resolve().parents[2]
+if str(APP) not in sys.path:
+    sys.path.insert(0, str(APP))
+
+from ml_utils.topk import top_k_unique
+
+
+def full_sort_reference(ids, scores, k=None):
+    # the original ranking: sort every row by decreasing score (NaN last), keep the first row of each id
+    key = [(-s if s == s else np.inf) for s in scores]
+    order = sorted(range(len(ids)), key=lambda i: key[i])
+    seen, winners = set(), []
+    for i in order:
+        if ids[i] not in seen:
+            seen.add(ids[i])
+            winners.append(i)
+    return winners if k is None else winners[:k]
+
+
+def tie_heavy_cases():
+    rng = np.random.default_rng(0)
+    for n, n_ids, n_scores in [(50, 10, 3), (200, 40, 5), (200, 200, 2), (500, 7, 4), (30, 30, 1)]:
+        ids = rng.integers(0, n_ids, size=n)
+        scores = rng.integers(0, n_scores, size=n).astype(float)
+        scores[rng.random(n) < 0.1] = np.nan
+        yield ids, scores
+
+
+@pytest.mark.parametrize("case", list(tie_heavy_cases()))
+@pytest.mark.parametrize("k", [None, 0, 1, 3, 8, 25, 1000])
+def test_matches_full_sort(case, k):
+    ids, scores = case
+    expected = full_sort_reference(ids.tolist(), scores.tolist(), k)
+    assert top_k_unique(ids, scores, k).tolist() == expected
+
+
+def test_string_and_mixed_ids():
+    ids = ["b", "a", "b", 3, "a", 3, "c"]
+    scores = [1.0, 1.0, 2.0, 1.0, 2.0, 2.0, np.nan]
+    for k in (None, 1, 2, 4):
+        assert top_k_unique(ids, scores, k).tolist() == full_sort_reference(ids, scores, k)
+
+
+def test_empty():
+    assert top_k_unique([], [], 5).tolist() == []
@@ -0,0 +1,89 @@
+"""Vectorized helpers to rank scored candidate rows.
+
+The recommender scores every joined row of a table and keeps the best ``k``
+distinct ids. ``top_k_unique`` selects them with ``np.argpartition`` and only sorts
+and deduplicates the winning slice, so the work after scoring grows with ``k``
+rather than with the number of candidates. ``numeric_columns`` replaces the
+per-row ``float(row.get(...))`` loops used to build feature matrices.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def numeric_columns(frame, columns):
+    """Float matrix of ``columns`` ({name: default}) and the mask of rows that converted.
+
+    A missing column takes its default for every row. A row is invalid if one of
+    its values cannot be converted to float; NaN values stay NaN, as with
+    ``float(row.get(name, default))``.
+    """
+    n = len(frame)
+    X = np.empty((n, len(columns)), dtype=float)
+    valid = np.ones(n, dtype=bool)
+    for j, (name, default) in enumerate(columns.items()):
+        if name not in frame.columns:
+            X[:, j] = float(default)
+            continue
+        raw = frame[name]
+        converted = pd.to_numeric(raw, errors="coerce")
+        valid &= ~(converted.isna() & raw.notna()).to_numpy()
+        X[:, j] = converted.to_numpy(dtype=float, na_value=np.nan)
+    return X, valid
+
+
+def first_present(frame, columns, default):
+    """Per-row first truthy value among ``columns``, like ``row.get(a) or row.get(b, default)``."""
+    result = np.full(len(frame), default, dtype=object)
+    pending = np.ones(len(frame), dtype=bool)
+    for name in columns:
+        if name not in frame.columns:
+            continue
+        values = frame[name].to_numpy(dtype=object)
+        truthy = np.fromiter((bool(v) for v in values), dtype=bool, count=len(values))
+        take = pending & truthy
+        result[take] = values[take]
+        pending &= ~truthy
+    return result
+
+
+def _first_occurrences(ids):
+    # index of the first occurrence of each distinct id
+    try:
+        _, first = np.unique(ids, return_index=True)
+    except TypeError:
+        # ids of mixed, unorderable types: plain first-seen scan of the (small) slice
+        seen = {}
+        for i, v in enumerate(ids):
+            seen.setdefault(v, i)
+        first = np.fromiter(seen.values(), dtype=np.intp, count=len(seen))
+    return np.sort(first)
+
+
+def top_k_unique(ids, scores, k=None):
+    """Positions of the ``k`` best-scored distinct ids, best first (all distinct ids if k is None).
+
+    Same result as a stable sort by decreasing score followed by keeping the first
+    row of each id: ties keep their original order and NaN scores rank last.
+    Only the ``m`` highest scores are sorted and deduplicated. ``m`` starts at ``k``
+    and doubles while duplicate ids leave fewer than ``k`` distinct winners.
+    """
+    ids = np.asarray(ids, dtype=object)
+    scores = np.asarray(scores, dtype=float)
+    scores = np.where(np.isnan(scores), -np.inf, scores)
+    n = len(scores)
+    if n == 0 or (k is not None and k <= 0):
+        return np.empty(0, dtype=np.intp)
+    m = n if k is None else min(k, n)
+    while True:
+        if m < n:
+            kth = scores[np.argpartition(scores, n - m)[n - m]]  # m-th largest score
+            # every row tied with the m-th score is kept: ties are resolved by position below
+            candidates = np.flatnonzero(scores >= kth)
+        else:
+            candidates = np.arange(n)
+        order = candidates[np.argsort(-scores[candidates], kind="stable")]
+        winners = order[_first_occurrences(ids[order])]
+        if m >= n or len(winners) >= k:
+            return winners if k is None else winners[:k]
+        m = min(n, 2 * m)
@@ -2,20 +2,18 @@ from django.shortcuts import render
 from django.views.decorators.http import require_http_methods
 from django.http import JsonResponse
 
-from ml_utils.predictor import load_models, predict_top_rooms_and_teachers
+from ml_utils.predictor import predict_top_rooms_and_teachers
+from ml_utils.model_registry import default_registry
 from ml_utils.data_prep import load_datasets, parse_planning_file
 import pandas as pd
 import json
 from pathlib import Path
 
-# Paths to trained models (adjust if your files are elsewhere)
-ROOT = Path(__file__).resolve().parents[1]
-DT_MODEL_PATH = ROOT / ".." / "Training&Saving" / "decision_tree_class_model.json"
-GB_MODEL_PATH = ROOT / ".." / "Training&Saving" / "gradient_boosting_regressor_model_teachers.json"
 
-
-# load models once at import (or lazy-load inside the view)
-dt_model, gb_model = load_models(str(DT_MODEL_PATH), str(GB_MODEL_PATH))
+# Models are declared by the artifact manifest (Artifacts/manifest.json) and loaded
+# by the registry on the first request that uses them, once per process; they are
+# reloaded automatically when a retrained artifact and its manifest entry are deployed.
+registry = default_registry()
 
 
 @require_http_methods(["GET", "POST"])
@@ -48,7 +46,10 @@ def recommendation_view(request):
         }
 
         try:
-            result = predict_top_rooms_and_teachers(form_data, dt_model, gb_model, top_n=3)
+            dt_model = registry.get("rooms")
+            gb_model = registry.get("teachers")
+            result = predict_top_rooms_and_teachers(form_data, dt_model, gb_model, top_n=3,
+                                                    gb_model_version=registry.version("teachers"))
 
             # annotate results with stars and ensure dict-like access in template
             def annotate(items):
@@ -0,0 +1,196 @@
+import json
+
+# Sauvegarde JSON des arbres a objets Node (decisionTreeRegressor,
+# GradientBoostingRegressor, XGBoostRegressor, RandomForestRegressor) sans recursion.
+# Les noeuds d'un arbre sont ecrits en ordre prefixe, une ligne par noeud:
+#     [enfants, feature, threshold, prediction(, champs optionnels)]
+# ou enfants vaut 1 (enfant gauche) + 2 (enfant droit): le sous-arbre gauche suit
+# directement son parent, puis le sous-arbre droit. La premiere ligne du fichier
+# contient les hyperparametres:
+#     {"format_arbres": "preordre", "champs": [...], <hyperparametres>, "forest": [
+#     [
+#     [3, 0, 1.5, 12.0],
+#     ...
+#     ]
+#     ]}
+# Le fichier reste un JSON valide. L'ecriture et la lecture se font au fil du
+# fichier (un arbre en memoire a la fois, jamais de gros dictionnaire imbrique).
+# Les anciens fichiers imbriques ('left' / 'right' dans chaque noeud) sont
+# toujours lus, par un parcours iteratif.
+
+FORMAT_PREORDRE = "preordre"
+CHAMPS = ("feature", "threshold", "prediction")
+GAUCHE, DROITE = 1, 2
+TAILLE_TAMPON = 4096  # lignes ecrites par appel a write
+
+
+def _texte(valeur, type_=float):
+    # nombre -> texte JSON, comme json.dumps (None -> null, NaN / infini acceptes)
+    if valeur is None:
+        return "null"
+    valeur = type_(valeur)
+    if valeur != valeur or valeur in (float("inf"), float("-inf")):
+        return json.dumps(valeur)
+    return repr(valeur)
+
+
+def _ecrire_arbre(f, racine, optionnels):
+    # parcours prefixe iteratif, lignes separees par ",\n"
+    tampon, pile = [], [racine]
+    while pile:
+        node = pile.pop()
+        enfants = (GAUCHE if node.left is not None else 0) | (DROITE if node.right is not None else 0)
+        valeurs = [_texte(node.feature, int), _texte(node.threshold), _texte(node.prediction)]
+        valeurs += [_texte(getattr(node, champ, None)) for champ in optionnels]
+        tampon.append(f"[{enfants}, {', '.join(valeurs)}]")
+        if node.right is not None:
+            pile.append(node.right)
+        if node.left is not None:
+            pile.append(node.left)
+        if len(tampon) >= TAILLE_TAMPON and pile:
+            f.write(",\n".join(tampon) + ",\n")
+            tampon = []
+    f.write(",\n".join(tampon))
+
+
+def sauver_arbres(nom, entete, arbres, cle="forest", optionnels=()):
+    """
+    Ecrit un modele au format preordre, au fil du fichier
+
+    Args:
+        nom: fichier JSON de sortie
+        entete: hyperparametres (dictionnaire JSON)
+        arbres: liste de racines (foret) ou une racine seule (arbre unique, None si non entraine)
+        cle: cle JSON des arbres ('forest', 'root'...)
+        optionnels: attributs de Node ecrits en plus de CHAMPS s'ils existent (ex: 'gain')
+    """
+    entete = {"format_arbres": FORMAT_PREORDRE, "champs": list(CHAMPS + tuple(optionnels)), **entete}
+    unique = not isinstance(arbres, list)
+    with open(nom, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(entete, ensure_ascii=False)[:-1] + f', "{cle}": [\n')
+        if unique:
+            if arbres is not None:
+                _ecrire_arbre(f, arbres, optionnels)
+        else:
+            for i, racine in enumerate(arbres):
+                f.write("[\n")
+                _ecrire_arbre(f, racine, optionnels)
+                f.write("\n],\n" if i < len(arbres) - 1 else "\n]")
+        f.write("\n]}\n")
+
+
+def _construire(lignes, classe_node, champs):
+    # inverse de _ecrire_arbre: pile des places (parent, enfant droit ?) encore libres
+    optionnels = champs[len(CHAMPS):]
+    racine, pile = None, []
+    for ligne in lignes:
+        node = classe_node()
+        node.feature, node.threshold, node.prediction = ligne[1], ligne[2], ligne[3]
+        for champ, valeur in zip(optionnels, ligne[4:]):
+            if valeur is not None:
+                setattr(node, champ, valeur)
+        node.left = node.right = None
+        if pile:
+            parent, droit = pile.pop()
+            if droit:
+                parent.right = node
+            else:
+                parent.left = node
+        else:
+            racine = node
+        if ligne[0] & DROITE:
+            pile.append((node, True))
+        if ligne[0] & GAUCHE:
+            pile.append((node, False))  # depile en premier: le sous-arbre gauche suit son parent
+    return racine
+
+
+def depuis_dict(d, classe_node, optionnels=()):
+    """Arbre imbrique (ancien format: 'left' / 'right' dans chaque noeud) -> objets Node, sans recursion"""
+    if d is None:
+        return None
+    racine = classe_node()
+    pile = [(d, racine)]
+    while pile:
+        d, node = pile.pop()
+        node.feature, node.threshold, node.prediction = d.get('feature'), d.get('threshold'), d.get('prediction')
+        for champ in optionnels:
+            if d.get(champ) is not None:
+                setattr(node, champ, d[champ])
+        for cote in ('left', 'right'):
+            enfant = None
+            if d.get(cote) is not None:
+                enfant = classe_node()
+                pile.append((d[cote], enfant))
+            setattr(node, cote, enfant)
+    return racine
+
+
+def _lire_flux(f, premiere, classe_node, cle, unique):
+    # lecture au fil des lignes d'un fichier ecrit par sauver_arbres; None si la mise en page differe
+    fin = f', "{cle}": ['
+    if not premiere.rstrip().endswith(fin):
+        return None
+    try:
+        entete = json.loads(premiere.rstrip()[:-len(fin)] + "}")
+    except ValueError:
+        return None
+    if entete.get("format_arbres") != FORMAT_PREORDRE:
+        return None
+    champs = entete.get("champs", list(CHAMPS))
+    arbres, lignes = [], []
+    for ligne in f:
+        ligne = ligne.strip()
+        if not ligne:
+            continue
+        if ligne == "]}":
+            break
+        if not unique and ligne == "[":
+            lignes = []
+        elif not unique and ligne in ("]", "],"):
+            # un arbre complet: une seule analyse JSON pour toutes ses lignes
+            arbres.append(_construire(json.loads("[" + "".join(lignes) + "]"), classe_node, champs))
+        else:
+            lignes.append(ligne)
+    else:
+        return None  # fichier tronque
+    if unique:
+        return entete, [_construire(json.loads("[" + "".join(lignes) + "]"), classe_node, champs)]
+    return entete, arbres
+
+
+def charger_arbres(nom, classe_node, cle="forest", unique=False, optionnels=()):
+    """
+    Lit un modele ecrit par sauver_arbres, ou au format imbrique d'origine
+
+    Args:
+        nom: fichier JSON
+        classe_node: classe Node du module du modele
+        cle: cle JSON des arbres
+        unique: arbre seul (retourne une racine, None si absente) au lieu d'une liste
+        optionnels: attributs supplementaires des noeuds de l'ancien format (ex: 'gain')
+
+    Returns:
+        (entete, arbres): hyperparametres du fichier et racine(s) reconstruites
+    """
+    with open(nom, 'r', encoding='utf-8') as f:
+        lu = _lire_flux(f, f.readline(), classe_node, cle, unique)
+        if lu is None:
+            f.seek(0)
+            data = json.load(f)
+    if lu is not None:
+        entete, arbres = lu
+    elif isinstance(data, dict) and data.get("format_arbres") == FORMAT_PREORDRE:
+        # format preordre remis en forme (indentation...): lecture complete
+        champs = data.get("champs", list(CHAMPS))
+        entete = {k: v for k, v in data.items() if k != cle}
+        lignes = data.get(cle) or []
+        arbres = [_construire(lignes, classe_node, champs)] if unique else [_construire(a, classe_node, champs) for a in lignes]
+    elif unique and (data is None or cle not in data):
+        entete, arbres = {}, [depuis_dict(data, classe_node, optionnels)]  # ancien arbre seul: le fichier est la racine
+    else:
+        entete = {k: v for k, v in data.items() if k != cle}
+        arbres = [depuis_dict(d, classe_node, optionnels) for d in data.get(cle) or []]
+    if unique:
+        return entete, (arbres[0] if arbres else None)
+    return entete, arbres
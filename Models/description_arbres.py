@@ -0,0 +1,90 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+
+_MODELS_DIR = str(Path(__file__).resolve().parent)
+if _MODELS_DIR not in sys.path:
+    sys.path.insert(0, _MODELS_DIR)
+from node_table import lire_classification, lire_node, lire_regression
+
+# Description commune des modeles a arbres, pour le code qui les transforme sans
+# re-entrainer (modele_compact, tree_compiler, tree_simplifier, convertir_binaire):
+#  - decrire ramene un modele a ses arbres et a la facon de les combiner;
+#  - donnees_verification genere les lignes sur lesquelles une autre forme des
+#    arbres (compacte, compilee, simplifiee...) est comparee au predict d'origine.
+
+
+def decrire(modele):
+    """
+    Ramene un modele entraine a (arbres, lire, mode, init, learning_rate)
+
+    mode: 'arbre' (un seul arbre), 'somme' (boosting: init + learning_rate * somme),
+    'moyenne' (foret de regression) ou 'vote' (foret de classification, 0/1 a la majorite)
+    """
+    if hasattr(modele, "forest") and hasattr(modele, "init") and hasattr(modele, "learning_rate"):
+        if modele.init is None:
+            raise ValueError("Le modèle n'a pas été entraîné. Appelez fit() d'abord.")
+        return list(modele.forest), lire_node, "somme", float(modele.init), float(modele.learning_rate)
+    if hasattr(modele, "arbres") and hasattr(modele, "moyenne_initiale"):
+        return list(modele.arbres), lire_regression, "somme", float(modele.moyenne_initiale), float(modele.lr)
+    if hasattr(modele, "forest") and hasattr(modele, "nb_arbre"):
+        return list(modele.forest[:modele.nb_arbre]), lire_classification, "vote", None, None
+    if hasattr(modele, "forest"):
+        return list(modele.forest), lire_node, "moyenne", None, None
+    for attribut, lecture in (("root", lire_node), ("racine", lire_classification), ("arbre", lire_regression)):
+        if hasattr(modele, attribut):
+            if getattr(modele, attribut) is None:
+                raise ValueError("Le modèle n'a pas été entraîné. Appelez fit() d'abord.")
+            return [getattr(modele, attribut)], lecture, "arbre", None, None
+    raise TypeError(f"Modèle à arbres non reconnu: {type(modele).__name__}")
+
+
+def donnees_verification(tables, n_lignes=2048, random_state=0, voisins_exacts=False):
+    """
+    Lignes de test: n_lignes lignes tirees au hasard, plus une ligne par feuille de chaque arbre
+
+    Chaque colonne des lignes tirees prend un seuil des arbres, le milieu de deux seuils
+    consecutifs ou une valeur hors bornes. Les lignes des feuilles suivent le chemin de
+    la racine a la feuille (valeur egale au seuil a gauche, au-dessus a droite).
+
+    Args:
+        tables: TableNoeuds des arbres
+        voisins_exacts: tirer aussi le float64 juste en dessous et juste au-dessus de chaque
+            seuil, pour une forme qui doit reproduire predict exactement (tree_compiler);
+            pas pour les seuils float32 de modele_compact, arrondis vers le haut
+    """
+    internes = [(t.feature[t.left >= 0], t.threshold[t.left >= 0]) for t in tables]
+    n_features = 1 + max([int(f.max()) for f, _ in internes if f.size] + [0])
+    rng = np.random.default_rng(random_state)
+    colonnes = []
+    for j in range(n_features):
+        seuils = np.unique(np.concatenate([s[f == j] for f, s in internes] + [np.empty(0)]))
+        if seuils.size == 0:
+            seuils = np.zeros(1)
+        candidats = [seuils, (seuils[:-1] + seuils[1:]) / 2, [seuils[0] - 1, seuils[-1] + 1]]
+        if voisins_exacts:
+            candidats += [np.nextafter(seuils, -np.inf), np.nextafter(seuils, np.inf)]
+        colonnes.append(rng.choice(np.concatenate(candidats), size=n_lignes))
+    X_aleatoire = np.column_stack(colonnes)
+
+    chemins = []
+    for table in tables:
+        # bornes (basse exclue, haute incluse) de chaque feature le long du chemin
+        pile = [(0, np.full(n_features, -np.inf), np.full(n_features, np.inf))]
+        while pile:
+            numero, basse, haute = pile.pop()
+            if table.left[numero] < 0:
+                ligne = X_aleatoire[rng.integers(n_lignes)].copy()
+                hors = (ligne <= basse) | (ligne > haute)
+                ligne[hors] = np.where(np.isfinite(haute[hors]), haute[hors], basse[hors] + 1)
+                chemins.append(ligne)
+                continue
+            f, seuil = table.feature[numero], table.threshold[numero]
+            haute_gauche = haute.copy()
+            haute_gauche[f] = min(haute[f], seuil)
+            basse_droite = basse.copy()
+            basse_droite[f] = max(basse[f], seuil)
+            pile.append((table.left[numero], basse, haute_gauche))
+            pile.append((table.right[numero], basse_droite, haute))
+    return np.vstack([X_aleatoire] + chemins) if chemins else X_aleatoire
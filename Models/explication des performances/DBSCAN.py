@@ -1,5 +1,22 @@
 import numpy as np
 import json
+import sys
+from pathlib import Path
+
+_MODELS_DIR = str(Path(__file__).resolve().parents[1])  # dossier Models (format binaire partagé entre les modèles)
+if _MODELS_DIR not in sys.path:
+    sys.path.insert(0, _MODELS_DIR)
+from format_binaire import sauver_binaire, charger_binaire
+from index_spatial import MEMOIRE_BLOC, construire_index, nombre_voisins, voisinages
+
+
+def _type_labels(n_clusters):
+    # plus petit entier signe pouvant contenir -1 (bruit) et tous les numeros de cluster
+    for type_ in (np.int8, np.int16, np.int32):
+        if n_clusters - 1 <= np.iinfo(type_).max:
+            return type_
+    return np.int64
+
 
 class DBSCAN:
     def __init__(self, eps=1, min_points=5):  
@@ -7,10 +24,24 @@ class DBSCAN:
         self.min_points = min_points       # nombre min de points pour former un cluster
         self.labels_ = None  # Pour stocker les labels des clusters 
         self.X_ = None     # pour stocker les données d'entrainement 
+        self.core_mask_ = None  # résumé calculé par resumer_clusters (points coeurs, statistiques par cluster)
+        self._index = None  # index spatial de X pendant fit (voir index_spatial.py)
     
-    def fit(self, X):
+    def fit(self, X, neighbors_algorithm='brute', memoire_bloc=MEMOIRE_BLOC):
+        """
+        Args:
+            X: données, shape (n_samples, n_features)
+            neighbors_algorithm: recherche des voisins: 'brute' (exhaustive), 'kdtree'
+                (arbre k-d), 'grid' (grille de pas eps) ou 'chunked' (tous les voisinages
+                calculés par blocs, voir fit_voisinages); les labels sont identiques
+            memoire_bloc: octets max des tableaux temporaires d'un bloc ('chunked')
+        """
         X = np.array(X, dtype=float)
         self.X_ = X
+        self.core_mask_ = None
+        self._index = construire_index(neighbors_algorithm, X, self.eps)
+        if neighbors_algorithm == 'chunked':
+            return self.fit_voisinages(*voisinages(X, self.eps, memoire_bloc))
         n_samples = X.shape[0]
         
         # Initialisation des labels (-1 = bruit, 0 ou plus = cluster)
@@ -33,10 +64,44 @@ class DBSCAN:
                 self.expand_cluster(i, voisins, cluster_id, X)
                 cluster_id += 1
         
+        self._index = None
         return self
+
+    def fit_voisinages(self, debuts, indices):
+        """
+        Construit les clusters à partir des voisinages de tous les points de X_
+        (format CSR de index_spatial.voisinages), sans rappeler get_voisins
+
+        L'expansion d'un cluster avance par fronts: les voisins de tous les points
+        coeurs du front sont lus en une fois et seuls les points encore non
+        visités sont ajoutés (une seule fois). Les labels sont ceux de fit.
+        Le masque des points coeurs et le résumé des clusters sont remplis au passage.
+        """
+        n_samples = len(debuts) - 1
+        coeur = np.diff(debuts) >= self.min_points
+        self.labels_ = np.full(n_samples, -1)
+        cluster_id = 0
+        for i in np.flatnonzero(coeur):
+            if self.labels_[i] != -1:
+                continue
+            self.labels_[i] = cluster_id
+            front = np.array([i])
+            while front.size:
+                longueurs = debuts[front + 1] - debuts[front]
+                # positions des voisins du front dans indices: debuts[p] + 0..longueur-1
+                positions = np.repeat(debuts[front] - np.cumsum(longueurs) + longueurs, longueurs) \
+                    + np.arange(longueurs.sum())
+                nouveaux = np.unique(indices[positions])
+                nouveaux = nouveaux[self.labels_[nouveaux] == -1]
+                self.labels_[nouveaux] = cluster_id
+                front = nouveaux[coeur[nouveaux]]
+            cluster_id += 1
+        return self.resumer_clusters(core_mask=coeur)
     
     def get_voisins(self, point_idx, X):
         """Retourne les indices des voisins d'un point"""
+        if self._index is not None:
+            return self._index.voisins(point_idx)
         voisins = []
         
         for i in range(X.shape[0]):
@@ -53,20 +118,21 @@ class DBSCAN:
         """Étend le cluster en explorant les voisins"""
         self.labels_[point_idx] = cluster_id
         
+        # Un point reçoit le label du cluster dès son ajout à la file: il n'y est
+        # ajouté qu'une fois et ses voisins ne sont cherchés qu'une fois
+        file = [v for v in voisins if self.labels_[v] == -1]
+        self.labels_[file] = cluster_id
+        
         i = 0
-        while i < len(voisins):
-            voisin_idx = voisins[i]
+        while i < len(file):
+            # Trouver les voisins de ce voisin
+            nouveaux_voisins = self.get_voisins(file[i], X)
             
-            # Si pas encore visité
-            if self.labels_[voisin_idx] == -1:
-                self.labels_[voisin_idx] = cluster_id
-                
-                # Trouver les voisins de ce voisin
-                nouveaux_voisins = self.get_voisins(voisin_idx, X)
-                
-                # Si c'est un core point, ajouter ses voisins
-                if len(nouveaux_voisins) >= self.min_points:
-                    voisins.extend(nouveaux_voisins)
+            # Si c'est un core point, ajouter ses voisins pas encore visités
+            if len(nouveaux_voisins) >= self.min_points:
+                nouveaux = [v for v in nouveaux_voisins if self.labels_[v] == -1]
+                self.labels_[nouveaux] = cluster_id
+                file.extend(nouveaux)
             
             i += 1
 
@@ -102,9 +168,9 @@ class DBSCAN:
         
         return np.array(new_labels)
     
-    def fit_predict(self, X):
+    def fit_predict(self, X, neighbors_algorithm='brute', memoire_bloc=MEMOIRE_BLOC):
         # Entraîne et retourne les labels en une seule étape
-        self.fit(X)
+        self.fit(X, neighbors_algorithm, memoire_bloc)
         return self.labels_
 
 
@@ -122,8 +188,8 @@ class DBSCAN:
         modele = {
             'eps': self.eps,
             'min_points' : self.min_points,
-            'labels_': self.labels_,
-            'donnees': self.X_,
+            'labels_': np.asarray(self.labels_).tolist(),
+            'donnees': np.asarray(self.X_).tolist(),
         }
         
         with open(nom_fichier, 'w', encoding='utf-8') as f:
@@ -150,4 +216,79 @@ class DBSCAN:
         
         return self
 
+    def resumer_clusters(self, core_mask=None):
+        """
+        Calcule le résumé stocké avec le modèle par save_binary
+
+        Args:
+            core_mask: masque des points coeurs déjà connu (sinon recalculé, en O(n²) distances)
+
+        Attributs remplis:
+            core_mask_: True pour les points coeurs (au moins min_points voisins à distance <= eps)
+            cluster_sizes_: effectif de chaque cluster (le bruit est le reste des points)
+            cluster_centers_, cluster_min_, cluster_max_: moyenne et bornes des points de chaque cluster
+        """
+        if self.labels_ is None:
+            raise ValueError("Le modèle n'a pas encore été entraîné. Appelez fit() d'abord.")
+        X = np.asarray(self.X_, dtype=float)
+        labels = np.asarray(self.labels_, dtype=np.int64)
+        n_clusters = int(labels.max()) + 1 if labels.size else 0
+        dans_cluster = labels >= 0
+
+        if core_mask is None:
+            core_mask = nombre_voisins(X, self.eps) >= self.min_points
+        self.core_mask_ = np.asarray(core_mask, dtype=bool)
+        self.cluster_sizes_ = np.bincount(labels[dans_cluster], minlength=n_clusters).astype(np.int32)
+        sommes = np.zeros((n_clusters, X.shape[1]))
+        np.add.at(sommes, labels[dans_cluster], X[dans_cluster])
+        self.cluster_centers_ = sommes / np.maximum(self.cluster_sizes_, 1)[:, None]
+        self.cluster_min_ = np.full((n_clusters, X.shape[1]), np.inf)
+        self.cluster_max_ = np.full((n_clusters, X.shape[1]), -np.inf)
+        np.minimum.at(self.cluster_min_, labels[dans_cluster], X[dans_cluster])
+        np.maximum.at(self.cluster_max_, labels[dans_cluster], X[dans_cluster])
+        return self
+
+    def save_binary(self, nom_fichier):
+        """
+        Sauvegarde le modèle au format binaire compact (.npz, voir format_binaire.py):
+        points en float32, labels dans le plus petit type entier suffisant, masque
+        des points coeurs et statistiques par cluster (resumer_clusters)
+
+        Args:
+            nom_fichier: Chemin du fichier de sauvegarde (ex: 'modele.npz')
+        """
+        if self.labels_ is None:
+            raise ValueError("Aucun modèle à sauvegarder. Entraînez d'abord avec fit().")
+        if self.core_mask_ is None or len(self.core_mask_) != len(self.labels_):
+            self.resumer_clusters()
 
+        labels = np.asarray(self.labels_)
+        n_clusters = int(labels.max()) + 1 if labels.size else 0
+        sauver_binaire(self, nom_fichier, tableaux={
+            'labels_': labels.astype(_type_labels(n_clusters)),
+            'X_': np.asarray(self.X_, dtype=np.float32),
+            'core_mask_': np.asarray(self.core_mask_, dtype=bool),
+            'cluster_sizes_': np.asarray(self.cluster_sizes_, dtype=np.int32),
+            'cluster_centers_': np.asarray(self.cluster_centers_, dtype=np.float32),
+            'cluster_min_': np.asarray(self.cluster_min_, dtype=np.float32),
+            'cluster_max_': np.asarray(self.cluster_max_, dtype=np.float32),
+        })
+        print(f"✓ Modèle sauvegardé dans '{nom_fichier}'")
+
+    @classmethod
+    def load_binary(cls, nom_fichier, mmap=True):
+        """
+        Charge un modèle sauvegardé par save_binary, sans parsing: points, labels
+        et résumé des clusters sont projetés en mémoire (pages partagées entre
+        les processus qui lisent le même fichier)
+
+        Args:
+            nom_fichier: Chemin du fichier à charger
+            mmap: projeter les tableaux au lieu de les lire
+
+        Returns:
+            le modèle chargé
+        """
+        modele = charger_binaire(cls, nom_fichier, mmap=mmap)
+        print(f"✓ Modèle chargé depuis '{nom_fichier}'")
+        return modele
@@ -0,0 +1,237 @@
+import json
+import os
+import struct
+import sys
+import zipfile
+from pathlib import Path
+
+import numpy as np
+
+_MODELS_DIR = str(Path(__file__).resolve().parent)
+if _MODELS_DIR not in sys.path:
+    sys.path.insert(0, _MODELS_DIR)
+from node_table import REPRESENTATIONS, TableNoeuds, amorcer_cache, representation_de
+
+# Format binaire des modeles (save_binary / load_binary).
+# Un artefact est un .npz non compresse: un membre .npy par tableau et un membre
+# "meta" (JSON: classe, hyperparametres, description des arbres). Les arbres sont
+# stockes aplatis (tables de noeuds concatenees, voir node_table), les attributs
+# numpy du modele tels quels. Au chargement, chaque membre est projete en memoire
+# (np.memmap sur le fichier .npz lui-meme, possible car les membres ne sont pas
+# compresses): pas de parsing, et les pages sont partagees entre les workers
+# forkes. Les tables de noeuds du cache de predict pointent directement sur ces
+# pages et sont tout ce que predict utilise. Les arbres (objets Node /
+# dictionnaires) sont aussi reconstruits au chargement, pour le code qui les
+# parcourt (predict_one, save, simplifier...).
+
+FORMAT_BINAIRE = 1
+ATTRIBUTS_ARBRES = (("forest", True), ("arbres", True), ("root", False), ("racine", False), ("arbre", False))
+ATTRIBUTS_IGNORES = {"last_predict"}  # copie des dernieres predictions, pas un parametre
+
+
+def _en_json(valeur):
+    # valeur -> equivalent JSON (TypeError si non representable)
+    if isinstance(valeur, np.generic):
+        return valeur.item()
+    if valeur is None or isinstance(valeur, (bool, int, float, str)):
+        return valeur
+    if isinstance(valeur, (list, tuple)):
+        return [_en_json(v) for v in valeur]
+    if isinstance(valeur, dict) and all(isinstance(k, str) for k in valeur):
+        return {k: _en_json(v) for k, v in valeur.items()}
+    raise TypeError(type(valeur).__name__)
+
+
+def _arbres(modele):
+    """(attribut, est_liste, racines) des arbres du modele; attribut None s'il n'a pas d'arbres"""
+    for attribut, est_liste in ATTRIBUTS_ARBRES:
+        if not hasattr(modele, attribut):
+            continue
+        valeur = getattr(modele, attribut)
+        if est_liste and isinstance(valeur, list):
+            return attribut, True, list(valeur)
+        if not est_liste:
+            return attribut, False, [] if valeur is None else [valeur]
+    return None, False, []
+
+
+def sauver_tableaux(chemin, tableaux, meta):
+    """Ecrit un .npz non compresse (tableaux + meta JSON), de facon atomique"""
+    chemin = Path(chemin)
+    membres = dict(tableaux)
+    membres["meta"] = np.frombuffer(json.dumps(meta, ensure_ascii=False).encode("utf-8"), dtype=np.uint8)
+    temporaire = chemin.with_name(f"{chemin.name}.{os.getpid()}.tmp")
+    with open(temporaire, "wb") as f:
+        np.savez(f, **membres)
+    os.replace(temporaire, chemin)  # un autre processus ne lit jamais un fichier partiel
+
+
+def charger_tableaux(chemin, mmap=True):
+    """
+    Lit un .npz ecrit par sauver_tableaux
+
+    Returns:
+        (tableaux, meta). Avec mmap, les membres 'arbres.*' sont projetes en lecture
+        seule et les autres en copie a l'ecriture (mode 'c'): les pages restent
+        partagees tant que le modele ne les modifie pas.
+    """
+    tableaux = {}
+    projections = {}  # une projection du fichier entier par mode, partagee par tous les membres
+    with zipfile.ZipFile(chemin) as archive, open(chemin, "rb") as f:
+        for info in archive.infolist():
+            nom = info.filename[:-4] if info.filename.endswith(".npy") else info.filename
+            if not mmap or info.compress_type != zipfile.ZIP_STORED:
+                with archive.open(info) as membre:
+                    tableaux[nom] = np.lib.format.read_array(membre)
+                continue
+            # en-tete local zip (30 octets + nom + champ extra), puis en-tete .npy
+            f.seek(info.header_offset)
+            n_nom, n_extra = struct.unpack("<HH", f.read(30)[26:30])
+            f.seek(info.header_offset + 30 + n_nom + n_extra)
+            version = np.lib.format.read_magic(f)
+            lire_entete = (np.lib.format.read_array_header_1_0 if version == (1, 0)
+                           else np.lib.format.read_array_header_2_0)
+            forme, fortran, dtype = lire_entete(f)
+            if dtype.hasobject:
+                raise ValueError(f"Tableau d'objets Python dans {chemin}: format binaire invalide.")
+            mode = "r" if nom.startswith("arbres.") or nom == "meta" else "c"
+            if mode not in projections:
+                projections[mode] = np.memmap(chemin, dtype=np.uint8, mode=mode)
+            tableaux[nom] = np.ndarray(forme, dtype=dtype, buffer=projections[mode], offset=f.tell(),
+                                       order="F" if fortran else "C")
+    meta = json.loads(tableaux.pop("meta").tobytes().decode("utf-8"))
+    if meta.get("format") != FORMAT_BINAIRE:
+        raise ValueError(f"Version de format binaire non supportée dans {chemin}: {meta.get('format')}")
+    return tableaux, meta
+
+
+def sauver_binaire(modele, chemin, tableaux=None, classe=None):
+    """
+    Sauvegarde un modele au format binaire
+
+    Args:
+        modele: modele entraine (ou charge)
+        chemin: fichier de sortie (.npz conseille)
+        tableaux: attributs a stocker comme tableaux numpy ({nom: tableau}), en plus
+            des attributs deja numpy (ex: listes chargees depuis un JSON)
+        classe: nom de classe a enregistrer (par defaut type(modele).__name__)
+    """
+    tableaux = dict(tableaux or {})
+    attribut_arbres, est_liste, racines = _arbres(modele)
+    attributs = {}
+    for nom, valeur in vars(modele).items():
+        if nom.startswith("_") or nom in ATTRIBUTS_IGNORES or nom == attribut_arbres or nom in tableaux:
+            continue
+        if isinstance(valeur, np.ndarray):
+            if not valeur.dtype.hasobject:
+                tableaux[nom] = valeur
+            continue
+        try:
+            attributs[nom] = _en_json(valeur)
+        except TypeError:
+            pass  # objet non serialisable (generateur aleatoire...): recree par le constructeur
+
+    membres = {f"attribut.{nom}": np.asarray(valeur) for nom, valeur in tableaux.items()}
+    description = None
+    if attribut_arbres is not None:
+        representation = representation_de(racines[0]) if racines else REPRESENTATIONS["node"]
+        tables = [[TableNoeuds.depuis_arbre(racine, lire) for racine in racines] for lire in representation.lectures]
+        principales = tables[0]
+        membres["arbres.feature"] = np.concatenate([t.feature for t in principales] + [np.empty(0, np.int64)]).astype(np.int64)
+        membres["arbres.threshold"] = np.concatenate([t.threshold for t in principales] + [np.empty(0)])
+        membres["arbres.left"] = np.concatenate([t.left for t in principales] + [np.empty(0, np.int64)]).astype(np.int64)
+        membres["arbres.right"] = np.concatenate([t.right for t in principales] + [np.empty(0, np.int64)]).astype(np.int64)
+        for k, tables_k in enumerate(tables):
+            membres[f"arbres.value{k}"] = np.concatenate([t.value for t in tables_k] + [np.empty(0)])
+        membres["arbres.debuts"] = np.cumsum([0] + [t.n_noeuds for t in principales]).astype(np.int64)
+        membres["arbres.profondeurs"] = np.array([t.profondeur for t in principales], dtype=np.int64)
+        description = {
+            "attribut": attribut_arbres,
+            "liste": est_liste,
+            "representation": representation.nom,
+            "avec_proba": bool(racines) and representation.nom == "classification" and "proba" in racines[0],
+        }
+
+    meta = {"format": FORMAT_BINAIRE, "classe": classe or type(modele).__name__,
+            "attributs": attributs, "arbres": description}
+    sauver_tableaux(chemin, membres, meta)
+
+
+def _reconstruire(table, valeurs, representation, classe_node, avec_proba):
+    # noeuds recrees du dernier au premier: en ordre prefixe, les enfants ont un numero plus grand
+    feature, threshold = table.feature.tolist(), table.threshold.tolist()
+    left, right = table.left.tolist(), table.right.tolist()
+    valeurs = [v.tolist() for v in valeurs]
+    noeuds = [None] * len(feature)
+    for i in range(len(feature) - 1, -1, -1):
+        interne = left[i] >= 0
+        gauche = noeuds[left[i]] if interne else None
+        droite = noeuds[right[i]] if interne else None
+        f = feature[i] if interne else None
+        seuil = threshold[i] if interne else None
+        valeur = valeurs[0][i]
+        if representation == "node":
+            noeud = classe_node()
+            noeud.feature, noeud.threshold = f, seuil
+            noeud.prediction = None if valeur != valeur else valeur  # NaN: prediction absente
+            noeud.left, noeud.right = gauche, droite
+        elif representation == "classification":
+            noeud = {"feature": f, "seuil": seuil, "decision": None if valeur != valeur else int(valeur)}
+            if avec_proba:
+                noeud["proba"] = valeurs[1][i]
+            noeud["arbre enfant de gauche"], noeud["arbre enfant de droite"] = gauche, droite
+        elif interne:
+            noeud = {"feuille": False, "feature": f, "seuil": seuil, "gauche": gauche, "droite": droite}
+        else:
+            noeud = {"feuille": True, "valeur": valeur}
+        noeuds[i] = noeud
+    return noeuds[0]
+
+
+def charger_binaire(cls, chemin, mmap=True):
+    """
+    Charge un modele sauvegarde par sauver_binaire
+
+    Args:
+        cls: classe du modele (doit correspondre a celle enregistree)
+        chemin: fichier .npz
+        mmap: projeter les tableaux en memoire au lieu de les lire
+
+    Returns:
+        instance de cls, prete pour predict (tables de noeuds deja en cache, projetees
+        depuis le fichier) et avec ses arbres reconstruits
+    """
+    tableaux, meta = charger_tableaux(chemin, mmap=mmap)
+    if meta["classe"] != cls.__name__:
+        raise ValueError(f"'{chemin}' contient un {meta['classe']}, pas un {cls.__name__}.")
+    modele = cls()
+    for nom, valeur in meta["attributs"].items():
+        setattr(modele, nom, valeur)
+    for nom, tableau in tableaux.items():
+        if nom.startswith("attribut."):
+            setattr(modele, nom[len("attribut."):], tableau)
+
+    description = meta["arbres"]
+    if description is not None:
+        debuts, profondeurs = tableaux["arbres.debuts"], tableaux["arbres.profondeurs"]
+        n_valeurs = len(REPRESENTATIONS[description["representation"]].lectures)
+        tables = [[] for _ in range(n_valeurs)]
+        for a in range(len(profondeurs)):
+            tranche = slice(int(debuts[a]), int(debuts[a + 1]))
+            for k in range(n_valeurs):
+                tables[k].append(TableNoeuds(tableaux["arbres.feature"][tranche], tableaux["arbres.threshold"][tranche],
+                                             tableaux["arbres.left"][tranche], tableaux["arbres.right"][tranche],
+                                             tableaux[f"arbres.value{k}"][tranche], int(profondeurs[a])))
+        classe_node = getattr(sys.modules.get(cls.__module__), "Node", None)
+        racines = [_reconstruire(table, [tables_k[a].value for tables_k in tables], description["representation"],
+                                 classe_node, description["avec_proba"])
+                   for a, table in enumerate(tables[0])]
+        if description["liste"]:
+            setattr(modele, description["attribut"], racines)
+        else:
+            setattr(modele, description["attribut"], racines[0] if racines else None)
+        # predict retrouve ces tables (memes racines): aucune reconstruction de table au premier appel
+        amorcer_cache(modele, racines, tables[0])
+        if n_valeurs > 1:
+            amorcer_cache(modele, racines, tables[1], '_tables_proba')
+    return modele
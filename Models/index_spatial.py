@@ -0,0 +1,230 @@
+import itertools
+
+import numpy as np
+
+# Index spatiaux pour les requetes de voisinage (distance euclidienne <= eps) de DBSCAN.
+# Les deux index retournent exactement les voisins de la recherche exhaustive
+# (DBSCAN.get_voisins): memes indices, dans l'ordre croissant, et distance
+# calculee par la meme expression numpy, pour que les clusters soient identiques.
+#   - ArbreKD: arbre k-d construit sans recursion (decoupage a la mediane de la
+#     dimension la plus etendue), boites englobantes pour elaguer les noeuds.
+#   - Grille: grille uniforme de pas eps, seules les cellules occupees sont stockees;
+#     un voisin est forcement dans la cellule du point ou une cellule adjacente.
+# Sans index, voisinages() calcule tous les voisinages par blocs de lignes
+# (distances bloc x n en une expression numpy) et les range au format CSR;
+# les paires a la limite du rayon sont verifiees avec le calcul de get_voisins.
+
+TAILLE_FEUILLE = 16
+MARGE = 1e-6  # elargissement relatif des boites / cellules: un arrondi ne doit jamais exclure un voisin
+MEMOIRE_BLOC = 32 * 2**20  # octets max des tableaux temporaires d'un bloc de lignes (voisinages par blocs)
+
+
+def distances(X, indices, point):
+    # meme calcul que DBSCAN.get_voisins: np.sqrt(np.sum((a - b) ** 2)) ligne par ligne
+    return np.sqrt(np.sum((X[indices] - point) ** 2, axis=1))
+
+
+def _paires(X, eps, memoire_bloc):
+    # (debut, fin, lignes, colonnes): paires a distance <= eps pour des blocs de lignes
+    # consecutifs [debut, fin), triees par ligne puis par colonne (lignes relatives a debut).
+    # Les carres des distances d'un bloc sont obtenus en une expression (|a|^2 + |b|^2 - 2 a.b,
+    # produit matriciel sur les donnees centrees); les paires dont le resultat est trop proche
+    # de eps^2 pour que l'arrondi soit sans effet sont recalculees comme get_voisins.
+    n = X.shape[0]
+    centre = X - X.mean(axis=0) if n else X
+    normes = np.einsum('ij,ij->i', centre, centre)
+    eps2 = float(eps) ** 2
+    taille = max(1, memoire_bloc // (8 * max(n, 1) * 2))  # carres et masque du bloc
+    for debut in range(0, n, taille):
+        fin = min(debut + taille, n)
+        carres = centre[debut:fin] @ centre.T
+        carres *= -2
+        carres += normes[debut:fin, None]
+        carres += normes[None, :]
+        tolerance = 1e-8 * (normes[debut:fin].max() + normes.max() + eps2)
+        lignes, colonnes = np.nonzero(carres <= eps2 + tolerance)
+        valeurs = carres[lignes, colonnes]
+        garder = valeurs <= eps2 - tolerance
+        limite = np.flatnonzero(~garder)
+        if limite.size:
+            l, c = debut + lignes[limite], colonnes[limite]
+            garder[limite] = np.sqrt(np.sum((X[l] - X[c]) ** 2, axis=1)) <= eps
+        yield debut, fin, lignes[garder], colonnes[garder]
+
+
+def nombre_voisins(X, eps, memoire_bloc=MEMOIRE_BLOC):
+    """
+    Nombre de points a distance <= eps de chaque point (lui-meme compris), comme len(get_voisins)
+
+    Les distances sont calculees par blocs de lignes (bloc x n), la taille du bloc
+    etant choisie pour que ses tableaux temporaires tiennent dans memoire_bloc octets.
+    """
+    X = np.asarray(X, dtype=float)
+    compte = np.empty(X.shape[0], dtype=np.int64)
+    for debut, fin, lignes, _ in _paires(X, eps, memoire_bloc):
+        compte[debut:fin] = np.bincount(lignes, minlength=fin - debut)
+    return compte
+
+
+def voisinages(X, eps, memoire_bloc=MEMOIRE_BLOC):
+    """
+    Voisinages eps de tous les points au format CSR, calcules par blocs de lignes
+
+    Args:
+        X: donnees, shape (n_samples, n_features)
+        eps: rayon du voisinage
+        memoire_bloc: octets max des tableaux temporaires d'un bloc
+
+    Returns:
+        (debuts, indices): les voisins du point i (lui-meme compris, indices croissants,
+        comme DBSCAN.get_voisins) sont indices[debuts[i]:debuts[i + 1]]
+    """
+    X = np.asarray(X, dtype=float)
+    debuts = np.zeros(X.shape[0] + 1, dtype=np.intp)
+    morceaux = []
+    for debut, fin, lignes, colonnes in _paires(X, eps, memoire_bloc):
+        debuts[debut + 1:fin + 1] = np.bincount(lignes, minlength=fin - debut)
+        morceaux.append(colonnes.astype(np.intp))
+    np.cumsum(debuts, out=debuts)
+    return debuts, (np.concatenate(morceaux) if morceaux else np.empty(0, dtype=np.intp))
+
+
+class ArbreKD:
+    """Arbre k-d sur les lignes de X, pour les requetes de rayon eps"""
+
+    def __init__(self, X, eps, taille_feuille=TAILLE_FEUILLE):
+        self.X = np.asarray(X, dtype=float)
+        self.eps = eps
+        n = self.X.shape[0]
+        self.ordre = np.arange(n)
+        # noeuds: tranche [debut, fin) de self.ordre, boite englobante, enfants (-1 pour une feuille)
+        self.debut, self.fin, self.gauche, self.droite = [], [], [], []
+        minimums, maximums = [], []
+        pile = [(0, n, -1, None)] if n else []  # (debut, fin, parent, liste d'enfants du parent)
+        while pile:
+            debut, fin, parent, enfants = pile.pop()
+            points = self.X[self.ordre[debut:fin]]
+            mini, maxi = points.min(axis=0), points.max(axis=0)
+            noeud = len(self.debut)
+            if enfants is not None:
+                enfants[parent] = noeud
+            self.debut.append(debut)
+            self.fin.append(fin)
+            minimums.append(mini)
+            maximums.append(maxi)
+            self.gauche.append(-1)
+            self.droite.append(-1)
+            etendue = maxi - mini
+            if fin - debut <= taille_feuille or not etendue.any():
+                continue
+            dim = int(np.argmax(etendue))
+            milieu = (fin - debut) // 2
+            self.ordre[debut:fin] = self.ordre[debut:fin][np.argpartition(points[:, dim], milieu)]
+            pile.append((debut + milieu, fin, noeud, self.droite))
+            pile.append((debut, debut + milieu, noeud, self.gauche))
+        d = self.X.shape[1] if self.X.ndim == 2 else 0
+        self.minimums = np.array(minimums).reshape(-1, d)
+        self.maximums = np.array(maximums).reshape(-1, d)
+        self.gauche, self.droite = np.array(self.gauche, dtype=np.intp), np.array(self.droite, dtype=np.intp)
+        self.debut, self.fin = np.array(self.debut, dtype=np.intp), np.array(self.fin, dtype=np.intp)
+
+    def requete(self, point):
+        """Indices (croissants) des lignes de X a distance <= eps de point"""
+        if not len(self.debut):
+            return []
+        point = np.asarray(point, dtype=float)
+        rayon2 = (self.eps * (1 + MARGE)) ** 2
+        # parcours niveau par niveau: tous les noeuds d'un niveau sont testes en une operation
+        tranches, niveau = [], np.zeros(1, dtype=np.intp)
+        while niveau.size:
+            ecart = (np.maximum(self.minimums[niveau] - point, 0)
+                     + np.maximum(point - self.maximums[niveau], 0))
+            niveau = niveau[np.einsum('ij,ij->i', ecart, ecart) <= rayon2]
+            feuille = self.gauche[niveau] < 0
+            tranches.extend(self.ordre[a:b] for a, b in zip(self.debut[niveau[feuille]], self.fin[niveau[feuille]]))
+            internes = niveau[~feuille]
+            niveau = np.concatenate([self.gauche[internes], self.droite[internes]])
+        if not tranches:
+            return []
+        candidats = np.sort(np.concatenate(tranches))
+        return candidats[distances(self.X, candidats, point) <= self.eps].tolist()
+
+    def voisins(self, i):
+        return self.requete(self.X[i])
+
+
+class Grille:
+    """Grille uniforme de pas eps sur les lignes de X, pour les requetes de rayon eps"""
+
+    def __init__(self, X, eps):
+        self.X = np.asarray(X, dtype=float)
+        self.eps = eps
+        self.pas = eps * (1 + MARGE) if eps > 0 else 1.0
+        self.origine = self.X.min(axis=0) if len(self.X) else np.zeros(self.X.shape[1:])
+        occupees, self.cellule_de, effectifs = np.unique(self._cellules(self.X), axis=0,
+                                                         return_inverse=True, return_counts=True)
+        self.cellule_de = self.cellule_de.reshape(-1)
+        self.occupees = occupees
+        # code entier de chaque cellule (coordonnees decalees de 1, ecriture en base etendue + 2):
+        # les cellules adjacentes a une cellule sont code + decalages, cherchees par dichotomie
+        self.base = occupees.max(axis=0, initial=0) + 3
+        self.decalages = None
+        if 3 ** occupees.shape[1] <= len(occupees) and np.prod(self.base.astype(float)) < 2 ** 62:
+            self.poids = np.concatenate([np.cumprod(self.base[::-1])[::-1][1:], [1]]).astype(np.int64)
+            self.codes = (occupees + 1) @ self.poids  # croissants: np.unique trie les cellules
+            self.decalages = np.array(list(itertools.product((-1, 0, 1), repeat=occupees.shape[1]))) @ self.poids
+        # points de la cellule k: self.ordre[self.bornes[k]:self.bornes[k + 1]] (indices croissants)
+        self.ordre = np.argsort(self.cellule_de, kind='stable')
+        self.bornes = np.concatenate([[0], np.cumsum(effectifs)])
+        self._adjacentes = {}  # cellule -> numeros des cellules occupees adjacentes (calcule a la demande)
+
+    def _cellules(self, X):
+        return np.floor((X - self.origine) / self.pas).astype(np.int64)
+
+    def adjacentes(self, cle):
+        """Numeros des cellules occupees a au plus une cellule de cle dans chaque dimension"""
+        cle = tuple(cle)
+        if cle not in self._adjacentes:
+            if self.decalages is not None:
+                voisines = (np.asarray(cle) + 1) @ self.poids + self.decalages
+                rangs = np.minimum(np.searchsorted(self.codes, voisines), len(self.codes) - 1)
+                proches = rangs[self.codes[rangs] == voisines]
+            else:
+                proches = np.flatnonzero(np.all(np.abs(self.occupees - np.asarray(cle)) <= 1, axis=1))
+            self._adjacentes[cle] = proches
+        return self._adjacentes[cle]
+
+    def _requete(self, cle, point):
+        # seules les cellules adjacentes dont la boite est a moins de eps du point sont lues
+        cellules = self.adjacentes(cle)
+        bas = self.origine + self.occupees[cellules] * self.pas
+        ecart = np.maximum(bas - point, 0) + np.maximum(point - (bas + self.pas), 0)
+        cellules = cellules[np.einsum('ij,ij->i', ecart, ecart) <= (self.eps * (1 + MARGE)) ** 2]
+        if not cellules.size:
+            return []
+        candidats = np.sort(np.concatenate([self.ordre[self.bornes[k]:self.bornes[k + 1]] for k in cellules]))
+        return candidats[distances(self.X, candidats, point) <= self.eps].tolist()
+
+    def requete(self, point):
+        """Indices (croissants) des lignes de X a distance <= eps de point"""
+        point = np.asarray(point, dtype=float)
+        return self._requete(self._cellules(point[None, :])[0].tolist(), point)
+
+    def voisins(self, i):
+        return self._requete(self.occupees[self.cellule_de[i]].tolist(), self.X[i])
+
+
+INDEX = {'kdtree': ArbreKD, 'grid': Grille}
+ALGORITHMES = ('brute', 'chunked') + tuple(INDEX)
+
+
+def construire_index(algorithme, X, eps):
+    """
+    Index de voisinage pour algorithme ('kdtree', 'grid'); None sans index:
+    'brute' (recherche exhaustive) et 'chunked' (voisinages par blocs)
+    """
+    if algorithme not in ALGORITHMES:
+        raise ValueError(f"neighbors_algorithm inconnu: {algorithme!r} (attendu: {', '.join(ALGORITHMES)})")
+    if algorithme not in INDEX:
+        return None
+    return INDEX[algorithme](X, eps)
@@ -0,0 +1,208 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+
+_MODELS_DIR = str(Path(__file__).resolve().parent)
+if _MODELS_DIR not in sys.path:
+    sys.path.insert(0, _MODELS_DIR)
+from node_table import tables_en_cache
+from description_arbres import decrire, donnees_verification
+
+# Forme compacte en memoire des modeles a arbres (opt-in).
+# Un modele charge depuis son JSON est un graphe de dizaines de milliers d'objets
+# Node / dictionnaires Python aux attributs float64, duplique dans chaque worker.
+# compacter() le remplace par une table de noeuds unique en precision reduite:
+# seuils et valeurs float32, enfants int16 (int32 au-dela de 32767 noeuds),
+# features uint8 (uint16 au-dela de 255 colonnes). Les seuils sont arrondis vers
+# le haut en float32 pour que x == seuil parte toujours a gauche. Le modele
+# compact est verifie contre le predict float64 de reference avec une
+# tolerance explicite, et son empreinte memoire est mesuree.
+
+TOLERANCE_DEFAUT = 1e-4  # ecart maximal toleré, relatif a max(1, |prediction de reference|)
+
+
+def _seuils_float32(threshold):
+    # plus petit float32 >= seuil: x <= seuil implique x <= seuil32
+    seuils = threshold.astype(np.float32)
+    trop_bas = seuils.astype(float) < threshold
+    seuils[trop_bas] = np.nextafter(seuils[trop_bas], np.float32(np.inf))
+    return seuils
+
+
+class ModeleCompact:
+    """
+    Modele a arbres en precision reduite, utilisable a la place du modele d'origine pour predict
+
+    Les noeuds de tous les arbres sont concatenes dans cinq tableaux (un seul en-tete
+    numpy par tableau pour toute la foret); l'arbre a occupe debuts[a]:debuts[a + 1],
+    et ses enfants sont numerotes localement a l'arbre.
+
+    Attributs:
+        feature: uint8 (uint16 si plus de 256 colonnes), 0 pour une feuille
+        threshold, value: float32
+        left, right: int16 (int32 si un arbre depasse 32767 noeuds), -1 pour une feuille
+        debuts: int32, debut de chaque arbre (n_arbres + 1 valeurs)
+        mode, init, learning_rate: combinaison des arbres (voir decrire)
+        classe: nom de la classe du modele d'origine
+        rapport: empreinte memoire et ecart mesure par compacter()
+    """
+
+    def __init__(self, tables, mode, init=None, learning_rate=None, classe=""):
+        internes = [t.left >= 0 for t in tables]
+        n_features = 1 + max([int(t.feature[i].max()) for t, i in zip(tables, internes) if i.any()] + [0])
+        n_max = max([t.n_noeuds for t in tables] + [0])
+        type_feature = np.uint8 if n_features <= np.iinfo(np.uint8).max + 1 else np.uint16
+        type_enfant = np.int16 if n_max <= np.iinfo(np.int16).max else np.int32
+        self.feature = np.concatenate([np.where(i, t.feature, 0) for t, i in zip(tables, internes)]
+                                      + [np.empty(0, dtype=np.intp)]).astype(type_feature)
+        self.threshold = np.concatenate([np.where(i, _seuils_float32(np.where(i, t.threshold, 0.0)), np.nan)
+                                         for t, i in zip(tables, internes)] + [np.empty(0)]).astype(np.float32)
+        self.left = np.concatenate([t.left for t in tables] + [np.empty(0, dtype=np.intp)]).astype(type_enfant)
+        self.right = np.concatenate([t.right for t in tables] + [np.empty(0, dtype=np.intp)]).astype(type_enfant)
+        self.value = np.concatenate([t.value for t in tables] + [np.empty(0)]).astype(np.float32)
+        self.debuts = np.cumsum([0] + [t.n_noeuds for t in tables]).astype(np.int32)
+        for tableau in (self.feature, self.threshold, self.left, self.right, self.value, self.debuts):
+            tableau.setflags(write=False)  # modele partage entre requetes: lecture seule
+        self.mode = mode
+        self.init = init
+        self.learning_rate = learning_rate
+        self.classe = classe
+        self.rapport = {}
+
+    @classmethod
+    def depuis_modele(cls, modele):
+        arbres, lire, mode, init, learning_rate = decrire(modele)
+        # tables du cache de predict (deja projetees pour un modele charge par load_binary)
+        tables = tables_en_cache(modele, arbres, lire)
+        return cls(tables, mode, init, learning_rate, type(modele).__name__)
+
+    @property
+    def n_arbres(self):
+        return len(self.debuts) - 1
+
+    @property
+    def nbytes(self):
+        return sum(t.nbytes for t in (self.feature, self.threshold, self.left, self.right, self.value, self.debuts))
+
+    def apply_arbre(self, a, X):
+        """Numero (local a l'arbre a) de la feuille atteinte par chaque ligne de X, comme TableNoeuds.apply"""
+        debut, fin = int(self.debuts[a]), int(self.debuts[a + 1])
+        feature, threshold = self.feature[debut:fin], self.threshold[debut:fin]
+        left, right = self.left[debut:fin], self.right[debut:fin]
+        noeuds = np.zeros(X.shape[0], dtype=np.intp)
+        actives = np.arange(X.shape[0]) if left[0] >= 0 else np.empty(0, dtype=np.intp)
+        while actives.size:
+            courants = noeuds[actives]
+            a_gauche = X[actives, feature[courants]] <= threshold[courants]
+            suivants = np.where(a_gauche, left[courants], right[courants]).astype(np.intp)
+            noeuds[actives] = suivants
+            actives = actives[left[suivants] >= 0]
+        return noeuds
+
+    def predict_arbre(self, a, X):
+        """Valeur (float64) de la feuille atteinte dans l'arbre a par chaque ligne de X"""
+        return self.value[int(self.debuts[a]) + self.apply_arbre(a, X)].astype(float)
+
+    def _preparer(self, X):
+        X = np.asarray(X, dtype=float)
+        return X.reshape(1, -1) if X.ndim == 1 else X
+
+    def predict_proba(self, X):
+        """Fraction des arbres qui votent pour la classe 1 (mode 'vote' uniquement)"""
+        if self.mode != "vote":
+            raise AttributeError(f"predict_proba n'existe que pour une forêt de classification ({self.classe})")
+        X = self._preparer(X)
+        votes = np.zeros(X.shape[0], dtype=int)
+        for a in range(self.n_arbres):
+            votes += self.predict_arbre(a, X) == 1
+        return votes / self.n_arbres
+
+    def predict(self, X):
+        X = self._preparer(X)
+        if self.mode == "arbre":
+            return self.predict_arbre(0, X)
+        if self.mode == "vote":
+            return np.where(self.predict_proba(X) > 0.5, 1.0, 0.0)
+        if self.mode == "moyenne":
+            return np.mean([self.predict_arbre(a, X) for a in range(self.n_arbres)], axis=0)
+        F = np.full(X.shape[0], self.init)
+        for a in range(self.n_arbres):
+            F += self.learning_rate * self.predict_arbre(a, X)
+        return F
+
+
+def empreinte_memoire(objet):
+    """
+    Taille en octets du graphe d'objets Python atteignable depuis objet
+
+    Parcours iteratif (pas de limite de recursion) des __dict__, dictionnaires,
+    listes et tuples; un tableau numpy compte ses donnees (celles de son tableau de
+    base pour une vue). Chaque objet n'est compte qu'une fois.
+    """
+    vus = set()
+    total = 0
+    pile = [objet]
+    while pile:
+        courant = pile.pop()
+        if id(courant) in vus:
+            continue
+        vus.add(id(courant))
+        total += sys.getsizeof(courant)
+        if isinstance(courant, np.ndarray):
+            if courant.base is not None:
+                pile.append(courant.base)  # getsizeof ne compte les donnees que du tableau proprietaire
+        elif isinstance(courant, dict):
+            pile.extend(courant.keys())
+            pile.extend(courant.values())
+        elif isinstance(courant, (list, tuple, set, frozenset)):
+            pile.extend(courant)
+        elif hasattr(courant, "__dict__") and not isinstance(courant, type):
+            pile.append(vars(courant))
+    return total
+
+
+def compacter(modele, tolerance=TOLERANCE_DEFAUT, X_verification=None):
+    """
+    Forme compacte d'un modele a arbres entraine, verifiee contre le modele d'origine
+
+    Args:
+        modele: decisionTreeRegressor, GradientBoostingRegressor, XGBoostRegressor,
+            RandomForestRegressor, DecisionTreeClassification, RandomForestClassification,
+            ArbreRegression ou ENSPD_GradientBoosting_Pure
+        tolerance: ecart maximal accepte entre les predictions compacte et float64,
+            relatif a max(1, |prediction de reference|)
+        X_verification: lignes de verification (par defaut: generees autour des seuils)
+
+    Returns:
+        ModeleCompact, avec compact.rapport = {octets_reference, octets_compact, ratio,
+        n_arbres, n_noeuds, ecart_max, tolerance}
+
+    Leve ValueError si l'ecart depasse la tolerance.
+    """
+    octets_reference = empreinte_memoire(modele)  # avant predict, qui ajoute ses tables en cache au modele
+    compact = ModeleCompact.depuis_modele(modele)
+    octets_compact = empreinte_memoire(compact)
+    if X_verification is None:
+        arbres, lire, _, _, _ = decrire(modele)
+        X_verification = donnees_verification(tables_en_cache(modele, arbres, lire))
+    X_verification = np.asarray(X_verification, dtype=float)
+    reference = np.asarray(modele.predict(X_verification), dtype=float)
+    obtenu = compact.predict(X_verification)
+    ecarts = np.abs(obtenu - reference) / np.maximum(1.0, np.abs(reference))
+    ecart_max = float(ecarts.max()) if ecarts.size else 0.0
+    if not ecart_max <= tolerance:
+        i = int(np.argmax(ecarts))
+        raise ValueError(f"Le modèle compact s'écarte de la référence de {ecart_max:.3g} "
+                         f"(tolérance {tolerance:.3g}; ligne {i}: {float(obtenu[i])!r} au lieu de {float(reference[i])!r}).")
+
+    compact.rapport = {
+        "octets_reference": octets_reference,
+        "octets_compact": octets_compact,
+        "ratio": octets_reference / octets_compact,
+        "n_arbres": compact.n_arbres,
+        "n_noeuds": len(compact.feature),
+        "ecart_max": ecart_max,
+        "tolerance": tolerance,
+    }
+    return compact
@@ -0,0 +1,272 @@
+import numpy as np
+
+# Representation "table de noeuds" des arbres, commune a tous les modeles.
+# Un arbre (objets Node ou dictionnaires) est aplati en tableaux paralleles
+# feature / threshold / left / right / value indexes par numero de noeud
+# (ordre prefixe, racine = 0, left = -1 pour une feuille). La prediction fait
+# avancer tout le lot de lignes d'un niveau par iteration avec de l'indexation
+# numpy: O(profondeur) operations par arbre au lieu de O(lignes x profondeur)
+# appels Python recursifs.
+
+
+class TableNoeuds:
+    """
+    Arbre binaire aplati en tableaux numpy paralleles
+
+    Attributs:
+        feature: feature testee par chaque noeud interne (-1 pour une feuille)
+        threshold: seuil du noeud (X[:, feature] <= threshold -> enfant gauche)
+        left, right: numero des enfants (-1 pour une feuille)
+        value: valeur retournee par chaque feuille (prediction, decision...)
+        profondeur: profondeur maximale de l'arbre (nombre d'iterations de predict)
+    """
+
+    def __init__(self, feature, threshold, left, right, value, profondeur):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.profondeur = profondeur
+
+    @classmethod
+    def depuis_arbre(cls, racine, lire):
+        """
+        Aplatit un arbre par un parcours prefixe iteratif (pas de limite de recursion)
+
+        Args:
+            racine: noeud racine, dans la representation du modele
+            lire: fonction noeud -> (feature, seuil, gauche, droite, valeur), avec
+                gauche = droite = None pour une feuille (feature et seuil sont alors ignores)
+        """
+        feature, threshold, left, right, value = [], [], [], [], []
+        profondeur_max = 0
+        pile = [(racine, -1, False, 0)]  # (noeud, numero du parent, enfant droit ?, profondeur)
+        while pile:
+            noeud, parent, est_droit, profondeur = pile.pop()
+            numero = len(feature)
+            if parent >= 0:
+                (right if est_droit else left)[parent] = numero
+            f, seuil, gauche, droite, valeur = lire(noeud)
+            if gauche is None and droite is None:
+                feature.append(-1)
+                threshold.append(np.nan)
+            else:
+                feature.append(int(f))
+                threshold.append(float(seuil))
+            left.append(-1)
+            right.append(-1)
+            value.append(np.nan if valeur is None else float(valeur))
+            profondeur_max = max(profondeur_max, profondeur)
+            if gauche is not None or droite is not None:
+                # droite empilee en premier: le sous-arbre gauche suit directement son parent
+                pile.append((droite, numero, True, profondeur + 1))
+                pile.append((gauche, numero, False, profondeur + 1))
+        return cls(np.array(feature, dtype=np.intp), np.array(threshold, dtype=float),
+                   np.array(left, dtype=np.intp), np.array(right, dtype=np.intp),
+                   np.array(value, dtype=float), profondeur_max)
+
+    @property
+    def n_noeuds(self):
+        return len(self.feature)
+
+    def apply(self, X):
+        """
+        Numero de la feuille atteinte par chaque ligne de X
+
+        Toutes les lignes descendent ensemble: a chaque iteration, les lignes encore sur
+        un noeud interne comparent leur feature au seuil et passent a l'enfant choisi.
+        """
+        X = np.asarray(X, dtype=float)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        noeuds = np.zeros(X.shape[0], dtype=np.intp)
+        actives = np.arange(X.shape[0]) if self.left[0] >= 0 else np.empty(0, dtype=np.intp)
+        while actives.size:
+            courants = noeuds[actives]
+            a_gauche = X[actives, self.feature[courants]] <= self.threshold[courants]
+            suivants = np.where(a_gauche, self.left[courants], self.right[courants])
+            noeuds[actives] = suivants
+            actives = actives[self.left[suivants] >= 0]  # on ne garde que les lignes pas encore en feuille
+        return noeuds
+
+    def predict(self, X):
+        """Valeur de la feuille atteinte par chaque ligne de X"""
+        return self.value[self.apply(X)]
+
+
+class TenseurForet:
+    """
+    Foret entiere empilee en tenseurs de noeuds (n_arbres, n_noeuds_max), completes par du padding
+
+    Les feuilles (et le padding) bouclent sur elles-memes (left = right = noeud), ce qui
+    permet de faire descendre toutes les lignes dans tous les arbres a la fois pendant
+    profondeur iterations, sans masque de lignes actives.
+    """
+
+    def __init__(self, tables):
+        n_arbres = len(tables)
+        n_noeuds = max([t.n_noeuds for t in tables] + [1])
+        self.profondeur = max([t.profondeur for t in tables] + [0])
+        noeuds = np.arange(n_noeuds)
+        self.feature = np.zeros((n_arbres, n_noeuds), dtype=np.intp)
+        self.threshold = np.zeros((n_arbres, n_noeuds))
+        self.left = np.tile(noeuds, (n_arbres, 1))
+        self.right = np.tile(noeuds, (n_arbres, 1))
+        self.value = np.full((n_arbres, n_noeuds), np.nan)
+        for a, table in enumerate(tables):
+            internes = np.nonzero(table.left >= 0)[0]
+            self.feature[a, internes] = table.feature[internes]
+            self.threshold[a, internes] = table.threshold[internes]
+            self.left[a, internes] = table.left[internes]
+            self.right[a, internes] = table.right[internes]
+            self.value[a, :table.n_noeuds] = table.value
+        # versions a plat (numero global = arbre * n_noeuds + noeud) pour des np.take 1D;
+        # enfants[2 * noeud] = gauche, enfants[2 * noeud + 1] = droite
+        self._decalage = np.arange(n_arbres) * n_noeuds
+        self._enfants = np.stack([self.left + self._decalage[:, None],
+                                  self.right + self._decalage[:, None]], axis=-1).ravel()
+
+    def apply(self, X, taille_bloc=1024):
+        """
+        Numero de la feuille atteinte par chaque ligne dans chaque arbre, shape (n_lignes, n_arbres)
+
+        Les lignes sont traitees par blocs de taille_bloc pour borner la memoire des
+        tableaux intermediaires (taille_bloc x n_arbres).
+        """
+        X = np.asarray(X, dtype=float)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        X = np.ascontiguousarray(X)
+        feature = self.feature.ravel()
+        threshold = self.threshold.ravel()
+        resultat = np.empty((X.shape[0], len(self._decalage)), dtype=np.intp)
+        for debut in range(0, X.shape[0], taille_bloc):
+            bloc = X[debut:debut + taille_bloc]
+            valeurs = bloc.ravel()
+            base = (np.arange(bloc.shape[0]) * bloc.shape[1])[:, None]
+            noeuds = np.repeat(self._decalage[None, :], bloc.shape[0], axis=0)
+            for _ in range(self.profondeur):
+                # ~(x <= seuil) et non x > seuil: une valeur NaN part a droite comme dans predict_one
+                a_droite = ~(valeurs.take(base + feature.take(noeuds)) <= threshold.take(noeuds))
+                noeuds = self._enfants.take(2 * noeuds + a_droite)
+            resultat[debut:debut + taille_bloc] = noeuds - self._decalage
+        return resultat
+
+    def predict(self, X):
+        """Valeur de la feuille atteinte dans chaque arbre, shape (n_lignes, n_arbres)"""
+        return self.value[np.arange(self.feature.shape[0]), self.apply(X)]
+
+
+def _en_cache(modele, attribut, arbres, construire):
+    # cache compare par identite aux arbres courants: un nouveau fit, un load ou un ajout d'arbres l'invalide
+    cache = getattr(modele, attribut, None)
+    if (cache is None or len(cache[0]) != len(arbres)
+            or any(a is not b for a, b in zip(cache[0], arbres))):
+        cache = (list(arbres), construire())
+        setattr(modele, attribut, cache)
+    return cache[1]
+
+
+def tables_en_cache(modele, arbres, lire, attribut='_tables_noeuds'):
+    """
+    Tables des arbres d'un modele, recalculees seulement si la liste d'arbres a change
+
+    Le cache est garde dans modele.<attribut> et compare par identite aux arbres
+    courants: un nouveau fit, un load ou un ajout d'arbres le rend invalide. Un
+    attribut different par fonction lire (ex: decision / probabilite des feuilles).
+    """
+    return _en_cache(modele, attribut, arbres,
+                     lambda: [TableNoeuds.depuis_arbre(arbre, lire) for arbre in arbres])
+
+
+def amorcer_cache(modele, arbres, tables, attribut='_tables_noeuds'):
+    """
+    Installe des tables deja construites (ex: projetees depuis un fichier binaire)
+    comme cache de tables_en_cache pour ces arbres
+    """
+    setattr(modele, attribut, (list(arbres), list(tables)))
+
+
+def tenseur_en_cache(modele, arbres, lire, attribut='_tenseur_foret', attribut_tables='_tables_noeuds'):
+    """
+    TenseurForet des arbres d'un modele, avec le meme cache que tables_en_cache (modele.<attribut>)
+
+    Le tenseur est empile a partir des tables en cache (modele.<attribut_tables>, celles
+    de la meme fonction lire), deja installees pour un modele charge depuis un fichier binaire.
+    """
+    return _en_cache(modele, attribut, arbres,
+                     lambda: TenseurForet(tables_en_cache(modele, arbres, lire, attribut_tables)))
+
+
+def lire_node(node):
+    # fonction lire des arbres a objets Node (feature / threshold / prediction / left / right)
+    return node.feature, node.threshold, node.left, node.right, node.prediction
+
+
+def _ecrire_node(noeud, gauche, droite):
+    noeud.left, noeud.right = gauche, droite
+
+
+def lire_classification(noeud):
+    # noeuds dictionnaires de DecisionTreeClassification / RandomForestClassification
+    return (noeud["feature"], noeud["seuil"], noeud["arbre enfant de gauche"],
+            noeud["arbre enfant de droite"], noeud["decision"])
+
+
+def lire_proba(noeud):
+    # meme arbre, valeur des feuilles = frequence de la classe 1 (decision si absente)
+    return (noeud["feature"], noeud["seuil"], noeud["arbre enfant de gauche"],
+            noeud["arbre enfant de droite"], noeud.get("proba", noeud["decision"]))
+
+
+def _ecrire_classification(noeud, gauche, droite):
+    noeud["arbre enfant de gauche"], noeud["arbre enfant de droite"] = gauche, droite
+
+
+def lire_regression(noeud):
+    # noeuds dictionnaires de ArbreRegression / ENSPD_GradientBoosting_Pure ('feuille' / 'valeur')
+    if noeud['feuille']:
+        return None, None, None, None, noeud['valeur']
+    return noeud['feature'], noeud['seuil'], noeud['gauche'], noeud['droite'], None
+
+
+def _ecrire_regression(noeud, gauche, droite):
+    noeud['gauche'], noeud['droite'] = gauche, droite
+
+
+class Representation:
+    """
+    Acces generique aux noeuds d'une representation d'arbre
+
+    Attributs:
+        nom: 'node' (objets Node), 'classification' ou 'regression' (dictionnaires)
+        lire: noeud -> (feature, seuil, gauche, droite, valeur)
+        ecrire: (noeud, gauche, droite) -> None, remplace les enfants
+        lectures: fonctions lire de toutes les valeurs portees par les noeuds
+            (decision et probabilite pour la classification)
+    """
+
+    def __init__(self, nom, lire, ecrire, lectures):
+        self.nom = nom
+        self.lire = lire
+        self.ecrire = ecrire
+        self.lectures = lectures
+
+    def cle_feuille(self, noeud):
+        return tuple(lire(noeud)[4] for lire in self.lectures)
+
+
+REPRESENTATIONS = {
+    "node": Representation("node", lire_node, _ecrire_node, [lire_node]),
+    "classification": Representation("classification", lire_classification, _ecrire_classification,
+                                     [lire_classification, lire_proba]),
+    "regression": Representation("regression", lire_regression, _ecrire_regression, [lire_regression]),
+}
+
+
+def representation_de(racine):
+    """Representation d'un arbre deduite de sa racine (objet Node ou dictionnaire)"""
+    if isinstance(racine, dict):
+        return REPRESENTATIONS["classification" if "arbre enfant de gauche" in racine else "regression"]
+    return REPRESENTATIONS["node"]
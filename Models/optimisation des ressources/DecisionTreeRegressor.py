@@ -1,8 +1,18 @@
 import numpy as np
 import pandas as pd
-import json
 import matplotlib.pyplot as plt
- 
+import sys
+from pathlib import Path
+
+_MODELS_DIR=str(Path(__file__).resolve().parents[1]) # dossier Models (modules partages entre les arbres)
+if _MODELS_DIR not in sys.path:
+    sys.path.insert(0,_MODELS_DIR)
+from split_search import meilleur_split_variance
+from tree_builder import ConstructeurIndexe, attacher_node
+from node_table import tables_en_cache, lire_node
+from format_binaire import sauver_binaire, charger_binaire
+from codec_arbres import sauver_arbres, charger_arbres
+
 
 class Node:
     def __init__(self):
@@ -26,49 +36,31 @@ class decisionTreeRegressor: # Class arbre de decision regressif
 
     
     def build_tree(self,X,y,seuil_min_gain=0.0001,profondeur_max=20,profondeur=0):
+        # X est partage par tout l'arbre: chaque noeud ne connait que ses indices (pas de copie X[gauche_idx] par niveau)
+        y=np.asarray(y)
+        constructeur=ConstructeurIndexe(X)
 
-        node=Node() # creation du noeud racine
-        node.prediction=np.mean(y) # initialisation de la prediction/racine (moyenne de la target)
-        variance_parent=np.var(y) # initialisation de la variance de la racine (variance de la target)
-        meilleur_gain=0
-        meilleur_feature=None
-        meilleur_seuil=None
-    
-        # critere d'arret
-        if profondeur>=profondeur_max or len(y)<=1 or variance_parent==0:
-            return node
-        n_features=X.shape[1] # compte le nombre de features
-        # parcour tous les features pour rechercher le celui qui permet d'avoir le meilleur gain d'informations
-        # ainsi la valeur de seuil de split (decoupage)
-        for j in range(n_features):   # parcours de chaque feature
-            valeurs_uniques=np.unique(X[:,j])
-            for seuil in valeurs_uniques: # decoupage en split (deux sous groupes)
-                gauche_idx=X[:,j]<=seuil
-                droite_idx=X[:,j]>seuil
-                if np.sum(gauche_idx)==0 or np.sum(droite_idx)==0:
-                    continue
-                y_gauche=y[gauche_idx]
-                y_droite=y[droite_idx] 
-                # calcul du gain d'informations
-                erreur_apres=(len(y_gauche)/len(y))*np.var(y_gauche)+(len(y_droite)/len(y))*np.var(y_droite) # moyenne ponderer des varinces des splits
-                gain=variance_parent-erreur_apres
-                # recherche du meilleur split (maximisant le gain d'informations)
-                if(gain>meilleur_gain):
-                    meilleur_gain=gain
-                    meilleur_feature=j
-                    meilleur_seuil=seuil
-        # stocker le split
-        node.feature=meilleur_feature
-        node.threshold=meilleur_seuil
-        # verifier si le gain est significatif ou pas
-        if meilleur_gain<seuil_min_gain or meilleur_feature is None:
-            return node
-        # application recursive de l'algorithme sur les noeuds enfants gauche et droit
-        gauche_idx=X[:,node.feature]<=node.threshold
-        droite_idx=X[:,node.feature]>node.threshold
-        node.left=self.build_tree(X[gauche_idx],y[gauche_idx],seuil_min_gain,profondeur_max,profondeur+1)
-        node.right=self.build_tree(X[droite_idx],y[droite_idx],seuil_min_gain,profondeur_max,profondeur+1)
-        return node
+        def creer_noeud(echantillons,profondeur):
+            y_noeud=y[echantillons]
+            node=Node() # creation du noeud
+            node.prediction=np.mean(y_noeud) # initialisation de la prediction (moyenne de la target du noeud)
+            variance_parent=np.var(y_noeud) # initialisation de la variance du noeud
+            # critere d'arret
+            if profondeur>=profondeur_max or len(y_noeud)<=1 or variance_parent==0:
+                return node,None
+            # recherche vectorisee du meilleur split: chaque feature est triee une fois
+            # et tous les seuils sont evalues avec les sommes cumulees de y et y^2
+            meilleur_feature,meilleur_seuil,meilleur_gain=meilleur_split_variance(constructeur.X,y_noeud,variance_parent=variance_parent,echantillons=echantillons)
+            # stocker le split
+            node.feature=meilleur_feature
+            node.threshold=meilleur_seuil
+            # verifier si le gain est significatif ou pas
+            if meilleur_gain<seuil_min_gain or meilleur_feature is None:
+                return node,None
+            # le constructeur partitionne les indices et applique l'algorithme aux enfants gauche et droit
+            return node,(meilleur_feature,meilleur_seuil)
+
+        return constructeur.construire(creer_noeud,attacher_node,profondeur=profondeur)
     
     '''def plot_information_gain(self, X, y):
         gains = []
@@ -114,7 +106,9 @@ class decisionTreeRegressor: # Class arbre de decision regressif
             return self.predict_recursive(node.right,x)
 
     def predict(self,X): # effectue une prediction pour plusieurs vecteurs (plusieurs vecteurs en entrez un vecteur de valeurs predite en sortie
-        self.last_predict=np.array([self.predict_one(x) for x in X])
+        # arbre aplati en tableaux (feature, threshold, left, right, value): toutes les lignes descendent ensemble, un niveau par iteration
+        table=tables_en_cache(self,[self.root],lire_node)[0]
+        self.last_predict=table.predict(X)
         return self.last_predict
         
     def score(self,X,y): # Calcul du coefficient de determination 
@@ -122,37 +116,23 @@ class decisionTreeRegressor: # Class arbre de decision regressif
         return 1-(np.sum((y-y_pred)**2)/np.sum((y-np.mean(y))**2))
     
     def save(self, nom):
-        def node_to_dict(node):
-            if node is None:
-                return None
-            return {
-                'feature': int(node.feature) if node.feature is not None else None,
-                'threshold': float(node.threshold) if node.threshold is not None else None,
-                'prediction': float(node.prediction) if node.prediction is not None else None,
-                'left': node_to_dict(node.left),
-                'right': node_to_dict(node.right),
-            }
-
-        with open(nom, 'w', encoding='utf-8') as f:
-            json.dump(node_to_dict(self.root), f, ensure_ascii=False, indent=2)
+        # noeuds en ordre prefixe, ecrits au fil du fichier (voir codec_arbres.py)
+        sauver_arbres(nom, {'profondeur_max': self.profondeur_max, 'min_gain': self.min_gain}, self.root, cle='root')
         print(f"modèle sauvegardé en JSON: {nom}")
             
     @classmethod
     def load(cls, nom):
-        def dict_to_node(d):
-            if d is None:
-                return None
-            node = Node()
-            node.feature = d.get('feature')
-            node.threshold = d.get('threshold')
-            node.prediction = d.get('prediction')
-            node.left = dict_to_node(d.get('left'))
-            node.right = dict_to_node(d.get('right'))
-            return node
-
-        with open(nom, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-
-        model = cls()  # utilise les hyperparamètres par défaut
-        model.root = dict_to_node(data)
-        return model
\ No newline at end of file
+        # lit aussi l'ancien format imbrique (le fichier est directement la racine)
+        entete, root = charger_arbres(nom, Node, cle='root', unique=True)
+        model = cls(profondeur_max=entete.get('profondeur_max', 20), min_gain=entete.get('min_gain', 0.0001))
+        model.root = root
+        return model
+
+    def save_binary(self, nom):
+        # format binaire .npz (tableaux de noeuds + hyperparametres), projete en memoire par load_binary
+        sauver_binaire(self, nom)
+
+    @classmethod
+    def load_binary(cls, nom, mmap=True):
+        # pas de parsing: les tables de noeuds de predict pointent sur les pages du fichier (partagees entre workers)
+        return charger_binaire(cls, nom, mmap=mmap)
@@ -1,6 +1,17 @@
 import numpy as np
-import json
+import time
 import matplotlib.pyplot as plt
+import sys
+from pathlib import Path
+
+_MODELS_DIR=str(Path(__file__).resolve().parents[1]) # dossier Models (modules partages entre les arbres)
+if _MODELS_DIR not in sys.path:
+    sys.path.insert(0,_MODELS_DIR)
+from split_search import meilleur_split_variance, quantifier_features, meilleur_split_histogramme
+from tree_builder import ConstructeurIndexe, attacher_node
+from node_table import TableNoeuds, tables_en_cache, lire_node
+from format_binaire import sauver_binaire, charger_binaire
+from codec_arbres import sauver_arbres, charger_arbres
 
 class Node:
     def __init__(self):
@@ -12,68 +23,136 @@ class Node:
 
 
 class GradientBoostingRegressor: # Class arbre de decision regressif
-    def __init__(self,profondeur_max=10,min_gain=1e-5,n_trees=10,learning_rate=0.5): # constructeur: il permet d'initialiser les attributs (dans notre cas les hyperparametres d'une instance (objet)
+    def __init__(self,profondeur_max=10,min_gain=1e-5,n_trees=10,learning_rate=0.5,binned=False,max_bins=255,subsample=1.0,colsample_bytree=1.0,random_state=None): # constructeur: il permet d'initialiser les attributs (dans notre cas les hyperparametres d'une instance (objet)
         self.profondeur_max=profondeur_max
         self.min_gain=min_gain
         self.n_trees=n_trees
         self.learning_rate=learning_rate # taux d'apprentissage
+        self.binned=binned # mode histogramme: X quantifie une seule fois en uint8 au fit
+        self.max_bins=max_bins # nombre maximal d'intervalles par feature en mode histogramme
+        self.subsample=subsample # fraction des lignes tiree (sans remise) pour chaque arbre
+        self.colsample_bytree=colsample_bytree # fraction des features tiree pour chaque arbre
+        self.random_state=random_state # graine des tirages de lignes / features
+        self.temps_par_arbre=[] # duree d'entrainement (s) de chaque arbre du dernier fit
         self.forest=[] # definition de la foret
         self.init=None
 
-    def fit(self,X,y): # Fonction permettant l'entrainement du modele en utilisant l'arbre construit dans la fonction plus bas
-        r=y-np.mean(y) # calcul des residus initiaux
-        self.init=np.mean(y)
-        F=np.full(len(y),self.init)
+    def fit(self,X,y,X_val=None,y_val=None,patience=5,tolerance=0.0,warm_start=False): # Fonction permettant l'entrainement du modele en utilisant l'arbre construit dans la fonction plus bas
+        # arret precoce: si un jeu de validation est fourni, on arrete d'ajouter des arbres quand la MSE de validation
+        # ne s'ameliore plus d'au moins `tolerance` pendant `patience` arbres, puis on garde le meilleur nombre d'arbres
+        # warm_start=True: on garde init et la foret deja entrainee, F part de leur prediction sur X et on ajoute n_trees arbres
+        continuer=warm_start and self.init is not None
+        if continuer:
+            F=self.predict(X) # prediction courante de la foret chargee sur les nouvelles donnees
+        else:
+            self.init=np.mean(y)
+            self.forest=[] # un nouvel entrainement repart d'une foret vide
+            F=np.full(len(y),self.init)
+        r=y-F # calcul des residus initiaux
+        n_depart=len(self.forest)
+        valider=X_val is not None and y_val is not None
+        if valider:
+            F_val=self.predict(X_val) if continuer else np.full(len(y_val),self.init) # predictions de validation mises a jour arbre par arbre
+            self.historique_validation=[]
+            meilleure_perte=np.mean((y_val-F_val)**2) # perte de l'ensemble de depart: un arbre n'est garde que s'il l'ameliore
+            self.meilleur_n_trees=0
+        if self.binned: # X ne change pas d'un arbre a l'autre: quantification unique
+            X_bins,bornes=quantifier_features(X,self.max_bins)
+        rng=np.random.default_rng(self.random_state)
+        n_lignes,n_features=X.shape
+        n_tirees=max(1,int(round(self.subsample*n_lignes)))
+        n_colonnes=max(1,int(round(self.colsample_bytree*n_features)))
+        self.temps_par_arbre=[]
         for i in range(self.n_trees): # construction des differents arbres suivant le nombre fixe
-            tree=self.build_tree(X,r) # entrainement sur les residus
-            preds=self.predict_tree(tree,X) # prediction locale
+            debut=time.perf_counter()
+            # tirage des lignes et des features de l'arbre (aucun tirage quand les fractions valent 1: memes arbres qu'avant)
+            lignes=np.sort(rng.choice(n_lignes,n_tirees,replace=False)) if n_tirees<n_lignes else None
+            features=np.sort(rng.choice(n_features,n_colonnes,replace=False)) if n_colonnes<n_features else None
+            r_arbre=r if lignes is None else r[lignes]
+            if self.binned:
+                X_arbre=X_bins if lignes is None else X_bins[lignes]
+                tree,(numero_feuille,feuilles)=self.build_tree_binned(X_arbre,bornes,r_arbre,avec_feuilles=True,features=features)
+            else:
+                X_arbre=X if lignes is None else X[lignes]
+                tree,(numero_feuille,feuilles)=self.build_tree(X_arbre,r_arbre,avec_feuilles=True,features=features) # entrainement sur les residus
+            # prediction locale: valeur de la feuille atteinte par chaque ligne, connue des la construction (pas de predict_tree)
+            preds_arbre=np.array([feuille.prediction for feuille in feuilles])[numero_feuille]
+            if lignes is None:
+                preds=preds_arbre
+            else: # seules les lignes hors echantillon doivent parcourir l'arbre
+                preds=np.empty(n_lignes)
+                preds[lignes]=preds_arbre
+                hors_echantillon=np.ones(n_lignes,dtype=bool)
+                hors_echantillon[lignes]=False
+                preds[hors_echantillon]=self.predict_tree(tree,X[hors_echantillon])
             F+= self.learning_rate*preds # mise a jour de la prediction globale
             r=y-F # mise a jour des residus
             self.forest.append(tree) # ajout de l'arbre entrainer a la foret
+            self.temps_par_arbre.append(time.perf_counter()-debut)
+            if valider:
+                F_val+=self.learning_rate*self.predict_tree(tree,X_val)
+                perte=np.mean((y_val-F_val)**2)
+                self.historique_validation.append(perte)
+                if perte<meilleure_perte-tolerance:
+                    meilleure_perte=perte
+                    self.meilleur_n_trees=i+1
+                elif i+1-self.meilleur_n_trees>=patience:
+                    break
+        if valider:
+            self.forest=self.forest[:n_depart+self.meilleur_n_trees] # on retire les arbres ajoutes apres le meilleur score de validation
     
-    def build_tree(self,X,y,seuil_min_gain=1e-5,profondeur_max=10,profondeur=0):
-        node=Node() # creation du noeud racine
-        node.prediction=np.mean(y) # initialisation de la prediction/racine (moyenne de la target)
-        variance_parent=np.var(y) # initialisation de la variance de la racine (variance de la target)
-        meilleur_gain=0
-        meilleur_feature=None
-        meilleur_seuil=None
-    
-        # critere d'arret
-        if profondeur>=profondeur_max or len(y)<=1 or variance_parent==0:
-            return node
-        n_features=X.shape[1] # compte le nombre de features
-        # parcour tous les features pour rechercher le celui qui permet d'avoir le meilleur gain d'informations
-        # ainsi la valeur de seuil de split (decoupage)
-        for j in range(n_features):   # parcours de chaque feature
-            valeurs_uniques=np.unique(X[:,j])
-            for seuil in valeurs_uniques: # decoupage en split (deux sous groupes)
-                gauche_idx=X[:,j]<=seuil
-                droite_idx=X[:,j]>seuil
-                if np.sum(gauche_idx)==0 or np.sum(droite_idx)==0:
-                    continue
-                y_gauche=y[gauche_idx]
-                y_droite=y[droite_idx] 
-                # calcul du gain d'informations
-                erreur_apres=(len(y_gauche)/len(y))*np.var(y_gauche)+(len(y_droite)/len(y))*np.var(y_droite) # moyenne ponderer des varinces des splits
-                gain=variance_parent-erreur_apres
-                # recherche du meilleur split (maximisant le gain d'informations)
-                if(gain>meilleur_gain):
-                    meilleur_gain=gain
-                    meilleur_feature=j
-                    meilleur_seuil=seuil
-        # stocker le split
-        node.feature=meilleur_feature
-        node.threshold=meilleur_seuil
-        # verifier si le gain est significatif ou pas
-        if meilleur_gain<seuil_min_gain:
-            return node
-        # application recursive de l'algorithme sur les noeuds enfants gauche et droit
-        gauche_idx=X[:,node.feature]<=node.threshold
-        droite_idx=X[:,node.feature]>node.threshold
-        node.left=self.build_tree(X[gauche_idx],y[gauche_idx],seuil_min_gain,profondeur_max,profondeur+1)
-        node.right=self.build_tree(X[droite_idx],y[droite_idx],seuil_min_gain,profondeur_max,profondeur+1)
-        return node
+    def build_tree(self,X,y,seuil_min_gain=1e-5,profondeur_max=10,profondeur=0,avec_feuilles=False,features=None):
+        # avec_feuilles=True: retourne aussi (numero_feuille, feuilles), la feuille atteinte par chaque ligne de X
+        # features: indices des colonnes autorisees pour les splits (toutes par defaut)
+        # X est partage par tout l'arbre: chaque noeud ne connait que ses indices (pas de copie X[gauche_idx] par niveau)
+        y=np.asarray(y)
+        constructeur=ConstructeurIndexe(X)
+
+        def creer_noeud(echantillons,profondeur):
+            y_noeud=y[echantillons]
+            node=Node() # creation du noeud
+            node.prediction=np.mean(y_noeud) # initialisation de la prediction (moyenne de la target du noeud)
+            variance_parent=np.var(y_noeud) # initialisation de la variance du noeud
+            # critere d'arret
+            if profondeur>=profondeur_max or len(y_noeud)<=1 or variance_parent==0:
+                return node,None
+            # recherche vectorisee du meilleur split (sommes cumulees de y et y^2), memes arbres que la double boucle
+            meilleur_feature,meilleur_seuil,meilleur_gain=meilleur_split_variance(constructeur.X,y_noeud,features=features,variance_parent=variance_parent,echantillons=echantillons)
+            # stocker le split
+            node.feature=meilleur_feature
+            node.threshold=meilleur_seuil
+            # verifier si le gain est significatif ou pas
+            if meilleur_gain<seuil_min_gain or meilleur_feature is None:
+                return node,None
+            return node,(meilleur_feature,meilleur_seuil)
+
+        tree=constructeur.construire(creer_noeud,attacher_node,profondeur=profondeur)
+        return (tree,constructeur.affectation_feuilles()) if avec_feuilles else tree
+
+    def build_tree_binned(self,X_bins,bornes,y,seuil_min_gain=1e-5,profondeur_max=10,profondeur=0,avec_feuilles=False,features=None):
+        # meme arbre que build_tree mais les seuils candidats sont les bornes des intervalles
+        # et les gains sont lus sur les histogrammes des residus du noeud
+        y=np.asarray(y)
+        constructeur=ConstructeurIndexe(X_bins)
+
+        def creer_noeud(echantillons,profondeur):
+            y_noeud=y[echantillons]
+            node=Node()
+            node.prediction=np.mean(y_noeud)
+            variance_parent=np.var(y_noeud)
+            if profondeur>=profondeur_max or len(y_noeud)<=1 or variance_parent==0:
+                return node,None
+            # residus centres, hessians a 1: score/n = reduction de variance
+            meilleur_feature,meilleur_bin,score=meilleur_split_histogramme(constructeur.X,bornes,y_noeud-node.prediction,np.ones(len(y_noeud)),features=features,echantillons=echantillons)
+            meilleur_gain=score/len(y_noeud)
+            if meilleur_feature is None or meilleur_gain<seuil_min_gain:
+                return node,None
+            node.feature=meilleur_feature
+            node.threshold=float(bornes[meilleur_feature][meilleur_bin]) # seuil reel: predict fonctionne sur X brut
+            return node,(meilleur_feature,meilleur_bin) # partition sur les numeros d'intervalle
+
+        tree=constructeur.construire(creer_noeud,attacher_node,profondeur=profondeur)
+        return (tree,constructeur.affectation_feuilles()) if avec_feuilles else tree
 
     def predict_one(self,tree,x): # effectue une prediction pour une seule instance ( un vecteur en entrer , un scalaire en sortie). Ici se sont les residus qui sont predit
         if tree.left is None and tree.right is None:
@@ -84,14 +163,16 @@ class GradientBoostingRegressor: # Class arbre de decision regressif
             return self.predict_one(tree.right,x)
 
     def predict_tree(self,tree,X): # effectue une prediction pour plusieurs vecteurs (plusieurs vecteurs en entrez un vecteur de valeurs predite en sortie
-        return np.array([self.predict_one(tree,x) for x in X])
+        # arbre aplati en tableaux: tout le lot de lignes avance d'un niveau par iteration
+        return TableNoeuds.depuis_arbre(tree,lire_node).predict(X)
 
 
     def predict(self, X):
         F = np.full(len(X), self.init)
-        for tree in self.forest:
-            F += self.learning_rate * self.predict_tree(tree, X)
+        for table in tables_en_cache(self,self.forest,lire_node): # tables des arbres calculees une fois par foret
+            F += self.learning_rate * table.predict(X)
         return F
+
         ''' plt.figure(figsize=(12, 6))
         for idx, tree in enumerate(self.forest):
                 predictions = self.predict_tree(tree, X)
@@ -102,52 +183,64 @@ class GradientBoostingRegressor: # Class arbre de decision regressif
         plt.legend()
         plt.show()'''
 
+    def staged_predict(self,X): # genere la prediction apres chaque arbre (calcul incremental, un seul parcours par arbre)
+        F=np.full(len(X),self.init)
+        for table in tables_en_cache(self,self.forest,lire_node):
+            F=F+self.learning_rate*table.predict(X)
+            yield F
+
     def score(self,X,y): # Calcul du coefficient de determination
         y_pred=self.predict(X)
         return 1-(np.sum((y-y_pred)**2)/np.sum((y-y.mean())**2))
 
     def save(self, nom):
-        def node_to_dict(node):
-            if node is None:
-                return None
-            return {
-                'feature': int(node.feature) if node.feature is not None else None,
-                'threshold': float(node.threshold) if node.threshold is not None else None,
-                'prediction': float(node.prediction) if node.prediction is not None else None,
-                'left': node_to_dict(node.left),
-                'right': node_to_dict(node.right),
-            }
-
+        # noeuds en ordre prefixe, ecrits au fil du fichier (voir codec_arbres.py)
         data = {
             'profondeur_max': self.profondeur_max,
             'min_gain': self.min_gain,
             'n_trees': self.n_trees,
             'learning_rate': self.learning_rate,
-            'init': float(self.init) if self.init is not None else None,
-            'forest': [node_to_dict(tree) for tree in self.forest]
+            'binned': self.binned,
+            'max_bins': self.max_bins,
+            'subsample': self.subsample,
+            'colsample_bytree': self.colsample_bytree,
+            'random_state': self.random_state,
+            'init': float(self.init) if self.init is not None else None
         }
-        with open(nom, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        sauver_arbres(nom, data, self.forest)
 
     @classmethod
     def load(cls, nom):
-        def dict_to_node(d):
-            if d is None:
-                return None
-            node = Node()
-            node.feature = d['feature']
-            node.threshold = d['threshold']
-            node.prediction = d['prediction']
-            node.left = dict_to_node(d['left'])
-            node.right = dict_to_node(d['right'])
-            return node
-
-        with open(nom, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        data, forest = charger_arbres(nom, Node)  # format preordre ou ancien format imbrique
         model = cls(profondeur_max=data.get('profondeur_max', 10),
                     min_gain=data.get('min_gain', 1e-5),
                     n_trees=data.get('n_trees', 2),
-                    learning_rate=data.get('learning_rate', 0.5))
+                    learning_rate=data.get('learning_rate', 0.5),
+                    binned=data.get('binned', False),
+                    max_bins=data.get('max_bins', 255),
+                    subsample=data.get('subsample', 1.0),
+                    colsample_bytree=data.get('colsample_bytree', 1.0),
+                    random_state=data.get('random_state', None))
         model.init = data.get('init', None)
-        model.forest = [dict_to_node(t) for t in data.get('forest', [])]
-        return model
\ No newline at end of file
+        model.forest = forest
+        return model
+
+    def continuer(self,X,y,n_trees,X_val=None,y_val=None,patience=5,tolerance=0.0):
+        # reprise (warm start) d'une foret entrainee ou chargee: F part de sa prediction sur X et n_trees arbres
+        # sont ajoutes sur les residus (arret precoce comme fit). Ensuite n_trees vaut le nombre d'arbres de la foret,
+        # pour que la sauvegarde decrive l'ensemble etendu
+        if self.init is None:
+            raise ValueError("Aucune foret a continuer: entrainer (fit) ou charger (load) le modele d'abord.")
+        self.n_trees=n_trees
+        self.fit(np.asarray(X),np.asarray(y),X_val,y_val,patience,tolerance,warm_start=True)
+        self.n_trees=len(self.forest)
+        return self
+
+    def save_binary(self, nom):
+        # format binaire .npz (tableaux de noeuds + hyperparametres), projete en memoire par load_binary
+        sauver_binaire(self, nom)
+
+    @classmethod
+    def load_binary(cls, nom, mmap=True):
+        # pas de parsing: les tables de noeuds de predict pointent sur les pages du fichier (partagees entre workers)
+        return charger_binaire(cls, nom, mmap=mmap)
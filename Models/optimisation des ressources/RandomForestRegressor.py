@@ -1,6 +1,18 @@
 import numpy as np 
-import json
 import matplotlib.pyplot as plt
+import sys
+from functools import partial
+from pathlib import Path
+
+_MODELS_DIR=str(Path(__file__).resolve().parents[1]) # dossier Models (modules partages entre les arbres)
+if _MODELS_DIR not in sys.path:
+    sys.path.insert(0,_MODELS_DIR)
+from parallel_forest import construire_foret
+from split_search import meilleur_split_variance
+from tree_builder import ConstructeurIndexe, attacher_node
+from node_table import TableNoeuds, tables_en_cache, lire_node
+from format_binaire import sauver_binaire, charger_binaire
+from codec_arbres import sauver_arbres, charger_arbres
 
 class Node:
     def __init__(self):
@@ -11,72 +23,59 @@ class Node:
         self.right=None # noeud enfant a droite
 
 class RandomForestRegressor: # Class foret aleatoire regressif
-    def __init__(self,profondeur_max=10,min_gain=1e-5,n_trees=10): # constructeur: il permet d'initialiser les attributs (dans notre cas les hyperparametres d'une instance (objet)
+    def __init__(self,profondeur_max=10,min_gain=1e-5,n_trees=10,n_jobs=1,random_state=None): # constructeur: il permet d'initialiser les attributs (dans notre cas les hyperparametres d'une instance (objet)
         self.profondeur_max=profondeur_max
         self.min_gain=min_gain
         self.forest=[] # definition de la foret
         self.n_trees=n_trees # nombres d'arbres de la foret
+        self.n_jobs=n_jobs # nombre de processus pour construire les arbres (-1 = tous les coeurs)
+        self.random_state=random_state # graine de la foret: meme foret quel que soit n_jobs
         
     # Fonction permettant l'entrainement du modele en utilisant l'arbre construit dans la fonction plus bas. 
-    # On construit ici un arbre a chaque iteration, puis on les stocke dans dans une liste d'arbres (foret)
+    # Les arbres sont independants: ils sont construits en parallele si n_jobs>1, chacun avec son propre generateur aleatoire,
+    # puis stockes dans une liste d'arbres (foret)
     def fit(self,X,y): 
-        for i in range(self.n_trees):
-           self.forest.append(self.build_tree(X,y))
+        construire=partial(_arbre_bootstrap,profondeur_max=self.profondeur_max,min_gain=self.min_gain)
+        self.forest.extend(construire_foret(construire,X,y,self.n_trees,self.n_jobs,self.random_state))
            
     
-    def build_tree(self,X,y,seuil_min_gain=1e-5,profondeur_max=10,profondeur=0):
-        n_samples = len(X)
-        bootstrap_idx = np.random.choice(n_samples, size=n_samples, replace=True)
-        X_bootstrap = X[bootstrap_idx]
-        y_bootstrap = y[bootstrap_idx]      # creation de l'echantillon bootstrap
-        
-        node=Node() # creation du noeud racine
-        node.prediction=np.mean(y_bootstrap) # initialisation de la prediction/racine (moyenne de la target)
-        variance_parent=np.var(y_bootstrap) # initialisation de la variance de la racine (variance de la target)
-        meilleur_gain=0
-        meilleur_feature=None
-        meilleur_seuil=None
-    
-        # critere d'arret
-        if profondeur>=profondeur_max or len(y_bootstrap)<=1 or variance_parent==0:
-            return node
-        n_features = np.random.choice(
-        X_bootstrap.shape[1],
-        size=int(np.sqrt(X_bootstrap.shape[1])),  # règle classique
-        replace=False
-        )
-        # selection aleatoire des features.
-        # parcour tous les features pour rechercher le celui qui permet d'avoir le meilleur gain d'informations
-        # ainsi la valeur de seuil de split (decoupage)
-        for j in n_features:   # parcours de chaque feature
-            valeurs_uniques=np.unique(X_bootstrap[:,j])
-            for seuil in valeurs_uniques: # decoupage en split (deux sous groupes)
-                gauche_idx=X_bootstrap[:,j]<=seuil
-                droite_idx=X_bootstrap[:,j]>seuil
-                if np.sum(gauche_idx)==0 or np.sum(droite_idx)==0:
-                    continue
-                y_gauche=y_bootstrap[gauche_idx]
-                y_droite=y_bootstrap[droite_idx] 
-                # calcul du gain d'informations
-                erreur_apres=(len(y_gauche)/len(y_bootstrap))*np.var(y_gauche)+(len(y_droite)/len(y_bootstrap))*np.var(y_droite) # moyenne ponderer des varinces des splits
-                gain=variance_parent-erreur_apres
-                # recherche du meilleur split (maximisant le gain d'informations)
-                if(gain>meilleur_gain):
-                    meilleur_gain=gain
-                    meilleur_feature=j
-                    meilleur_seuil=seuil
-        # stocker le split
-        node.feature=meilleur_feature
-        node.threshold=meilleur_seuil
-        # verifier si le gain est significatif ou pas
-        if meilleur_gain<seuil_min_gain:
-            return node
-        # application recursive de l'algorithme sur les noeuds enfants gauche et droit
-        gauche_idx=X_bootstrap[:,node.feature]<=node.threshold
-        droite_idx=X_bootstrap[:,node.feature]>node.threshold
-        node.left=self.build_tree(X_bootstrap[gauche_idx],y_bootstrap[gauche_idx],seuil_min_gain,profondeur_max,profondeur+1)
-        node.right=self.build_tree(X_bootstrap[droite_idx],y_bootstrap[droite_idx],seuil_min_gain,profondeur_max,profondeur+1)
-        return node
+    def build_tree(self,X,y,seuil_min_gain=1e-5,profondeur_max=10,profondeur=0,rng=None):
+        rng=np.random if rng is None else rng # generateur aleatoire de l'arbre (np.random global par defaut)
+        # X est partage par tout l'arbre: chaque noeud ne connait que ses indices (pas de copie X_bootstrap[gauche_idx] par niveau)
+        y=np.asarray(y)
+        constructeur=ConstructeurIndexe(X)
+
+        def creer_noeud(echantillons,profondeur):
+            # echantillon bootstrap du noeud, ecrit dans sa tranche du tampon d'indices:
+            # les enfants sont partitionnes a partir des lignes tirees, comme l'ancien X_bootstrap[gauche_idx]
+            n_samples=len(echantillons)
+            echantillons[:]=echantillons[rng.choice(n_samples, size=n_samples, replace=True)]
+            y_bootstrap=y[echantillons]
+
+            node=Node() # creation du noeud
+            node.prediction=np.mean(y_bootstrap) # initialisation de la prediction (moyenne de la target du noeud)
+            variance_parent=np.var(y_bootstrap) # initialisation de la variance du noeud
+            # critere d'arret
+            if profondeur>=profondeur_max or len(y_bootstrap)<=1 or variance_parent==0:
+                return node,None
+            # selection aleatoire des features
+            n_features = rng.choice(
+            constructeur.X.shape[1],
+            size=int(np.sqrt(constructeur.X.shape[1])),  # règle classique
+            replace=False
+            )
+            # recherche vectorisee du meilleur split parmi les features tirees, parcourues dans l'ordre du tirage
+            meilleur_feature,meilleur_seuil,meilleur_gain=meilleur_split_variance(constructeur.X,y_bootstrap,features=n_features,variance_parent=variance_parent,echantillons=echantillons)
+            # stocker le split
+            node.feature=meilleur_feature
+            node.threshold=meilleur_seuil
+            # verifier si le gain est significatif ou pas
+            if meilleur_gain<seuil_min_gain or meilleur_feature is None:
+                return node,None
+            # le constructeur partitionne les indices et applique l'algorithme aux enfants gauche et droit
+            return node,(meilleur_feature,meilleur_seuil)
+
+        return constructeur.construire(creer_noeud,attacher_node,profondeur=profondeur)
 
     def predict_one(self,node,x): # effectue une prediction pour une seule instance ( un vecteur en entrer , unscalaire en sortie)
         if node.left is None and node.right is None:
@@ -89,12 +88,13 @@ class RandomForestRegressor: # Class foret aleatoire regressif
 
             
     def predict_tree(self,root,X): # effectue une prediction pour plusieurs vecteurs (plusieurs vecteurs en entrez un vecteur de valeurs predite en sortie
-        return np.array([self.predict_one(root,x) for x in X])
+        # arbre aplati en tableaux: tout le lot de lignes avance d'un niveau par iteration
+        return TableNoeuds.depuis_arbre(root,lire_node).predict(X)
     
     def predict(self,X):
         preds = []
-        for root in self.forest:
-            preds.append(self.predict_tree(root, X))
+        for table in tables_en_cache(self,self.forest,lire_node): # tables des arbres calculees une fois par foret
+            preds.append(table.predict(X))
             
             # Visualisation des valeurs prédites
         '''plt.figure(figsize=(10, 6))
@@ -111,44 +111,33 @@ class RandomForestRegressor: # Class foret aleatoire regressif
         y_pred=self.predict(X)
         return 1-(np.sum((y-y_pred)**2)/np.sum((y-np.mean(y))**2))
     def save(self, nom):
-        def node_to_dict(node):
-            if node is None:
-                return None
-            return {
-                'feature': int(node.feature) if node.feature is not None else None,
-                'threshold': float(node.threshold) if node.threshold is not None else None,
-                'prediction': float(node.prediction) if node.prediction is not None else None,
-                'left': node_to_dict(node.left),
-                'right': node_to_dict(node.right),
-            }
-
+        # noeuds en ordre prefixe, ecrits au fil du fichier (voir codec_arbres.py)
         data = {
             'profondeur_max': self.profondeur_max,
             'min_gain': self.min_gain,
-            'n_trees': self.n_trees,
-            'forest': [node_to_dict(tree) for tree in self.forest]
+            'n_trees': self.n_trees
         }
-        with open(nom, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        sauver_arbres(nom, data, self.forest)
 
     @classmethod
     def load(cls, nom):
-        def dict_to_node(d):
-            if d is None:
-                return None
-            node = Node()
-            node.feature = d['feature']
-            node.threshold = d['threshold']
-            node.prediction = d['prediction']
-            node.left = dict_to_node(d['left'])
-            node.right = dict_to_node(d['right'])
-            return node
-
-        with open(nom, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        data, forest = charger_arbres(nom, Node)  # format preordre ou ancien format imbrique
         model = cls(profondeur_max=data.get('profondeur_max', 10),
                     min_gain=data.get('min_gain', 1e-5),
                     n_trees=data.get('n_trees', 2))
-        model.forest = [dict_to_node(t) for t in data.get('forest', [])]
+        model.forest = forest
         return model
-    
+
+    def save_binary(self, nom):
+        # format binaire .npz (tableaux de noeuds + hyperparametres), projete en memoire par load_binary
+        sauver_binaire(self, nom)
+
+    @classmethod
+    def load_binary(cls, nom, mmap=True):
+        # pas de parsing: les tables de noeuds de predict pointent sur les pages du fichier (partagees entre workers)
+        return charger_binaire(cls, nom, mmap=mmap)
+
+
+def _arbre_bootstrap(X,y,rng,profondeur_max=10,min_gain=1e-5):
+    # fonction de module (et non methode) pour pouvoir etre envoyee aux processus de construire_foret
+    return RandomForestRegressor(profondeur_max,min_gain).build_tree(X,y,rng=rng)
@@ -1,6 +1,16 @@
 import numpy as np
-import json
 import matplotlib.pyplot as plt
+import sys
+from pathlib import Path
+
+_MODELS_DIR = str(Path(__file__).resolve().parents[1])  # dossier Models (modules partages entre les arbres)
+if _MODELS_DIR not in sys.path:
+    sys.path.insert(0, _MODELS_DIR)
+from split_search import quantifier_features, meilleur_split_histogramme
+from tree_builder import ConstructeurIndexe, attacher_node
+from node_table import TableNoeuds, tables_en_cache, lire_node
+from format_binaire import sauver_binaire, charger_binaire
+from codec_arbres import sauver_arbres, charger_arbres
 
 class Node:
     def __init__(self):
@@ -14,19 +24,45 @@ class Node:
 class XGBoostRegressor:
 
     def __init__(self, profondeur_max=10, min_gain=1e-5, n_trees=10, 
-                 learning_rate=0.3, reg_lambda=1.0):
+                 learning_rate=0.3, reg_lambda=1.0, binned=False, max_bins=255):
         self.profondeur_max = profondeur_max
         self.min_gain = min_gain
         self.n_trees = n_trees
         self.learning_rate = learning_rate
         self.reg_lambda = reg_lambda  #  Régularisation
+        self.binned = binned  # Mode histogramme: X quantifié une seule fois en uint8 au fit
+        self.max_bins = max_bins  # Nombre maximal d'intervalles par feature
         self.forest = []
         self.init = None
 
-    def fit(self, X, y):
-        # Initialisation: prédiction de base (moyenne)
-        self.init = np.mean(y)
-        F = np.full(len(y), self.init)  # Prédictions actuelles
+    def fit(self, X, y, X_val=None, y_val=None, patience=5, tolerance=0.0, warm_start=False):
+        # Arrêt précoce: si un jeu de validation est fourni, on arrête d'ajouter des arbres
+        # quand la MSE de validation ne s'améliore plus d'au moins `tolerance` pendant
+        # `patience` arbres, puis on garde le meilleur nombre d'arbres
+        # warm_start=True: on garde init et la forêt déjà entraînée, F part de leur
+        # prédiction sur X et on ajoute n_trees arbres
+        continuer = warm_start and self.init is not None
+        
+        if continuer:
+            F = self.predict(X)  # Prédictions de la forêt chargée sur les nouvelles données
+        else:
+            # Initialisation: prédiction de base (moyenne)
+            self.init = np.mean(y)
+            self.forest = []  # Un nouvel entraînement repart d'une forêt vide
+            F = np.full(len(y), self.init)  # Prédictions actuelles
+        n_depart = len(self.forest)
+        valider = X_val is not None and y_val is not None
+        if valider:
+            # Prédictions de validation, mises à jour arbre par arbre
+            F_val = self.predict(X_val) if continuer else np.full(len(y_val), self.init)
+            self.historique_validation = []
+            # Perte de l'ensemble de départ (init, ou forêt existante en warm start):
+            # un arbre n'est gardé que s'il l'améliore
+            meilleure_perte = np.mean((y_val - F_val) ** 2)
+            self.meilleur_n_trees = 0
+        if self.binned:
+            # X ne change pas entre les rounds: quantification unique
+            X_bins, bornes = quantifier_features(X, self.max_bins)
             
         for i in range(self.n_trees):
                 #  Calcul des gradients et hessians
@@ -35,10 +71,16 @@ class XGBoostRegressor:
             hessians = np.ones(len(y))  
                 
                 # Construire un arbre sur les gradients (avec hessians)
-            tree = self.build_tree(X, gradients, hessians)
+            if self.binned:
+                tree, (numero_feuille, feuilles) = self.build_tree_binned(
+                    X_bins, bornes, gradients, hessians, avec_feuilles=True)
+            else:
+                tree, (numero_feuille, feuilles) = self.build_tree(
+                    X, gradients, hessians, avec_feuilles=True)
                 
-                # Prédictions de l'arbre
-            preds = self.predict_tree(tree, X)
+                # Prédictions de l'arbre: valeur de la feuille atteinte par chaque ligne,
+                # connue dès la construction (pas de nouveau parcours avec predict_tree)
+            preds = np.array([feuille.prediction for feuille in feuilles])[numero_feuille]
                 
                 # Mise à jour des prédictions avec learning rate
             F += self.learning_rate * preds
@@ -46,6 +88,21 @@ class XGBoostRegressor:
                 # Stocker l'arbre
             self.forest.append(tree)
             
+                # Suivi de la perte de validation et arrêt précoce
+            if valider:
+                F_val += self.learning_rate * self.predict_tree(tree, X_val)
+                perte = np.mean((y_val - F_val) ** 2)
+                self.historique_validation.append(perte)
+                if perte < meilleure_perte - tolerance:
+                    meilleure_perte = perte
+                    self.meilleur_n_trees = i + 1
+                elif i + 1 - self.meilleur_n_trees >= patience:
+                    break
+        
+        if valider:
+            # On retire les arbres ajoutés après le meilleur score de validation
+            self.forest = self.forest[:n_depart + self.meilleur_n_trees]
+            
             '''# Visualisation: nuage de points gradient vs hessian
             plt.figure(figsize=(10, 6))
             sizes = np.abs(preds) * 100  # Taille des points basée sur la prédiction
@@ -58,20 +115,51 @@ class XGBoostRegressor:
             plt.tight_layout()
             plt.show()'''
     
-    def build_tree(self, X, gradients, hessians, profondeur=10):
-        
-        node = Node()
+    def build_tree(self, X, gradients, hessians, profondeur=0, avec_feuilles=False):
+        # avec_feuilles=True: retourne aussi (numero_feuille, feuilles), la feuille atteinte par chaque ligne de X
+        # X est partagé par tout l'arbre: chaque noeud ne connaît que ses indices
+        # (pas de copie X[gauche_idx] / gradients[gauche_idx] à chaque niveau)
+        gradients = np.asarray(gradients)
+        hessians = np.asarray(hessians)
+        constructeur = ConstructeurIndexe(X)
         
-        # Calcul de la prédiction optimale pour cette feuille
-        # Formule: -sum(gradients) / (sum(hessians) + lambda)
-        G = np.sum(gradients)  # Somme des gradients
-        H = np.sum(hessians)   # Somme des hessians
-        node.prediction = -G / (H + self.reg_lambda)
-        
-        # Critères d'arrêt
-        if profondeur >= self.profondeur_max or len(gradients) <= 1:
-            return node
+        def creer_noeud(echantillons, profondeur):
+            g_noeud = gradients[echantillons]
+            h_noeud = hessians[echantillons]
+            node = Node()
+            
+            # Calcul de la prédiction optimale pour cette feuille
+            # Formule: -sum(gradients) / (sum(hessians) + lambda)
+            G = np.sum(g_noeud)  # Somme des gradients
+            H = np.sum(h_noeud)  # Somme des hessians
+            node.prediction = -G / (H + self.reg_lambda)
+            
+            # Critères d'arrêt
+            if profondeur >= self.profondeur_max or len(g_noeud) <= 1:
+                return node, None
+            
+            meilleur_feature, meilleur_seuil, meilleur_gain = self._meilleur_split(
+                constructeur.X, echantillons, g_noeud, h_noeud
+            )
+            
+            # Vérifier si le gain est suffisant
+            if meilleur_gain < self.min_gain or meilleur_feature is None:
+                return node, None
+            
+            # Stocker le split (le constructeur partitionne les indices et construit les enfants)
+            node.feature = meilleur_feature
+            node.threshold = meilleur_seuil
+            node.gain = meilleur_gain
+            return node, (meilleur_feature, meilleur_seuil)
         
+        tree = constructeur.construire(creer_noeud, attacher_node, profondeur=profondeur)
+        return (tree, constructeur.affectation_feuilles()) if avec_feuilles else tree
+
+    def _meilleur_split(self, X, echantillons, gradients, hessians):
+        # Recherche exhaustive du meilleur split sur les échantillons d'un noeud
+        # (lignes echantillons de X, lues une colonne à la fois)
+        G = np.sum(gradients)
+        H = np.sum(hessians)
         n_features = X.shape[1]
         meilleur_gain = 0
         meilleur_feature = None
@@ -83,66 +171,77 @@ class XGBoostRegressor:
         
         # Recherche du meilleur split
         for j in range(n_features):
-            valeurs_uniques = np.unique(X[:, j])
+            x = X[echantillons, j]
+            valeurs_uniques = np.unique(x)
             
             for seuil in valeurs_uniques:
-                gauche_idx = X[:, j] <= seuil
-                droite_idx = X[:, j] > seuil
-                
+                gauche_idx = x <= seuil
+                droite_idx = x > seuil
+
                 if np.sum(gauche_idx) == 0 or np.sum(droite_idx) == 0:
                     continue
-                
+
                 # Séparer les gradients et hessians
                 g_gauche = gradients[gauche_idx]
                 h_gauche = hessians[gauche_idx]
                 g_droite = gradients[droite_idx]
                 h_droite = hessians[droite_idx]
-                
+
                 # Sommes pour gauche et droite
                 G_L = np.sum(g_gauche)
                 H_L = np.sum(h_gauche)
                 G_R = np.sum(g_droite)
                 H_R = np.sum(h_droite)
-                
+
                 # Calcul du gain selon la formule XGBoost
                 # Gain = 0.5 * [G_L^2/(H_L+lambda) + G_R^2/(H_R+lambda) - G^2/(H+lambda)]
                 score_gauche = (G_L**2) / (H_L + self.reg_lambda)
                 score_droite = (G_R**2) / (H_R + self.reg_lambda)
                 gain = 0.5 * (score_gauche + score_droite - (G**2)/(H + self.reg_lambda))
-                
+
                 # Mise à jour du meilleur split
                 if gain > meilleur_gain:
                     meilleur_gain = gain
                     meilleur_feature = j
                     meilleur_seuil = seuil
         
-        # Vérifier si le gain est suffisant
-        if meilleur_gain < self.min_gain or meilleur_feature is None:
-            return node
-        
-        # Stocker le split
-        node.feature = meilleur_feature
-        node.threshold = meilleur_seuil
-        node.gain = meilleur_gain
-        
-        # Récursion sur les enfants
-        gauche_idx = X[:, node.feature] <= node.threshold
-        droite_idx = X[:, node.feature] > node.threshold
+        return meilleur_feature, meilleur_seuil, meilleur_gain
+
+    def build_tree_binned(self, X_bins, bornes, gradients, hessians, profondeur=0, avec_feuilles=False):
+        # Même arbre que build_tree, mais les gains sont lus sur les histogrammes
+        # de gradients/hessians du noeud (un bincount par feature)
+        gradients = np.asarray(gradients)
+        hessians = np.asarray(hessians)
+        constructeur = ConstructeurIndexe(X_bins)
         
-        node.left = self.build_tree(
-            X[gauche_idx], 
-            gradients[gauche_idx], 
-            hessians[gauche_idx], 
-            profondeur + 1
-        )
-        node.right = self.build_tree(
-            X[droite_idx], 
-            gradients[droite_idx], 
-            hessians[droite_idx], 
-            profondeur + 1
-        )
+        def creer_noeud(echantillons, profondeur):
+            g_noeud = gradients[echantillons]
+            h_noeud = hessians[echantillons]
+            node = Node()
+            G = np.sum(g_noeud)
+            H = np.sum(h_noeud)
+            node.prediction = -G / (H + self.reg_lambda)
+            
+            if profondeur >= self.profondeur_max or len(g_noeud) <= 1:
+                return node, None
+            
+            meilleur_feature, meilleur_bin, score = meilleur_split_histogramme(
+                constructeur.X, bornes, g_noeud, h_noeud, self.reg_lambda, echantillons=echantillons
+            )
+            meilleur_gain = 0.5 * score
+            
+            if meilleur_feature is None or meilleur_gain < self.min_gain:
+                return node, None
+            
+            # Seuil réel: predict fonctionne directement sur X brut;
+            # la partition se fait sur les numéros d'intervalle
+            node.feature = meilleur_feature
+            node.threshold = float(bornes[meilleur_feature][meilleur_bin])
+            node.gain = meilleur_gain
+            return node, (meilleur_feature, meilleur_bin)
         
-        return node
+        tree = constructeur.construire(creer_noeud, attacher_node, profondeur=profondeur)
+        return (tree, constructeur.affectation_feuilles()) if avec_feuilles else tree
 
     def predict_one(self, tree, x):
         if tree.left is None and tree.right is None:
@@ -153,65 +252,71 @@ class XGBoostRegressor:
             return self.predict_one(tree.right, x)
 
     def predict_tree(self, tree, X):
-        return np.array([self.predict_one(tree, x) for x in X])
+        # Arbre aplati en tableaux: tout le lot de lignes avance d'un niveau par itération
+        return TableNoeuds.depuis_arbre(tree, lire_node).predict(X)
 
     def predict(self, X):
         F = np.full(len(X), self.init)
-        for tree in self.forest:
-            F += self.learning_rate * self.predict_tree(tree, X)
+        # Tables des arbres calculées une seule fois par forêt
+        for table in tables_en_cache(self, self.forest, lire_node):
+            F += self.learning_rate * table.predict(X)
         return F
 
+    def staged_predict(self, X):
+        # Génère la prédiction après chaque arbre (calcul incrémental, un seul parcours par arbre)
+        F = np.full(len(X), self.init)
+        for table in tables_en_cache(self, self.forest, lire_node):
+            F = F + self.learning_rate * table.predict(X)
+            yield F
+
     def score(self, X, y):
         y_pred = self.predict(X)
         return 1 - (np.sum((y - y_pred)**2) / np.sum((y - np.mean(y))**2))
 
     def save(self, nom):
-        def node_to_dict(node):
-            if node is None:
-                return None
-            return {
-                'feature': int(node.feature) if node.feature is not None else None,
-                'threshold': float(node.threshold) if node.threshold is not None else None,
-                'prediction': float(node.prediction) if node.prediction is not None else None,
-                'gain': float(getattr(node, 'gain', 0)) if hasattr(node, 'gain') else None,
-                'left': node_to_dict(node.left),
-                'right': node_to_dict(node.right),
-            }
-
+        # noeuds en ordre prefixe, ecrits au fil du fichier (voir codec_arbres.py)
         data = {
             'profondeur_max': self.profondeur_max,
             'min_gain': self.min_gain,
             'n_trees': self.n_trees,
             'learning_rate': self.learning_rate,
             'reg_lambda': self.reg_lambda,
-            'init': float(self.init) if self.init is not None else None,
-            'forest': [node_to_dict(tree) for tree in self.forest]
+            'binned': self.binned,
+            'max_bins': self.max_bins,
+            'init': float(self.init) if self.init is not None else None
         }
-        with open(nom, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        sauver_arbres(nom, data, self.forest, optionnels=('gain',))
 
     @classmethod
     def load(cls, nom):
-        def dict_to_node(d):
-            if d is None:
-                return None
-            node = Node()
-            node.feature = d['feature']
-            node.threshold = d['threshold']
-            node.prediction = d['prediction']
-            if d.get('gain') is not None:
-                node.gain = d['gain']
-            node.left = dict_to_node(d['left'])
-            node.right = dict_to_node(d['right'])
-            return node
-
-        with open(nom, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        data, forest = charger_arbres(nom, Node, optionnels=('gain',))  # format preordre ou ancien format imbrique
         model = cls(profondeur_max=data.get('profondeur_max', 10),
                     min_gain=data.get('min_gain', 1e-5),
                     n_trees=data.get('n_trees', 2),
                     learning_rate=data.get('learning_rate', 0.3),
-                    reg_lambda=data.get('reg_lambda', 1.0))
+                    reg_lambda=data.get('reg_lambda', 1.0),
+                    binned=data.get('binned', False),
+                    max_bins=data.get('max_bins', 255))
         model.init = data.get('init', None)
-        model.forest = [dict_to_node(t) for t in data.get('forest', [])]
-        return model
\ No newline at end of file
+        model.forest = forest
+        return model
+
+    def continuer(self, X, y, n_trees, X_val=None, y_val=None, patience=5, tolerance=0.0):
+        # Reprise (warm start) d'une forêt entraînée ou chargée: F part de sa prédiction sur X
+        # et n_trees arbres sont ajoutés sur les gradients (arrêt précoce comme fit). Ensuite
+        # n_trees vaut le nombre d'arbres de la forêt, pour que la sauvegarde décrive l'ensemble étendu
+        if self.init is None:
+            raise ValueError("Aucune forêt à continuer: entraîner (fit) ou charger (load) le modèle d'abord.")
+        self.n_trees = n_trees
+        self.fit(np.asarray(X), np.asarray(y), X_val, y_val, patience, tolerance, warm_start=True)
+        self.n_trees = len(self.forest)
+        return self
+
+    def save_binary(self, nom):
+        # format binaire .npz (tableaux de noeuds + hyperparametres), projete en memoire par load_binary
+        sauver_binaire(self, nom)
+
+    @classmethod
+    def load_binary(cls, nom, mmap=True):
+        # pas de parsing: les tables de noeuds de predict pointent sur les pages du fichier (partagees entre workers)
+        return charger_binaire(cls, nom, mmap=mmap)
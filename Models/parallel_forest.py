@@ -0,0 +1,74 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Construction parallele des arbres d'une foret.
+# Chaque arbre recoit son propre np.random.Generator, derive d'une SeedSequence
+# commune: la foret obtenue ne depend que de random_state, pas du nombre de
+# processus. X et y sont copies une seule fois dans une memoire partagee que
+# chaque processus ouvre a son demarrage (aucune copie par arbre).
+
+_ETAT_PROCESSUS = {}
+
+
+def _vers_memoire_partagee(tableau):
+    shm = shared_memory.SharedMemory(create=True, size=max(tableau.nbytes, 1))
+    vue = np.ndarray(tableau.shape, dtype=tableau.dtype, buffer=shm.buf)
+    vue[...] = tableau
+    return shm, (shm.name, tableau.shape, tableau.dtype.str)
+
+
+def _initialiser_processus(construire_arbre, description_X, description_y):
+    # appele une fois par processus: ouverture des memoires partagees
+    tableaux = []
+    for nom, shape, dtype in (description_X, description_y):
+        shm = shared_memory.SharedMemory(name=nom)
+        _ETAT_PROCESSUS.setdefault('shm', []).append(shm)  # garder la reference
+        tableaux.append(np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf))
+    _ETAT_PROCESSUS['X'], _ETAT_PROCESSUS['y'] = tableaux
+    _ETAT_PROCESSUS['construire_arbre'] = construire_arbre
+
+
+def _construire_un_arbre(graine):
+    rng = np.random.default_rng(graine)
+    return _ETAT_PROCESSUS['construire_arbre'](_ETAT_PROCESSUS['X'], _ETAT_PROCESSUS['y'], rng)
+
+
+def construire_foret(construire_arbre, X, y, n_arbres, n_jobs=1, random_state=None):
+    """
+    Construit n_arbres arbres independants, eventuellement dans un pool de processus
+
+    Args:
+        construire_arbre: fonction (X, y, rng) -> arbre, definie au niveau d'un module
+            (ou functools.partial d'une telle fonction) pour pouvoir etre envoyee aux processus
+        X: matrice d'entrainement
+        y: target
+        n_arbres: nombre d'arbres a construire
+        n_jobs: nombre de processus (1 = sequentiel, -1 = tous les coeurs)
+        random_state: graine de la foret (None = graine aleatoire)
+
+    Returns:
+        liste des arbres, dans l'ordre des graines
+    """
+    graines = np.random.SeedSequence(random_state).spawn(n_arbres)
+    if n_jobs is None or n_jobs == -1:
+        n_jobs = os.cpu_count() or 1
+    n_jobs = min(n_jobs, n_arbres)
+    if n_jobs <= 1:
+        return [construire_arbre(X, y, np.random.default_rng(g)) for g in graines]
+
+    X = np.ascontiguousarray(X)
+    y = np.ascontiguousarray(y)
+    shm_X, description_X = _vers_memoire_partagee(X)
+    shm_y, description_y = _vers_memoire_partagee(y)
+    try:
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_initialiser_processus,
+                                 initargs=(construire_arbre, description_X, description_y)) as executor:
+            chunksize = max(1, n_arbres // (4 * n_jobs))
+            return list(executor.map(_construire_un_arbre, graines, chunksize=chunksize))
+    finally:
+        for shm in (shm_X, shm_y):
+            shm.close()
+            shm.unlink()
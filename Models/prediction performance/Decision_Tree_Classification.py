@@ -1,5 +1,15 @@
 import numpy as np
 import json
+import sys
+from pathlib import Path
+
+_MODELS_DIR = str(Path(__file__).resolve().parents[1])      # dossier Models (modules partages entre les arbres)
+if _MODELS_DIR not in sys.path:
+    sys.path.insert(0, _MODELS_DIR)
+from split_search import meilleur_split_entropie
+from tree_builder import ConstructeurIndexe
+from node_table import lire_classification, lire_proba, tables_en_cache
+from format_binaire import sauver_binaire, charger_binaire
 
 class DecisionTreeClassification:
     def __init__(self, profondeur_max=10, nb_ex_feuilles_min=2):
@@ -9,112 +19,88 @@ class DecisionTreeClassification:
         self.racine = None
 
     def fit(self, X, y):                  # Entrainement du model
-        self.racine = self.Arbre(X, y)
-
-    def Arbre(self, X, y, profondeur=0):           # Construction de l'arbre
-        X = np.array(X, dtype=float)
+        X = np.asarray(X, dtype=float)     # conversion et validation une seule fois (sans copie si X est deja un tableau de reels)
         y = np.array(y, dtype=float)
+        if X.ndim != 2 or len(X) != len(y) or len(y) == 0:
+            raise ValueError("X doit etre une matrice (n_echantillons, n_features) et y un vecteur de meme longueur.")
+        self.racine = self.Arbre(X, y)
 
-        meilleur_gain = 0
-        meilleur_feature = None
-        meilleur_seuil = None
-        nb_colonnes = X.shape[1]
-
-        # Entropie du parent
-        index_yes = y == 1       # Index le resultat positif
-        index_no = y == 0        # Index le resultat négatif
-        proba_parent_yes = np.sum(index_yes) / len(y)    # Probabilité d'un resultat positif
-        proba_parent_no = np.sum(index_no) / len(y)      # Probabilité d'un resultat négatif
-        
-        # Gestion de l'entropie parent (éviter log(0))
-        if proba_parent_yes == 0 or proba_parent_yes == 1:
-            entropie_parent = 0
-        else:
-            entropie_parent = - proba_parent_yes * np.log2(proba_parent_yes) - proba_parent_no * np.log2(proba_parent_no)
-
-        for feature in range(nb_colonnes):
-            unique_X = np.unique(X[:, feature])
-            
-            for seuil in unique_X:
-                index_gauche = X[:, feature] <= seuil
-                index_droite = X[:, feature] > seuil
-                
-                # Vérifier qu'il y a des éléments des deux côtés
-                if np.sum(index_gauche) == 0 or np.sum(index_droite) == 0:
-                    continue
-
-                # Entropie enfants
-                y_gauche = y[index_gauche]     # target connaissant X <= seuil
-                y_droite = y[index_droite]     # target connaissant X > seuil
-
-                # Du coté gauche
-                index_gauche_yes = y_gauche == 1      # index le resultat positif a gauche
-                proba_gauche_yes = np.sum(index_gauche_yes) / len(y_gauche)      # probabilité d'un resultat positif a gauche 
-                proba_gauche_no = 1 - proba_gauche_yes            # probabilité d'un resultat négatif a gauche
-                
-                if proba_gauche_yes == 0 or proba_gauche_yes == 1:   # pour eviter log2(0)
-                    entropie_gauche = 0
-                else:
-                    entropie_gauche = - proba_gauche_yes * np.log2(proba_gauche_yes) - proba_gauche_no * np.log2(proba_gauche_no)
-
-                # Du coté droite
-                index_droite_yes = y_droite == 1        # index le resultat positif a drite
-                proba_droite_yes = np.sum(index_droite_yes) / len(y_droite)         # probabilité d'un resultat positif a droite
-                proba_droite_no = 1 - proba_droite_yes               # probabilité d'un resultat négatif a droite
-                
-                if proba_droite_yes == 0 or proba_droite_yes == 1:   # pour eviter log2(0)
-                    entropie_droite = 0
-                else:
-                    entropie_droite = - proba_droite_yes * np.log2(proba_droite_yes) - proba_droite_no * np.log2(proba_droite_no)
-
-                # Gain d'information
-                gain = entropie_parent - (np.sum(index_gauche) / len(y)) * entropie_gauche - (np.sum(index_droite) / len(y)) * entropie_droite
-
-                # Mise à jour des paramètres
-                if gain > meilleur_gain:
-                    meilleur_gain = gain
-                    meilleur_feature = feature
-                    meilleur_seuil = seuil
-
-        # reinitialisation de l'arbre des arbre enfants
-        arbre_gauche = None
-        arbre_droite = None
-
-        # Conditions de continuite : conditions à respecter pour poursuire la construction de l'arbre
-        if (profondeur < self.profondeur_max and 
-            meilleur_gain > 0 and 
-            len(y) >= self.nb_ex_feuilles_min and 
-            meilleur_feature is not None):
-            
-            index_gauche = X[:, meilleur_feature] <= meilleur_seuil
-            index_droite = X[:, meilleur_feature] > meilleur_seuil
-
-            arbre_gauche = self.Arbre(X[index_gauche], y[index_gauche], profondeur + 1)
-            arbre_droite = self.Arbre(X[index_droite], y[index_droite], profondeur + 1)
-
-        # Décision (classe majoritaire)
-        index_yes = y == 1
-        if np.sum(index_yes) / len(y) > 0.5:
-            decision = 1
-        else:
-            decision = 0
-
-        return {
-            "feature": meilleur_feature,
-            "seuil": meilleur_seuil,
-            "decision": decision,
-            "arbre enfant de gauche": arbre_gauche,
-            "arbre enfant de droite": arbre_droite
-        }
+    def Arbre(self, X, y, profondeur=0):           # Construction de l'arbre (X et y deja convertis en tableaux de reels)
+        # X est partagé par tout l'arbre: chaque noeud ne reçoit que la tranche de ses indices
+        # (pas de copie X[index_gauche] à chaque niveau)
+        constructeur = ConstructeurIndexe(X)
+
+        def creer_noeud(echantillons, profondeur):
+            y_noeud = y[echantillons]
+
+            # Entropie du parent
+            index_yes = y_noeud == 1       # Index le resultat positif
+            index_no = y_noeud == 0        # Index le resultat négatif
+            proba_parent_yes = np.sum(index_yes) / len(y_noeud)    # Probabilité d'un resultat positif
+            proba_parent_no = np.sum(index_no) / len(y_noeud)      # Probabilité d'un resultat négatif
+
+            # Gestion de l'entropie parent (éviter log(0))
+            if proba_parent_yes == 0 or proba_parent_yes == 1:
+                entropie_parent = 0
+            else:
+                entropie_parent = - proba_parent_yes * np.log2(proba_parent_yes) - proba_parent_no * np.log2(proba_parent_no)
+
+            # Recherche vectorisée du meilleur split: chaque feature est triée une fois,
+            # les comptes cumulés de positifs donnent l'entropie de tous les seuils d'un coup
+            meilleur_feature, meilleur_seuil, meilleur_gain = meilleur_split_entropie(
+                constructeur.X, y_noeud, entropie_parent, echantillons=echantillons)
+
+            # Décision (classe majoritaire)
+            if np.sum(index_yes) / len(y_noeud) > 0.5:
+                decision = 1
+            else:
+                decision = 0
+
+            noeud = {
+                "feature": meilleur_feature,
+                "seuil": meilleur_seuil,
+                "decision": decision,
+                "proba": float(proba_parent_yes),     # fréquence de la classe 1 dans le noeud (predict_proba)
+                "arbre enfant de gauche": None,
+                "arbre enfant de droite": None
+            }
+
+            # Conditions de continuite : conditions à respecter pour poursuire la construction de l'arbre
+            if (profondeur < self.profondeur_max and 
+                meilleur_gain > 0 and 
+                len(y_noeud) >= self.nb_ex_feuilles_min and 
+                meilleur_feature is not None):
+                return noeud, (meilleur_feature, meilleur_seuil)
+            return noeud, None
+
+        def attacher(noeud, arbre_gauche, arbre_droite):
+            noeud["arbre enfant de gauche"] = arbre_gauche
+            noeud["arbre enfant de droite"] = arbre_droite
+            return noeud
+
+        return constructeur.construire(creer_noeud, attacher, profondeur=profondeur)
 
     def predict(self, X):
 
         X = np.array(X, dtype=float)     # changer X en tableau de reels
-        predictions = np.array([])       
-        for i in range(X.shape[0]):      # separé le tableau en plusieurs instances 
-            x = X[i, :]
-            predictions = np.append(predictions, self.predict_one(x, self.racine))     # prediction
-        return predictions
+        # Arbre aplati en tableaux (feature, seuil, enfants, decision): toutes les instances
+        # descendent ensemble, un niveau par itération
+        table = tables_en_cache(self, [self.racine], lire_classification)[0]
+        return table.predict(X)
+
+    def predict_proba(self, X):
+        """
+        Probabilité de la classe 1: fréquence de la classe 1 dans la feuille atteinte,
+        calculée au fit (les modèles sauvegardés sans fréquences retournent la décision 0/1)
+        """
+        X = np.array(X, dtype=float)
+        table = tables_en_cache(self, [self.racine], lire_proba, '_tables_proba')[0]
+        return table.predict(X)
+
+    def apply(self, X):
+        """Numéro de la feuille atteinte par chaque instance (numérotation préfixe des noeuds, racine = 0)"""
+        X = np.array(X, dtype=float)
+        return tables_en_cache(self, [self.racine], lire_classification)[0].apply(X)
 
     def predict_one(self, x, noeud):      # prediction d'une instance 
         # Si c'est une feuille, retourner la décision
@@ -174,3 +160,30 @@ class DecisionTreeClassification:
         print(f"✓ Modèle chargé depuis '{nom_fichier}'")
         
         return self
+
+    def save_binary(self, nom_fichier):
+        """
+        Sauvegarde le modèle au format binaire (.npz, voir format_binaire.py)
+
+        Args:
+            nom_fichier: Chemin du fichier de sortie
+        """
+        sauver_binaire(self, nom_fichier)
+        print(f"✓ Modèle sauvegardé dans '{nom_fichier}'")
+
+    @classmethod
+    def load_binary(cls, nom_fichier, mmap=True):
+        """
+        Charge un modèle sauvegardé par save_binary, sans parsing: les tableaux
+        sont projetés en mémoire et partagés entre les processus qui les lisent
+
+        Args:
+            nom_fichier: Chemin du fichier à charger
+            mmap: projeter les tableaux au lieu de les lire
+
+        Returns:
+            le modèle chargé
+        """
+        modele = charger_binaire(cls, nom_fichier, mmap=mmap)
+        print(f"✓ Modèle chargé depuis '{nom_fichier}'")
+        return modele
@@ -1,6 +1,16 @@
 import json
+import sys
+from pathlib import Path
+
 import numpy as np
 
+_MODELS_DIR = str(Path(__file__).resolve().parents[1])  # dossier Models (modules partagés entre les arbres)
+if _MODELS_DIR not in sys.path:
+    sys.path.insert(0, _MODELS_DIR)
+from tree_builder import ConstructeurIndexe
+from node_table import lire_regression, tables_en_cache
+from format_binaire import sauver_binaire, charger_binaire
+
 class ArbreRegression:
     """
     Arbre de régression pour prédire la moyenne des étudiants
@@ -30,7 +40,7 @@ class ArbreRegression:
             X: Caractéristiques (numpy array ou liste) - shape (n_samples, n_features)
             y: Valeurs cibles (moyennes des étudiants) - shape (n_samples,)
         """
-        X = np.array(X, dtype=float)
+        X = np.asarray(X, dtype=float)  # X n'est jamais modifié: pas de copie
         y = np.array(y, dtype=float)
         
         # Vérifier les dimensions
@@ -48,71 +58,82 @@ class ArbreRegression:
         """
         Construit récursivement l'arbre de régression
         Utilise la variance comme critère de division
+
+        X est partagé par tout l'arbre: chaque noeud ne reçoit que la tranche
+        de ses indices (pas de copie X[indices_gauche] à chaque niveau)
         """
-        n_echantillons = len(y)
-        variance_actuelle = np.var(y)
+        constructeur = ConstructeurIndexe(X)
         
-        # Conditions d'arrêt
-        if (profondeur >= self.profondeur_max or 
-            n_echantillons < self.min_echantillons or
-            variance_actuelle < self.min_variance):
+        def feuille(y_noeud, n_echantillons, variance_actuelle):
             # Créer une feuille avec la moyenne
             return {
                 'feuille': True,
-                'valeur': np.mean(y),
+                'valeur': np.mean(y_noeud),
                 'n_echantillons': n_echantillons,
                 'variance': variance_actuelle
             }
         
-        # Trouver la meilleure division
-        meilleure_feature, meilleur_seuil, meilleur_gain = self._meilleure_division(X, y)
-        
-        # Si aucun gain significatif, créer une feuille
-        if meilleur_gain <= 0 or meilleure_feature is None:
-            return {
-                'feuille': True,
-                'valeur': np.mean(y),
-                'n_echantillons': n_echantillons,
-                'variance': variance_actuelle
+        def creer_noeud(echantillons, profondeur):
+            y_noeud = y[echantillons]
+            n_echantillons = len(y_noeud)
+            variance_actuelle = np.var(y_noeud)
+            
+            # Conditions d'arrêt
+            if (profondeur >= self.profondeur_max or 
+                n_echantillons < self.min_echantillons or
+                variance_actuelle < self.min_variance):
+                return feuille(y_noeud, n_echantillons, variance_actuelle), None
+            
+            # Trouver la meilleure division
+            meilleure_feature, meilleur_seuil, meilleur_gain = self._meilleure_division(
+                constructeur.X, y_noeud, echantillons)
+            
+            # Si aucun gain significatif, créer une feuille
+            if meilleur_gain <= 0 or meilleure_feature is None:
+                return feuille(y_noeud, n_echantillons, variance_actuelle), None
+            
+            # Vérifier que la division n'est pas vide
+            n_gauche = np.sum(constructeur.X[echantillons, meilleure_feature] <= meilleur_seuil)
+            if n_gauche == 0 or n_gauche == n_echantillons:
+                return feuille(y_noeud, n_echantillons, variance_actuelle), None
+            
+            # Noeud interne: les sous-arbres sont attachés par le constructeur
+            noeud = {
+                'feature': int(meilleure_feature),
+                'seuil': float(meilleur_seuil),
+                'gain': float(meilleur_gain),
+                'n_echantillons': n_echantillons
             }
+            return noeud, (meilleure_feature, meilleur_seuil)
         
-        # Diviser les données selon le meilleur critère
-        indices_gauche = X[:, meilleure_feature] <= meilleur_seuil
-        indices_droite = X[:, meilleure_feature] > meilleur_seuil
-        
-        # Vérifier que la division n'est pas vide
-        if np.sum(indices_gauche) == 0 or np.sum(indices_droite) == 0:
+        def attacher(noeud, gauche, droite):
             return {
-                'feuille': True,
-                'valeur': np.mean(y),
-                'n_echantillons': n_echantillons,
-                'variance': variance_actuelle
+                'feuille': False,
+                'feature': noeud['feature'],
+                'seuil': noeud['seuil'],
+                'gauche': gauche,
+                'droite': droite,
+                'gain': noeud['gain'],
+                'n_echantillons': noeud['n_echantillons']
             }
         
-        # Construire les sous-arbres récursivement
-        gauche = self._construire_arbre(X[indices_gauche], y[indices_gauche], profondeur + 1)
-        droite = self._construire_arbre(X[indices_droite], y[indices_droite], profondeur + 1)
-        
-        return {
-            'feuille': False,
-            'feature': int(meilleure_feature),
-            'seuil': float(meilleur_seuil),
-            'gauche': gauche,
-            'droite': droite,
-            'gain': float(meilleur_gain),
-            'n_echantillons': n_echantillons
-        }
+        return constructeur.construire(creer_noeud, attacher, profondeur=profondeur)
     
-    def _meilleure_division(self, X, y):
+    def _meilleure_division(self, X, y, echantillons):
         """
         Trouve la meilleure division en maximisant la réduction de variance
         
+        Args:
+            X: matrice complète des caractéristiques (lue une colonne à la fois)
+            y: valeurs cibles du noeud
+            echantillons: indices des lignes de X du noeud
+        
         Returns:
             meilleure_feature: Index de la meilleure caractéristique
             meilleur_seuil: Meilleur seuil de division
             meilleur_gain: Meilleure réduction de variance
         """
-        n_echantillons, n_features = X.shape
+        n_echantillons, n_features = len(echantillons), X.shape[1]
         
         if n_echantillons <= 1:
             return None, None, 0
@@ -125,8 +146,10 @@ class ArbreRegression:
         
         # Parcourir toutes les caractéristiques
         for feature in range(n_features):
+            x = X[echantillons, feature]
+            
             # Obtenir les valeurs uniques triées
-            valeurs_uniques = np.unique(X[:, feature])
+            valeurs_uniques = np.unique(x)
             
             # Si une seule valeur, pas de division possible
             if len(valeurs_uniques) <= 1:
@@ -137,8 +160,8 @@ class ArbreRegression:
                 seuil = (valeurs_uniques[i] + valeurs_uniques[i + 1]) / 2.0
                 
                 # Diviser les données
-                indices_gauche = X[:, feature] <= seuil
-                indices_droite = X[:, feature] > seuil
+                indices_gauche = x <= seuil
+                indices_droite = x > seuil
                 
                 # Vérifier que les deux groupes sont non vides
                 n_gauche = np.sum(indices_gauche)
@@ -188,8 +211,9 @@ class ArbreRegression:
         if len(X.shape) == 1:
             X = X.reshape(1, -1)
         
-        # Prédire pour chaque échantillon
-        predictions = np.array([self._predire_un(x, self.arbre) for x in X])
+        # Arbre aplati en tableaux (feature, seuil, enfants, valeur): tous les échantillons
+        # descendent ensemble, un niveau par itération
+        predictions = tables_en_cache(self, [self.arbre], lire_regression)[0].predict(X)
         
         return predictions
     
@@ -293,4 +317,29 @@ class ArbreRegression:
         
         return self
 
+    def save_binary(self, nom_fichier):
+        """
+        Sauvegarde le modèle au format binaire (.npz, voir format_binaire.py)
+
+        Args:
+            nom_fichier: Chemin du fichier de sortie
+        """
+        sauver_binaire(self, nom_fichier)
+        print(f"✓ Modèle sauvegardé dans '{nom_fichier}'")
 
+    @classmethod
+    def load_binary(cls, nom_fichier, mmap=True):
+        """
+        Charge un modèle sauvegardé par save_binary, sans parsing: les tableaux
+        sont projetés en mémoire et partagés entre les processus qui les lisent
+
+        Args:
+            nom_fichier: Chemin du fichier à charger
+            mmap: projeter les tableaux au lieu de les lire
+
+        Returns:
+            le modèle chargé
+        """
+        modele = charger_binaire(cls, nom_fichier, mmap=mmap)
+        print(f"✓ Modèle chargé depuis '{nom_fichier}'")
+        return modele
@@ -1,13 +1,27 @@
 import numpy as np
 import json
+import sys
+from functools import partial
+from pathlib import Path
+
+_MODELS_DIR = str(Path(__file__).resolve().parents[1])      # dossier Models (modules partages entre les arbres)
+if _MODELS_DIR not in sys.path:
+    sys.path.insert(0, _MODELS_DIR)
+from parallel_forest import construire_foret
+from split_search import meilleur_split_entropie
+from tree_builder import ConstructeurIndexe
+from node_table import lire_classification, tenseur_en_cache
+from format_binaire import sauver_binaire, charger_binaire
 
 class RandomForestClassification :
 
-    def __init__ (self,nb_arbre = 100, profondeur_max=10, nb_ex_feuilles_min=2 ) :
+    def __init__ (self,nb_arbre = 100, profondeur_max=10, nb_ex_feuilles_min=2, n_jobs=1, random_state=None ) :
 
         self.nb_arbre = nb_arbre        # Nombre d'arbre dans la forêt
         self.profondeur_max = profondeur_max          # Attributs de l'arbre de decision
         self.nb_ex_feuilles_min = nb_ex_feuilles_min        # Nombre d'exemple par feuille minimum: nbre minimum d'instances qui doit arriver jusqu'a cette feuille
+        self.n_jobs = n_jobs              # Nombre de processus pour construire les arbres (-1 = tous les coeurs)
+        self.random_state = random_state      # Graine de la forêt: même forêt quel que soit n_jobs
         self.forest = []
         
 
@@ -16,137 +30,99 @@ class RandomForestClassification :
         X = np.array(X, dtype=float)
         y = np.array(y, dtype=float)
 
-        for k in range (self.nb_arbre) :
+        # Les arbres sont indépendants: construits en parallèle si n_jobs > 1,
+        # chacun avec son propre générateur aléatoire
+        construire = partial(_arbre_echantillonne, profondeur_max=self.profondeur_max,
+                             nb_ex_feuilles_min=self.nb_ex_feuilles_min)
+        self.forest.extend(construire_foret(construire, X, y, self.nb_arbre, self.n_jobs, self.random_state))
 
-            tree = None
+    def arbre_aleatoire(self, X, y, rng):          # Construction d'un arbre de la forêt sur un échantillon aléatoire
 
-            index_colonnes = np.random.choice(X.shape[1],size= (X.shape[1]//2)+1 ,replace= True)    # selectionne les colonnes au hazard
-            index_lignes =  np.random.choice(X.shape[0],size= (X.shape[0]//2)+1 ,replace= True)     # selectionne les lignes au hazard avec remplacement (bootstrap)
+        index_colonnes = rng.choice(X.shape[1],size= (X.shape[1]//2)+1 ,replace= True)    # selectionne les colonnes au hazard
+        index_lignes =  rng.choice(X.shape[0],size= (X.shape[0]//2)+1 ,replace= True)     # selectionne les lignes au hazard avec remplacement (bootstrap)
 
-            X_reduit = X[:,index_colonnes]           # recupere les colonnes choisi
-            X_reduit = X_reduit[index_lignes,:]      # recupere les lignes choisi
-            y_reduit = y[index_lignes]            # recupee les resultatas des instances choisi
+        X_reduit = X[:,index_colonnes]           # recupere les colonnes choisi
+        X_reduit = X_reduit[index_lignes,:]      # recupere les lignes choisi
+        y_reduit = y[index_lignes]            # recupee les resultatas des instances choisi
 
-            tree = self.Arbre(X_reduit,y_reduit)
-            self.forest.append(tree)
+        return self.Arbre(X_reduit,y_reduit)
 
-    def Arbre(self, X, y, profondeur=0):           # Construction de l'arbre
-        X = np.array(X, dtype=float)
-        y = np.array(y, dtype=float)
+    def Arbre(self, X, y, profondeur=0):           # Construction de l'arbre (X et y deja convertis en tableaux de reels)
+        # X est partagé par tout l'arbre: chaque noeud ne reçoit que la tranche de ses indices
+        # (pas de copie X[index_gauche] à chaque niveau)
+        constructeur = ConstructeurIndexe(X)
 
-        meilleur_gain = 0
-        meilleur_feature = None
-        meilleur_seuil = None
-        nb_colonnes = X.shape[1]
+        def creer_noeud(echantillons, profondeur):
+            y_noeud = y[echantillons]
 
-        # Entropie du parent
-        index_yes = y == 1       # Index le resultat positif
-        index_no = y == 0        # Index le resultat négatif
-        proba_parent_yes = np.sum(index_yes) / len(y)    # Probabilité d'un resultat positif
-        proba_parent_no = np.sum(index_no) / len(y)      # Probabilité d'un resultat négatif
-        
-        # Gestion de l'entropie parent (éviter log(0))
-        if proba_parent_yes == 0 or proba_parent_yes == 1:
-            entropie_parent = 0
-        else:
-            entropie_parent = - proba_parent_yes * np.log2(proba_parent_yes) - proba_parent_no * np.log2(proba_parent_no)
-
-        for feature in range(nb_colonnes):
-            unique_X = np.unique(X[:, feature])
-            
-            for seuil in unique_X:
-                index_gauche = X[:, feature] <= seuil
-                index_droite = X[:, feature] > seuil
-                
-                # Vérifier qu'il y a des éléments des deux côtés
-                if np.sum(index_gauche) == 0 or np.sum(index_droite) == 0:
-                    continue
-
-                # Entropie enfants
-                y_gauche = y[index_gauche]     # target connaissant X <= seuil
-                y_droite = y[index_droite]     # target connaissant X > seuil
-
-                # Du coté gauche
-                index_gauche_yes = y_gauche == 1      # index le resultat positif a gauche
-                proba_gauche_yes = np.sum(index_gauche_yes) / len(y_gauche)      # probabilité d'un resultat positif a gauche 
-                proba_gauche_no = 1 - proba_gauche_yes            # probabilité d'un resultat négatif a gauche
-                
-                if proba_gauche_yes == 0 or proba_gauche_yes == 1:   # pour eviter log2(0)
-                    entropie_gauche = 0
-                else:
-                    entropie_gauche = - proba_gauche_yes * np.log2(proba_gauche_yes) - proba_gauche_no * np.log2(proba_gauche_no)
-
-                # Du coté droite
-                index_droite_yes = y_droite == 1        # index le resultat positif a drite
-                proba_droite_yes = np.sum(index_droite_yes) / len(y_droite)         # probabilité d'un resultat positif a droite
-                proba_droite_no = 1 - proba_droite_yes               # probabilité d'un resultat négatif a droite
-                
-                if proba_droite_yes == 0 or proba_droite_yes == 1:   # pour eviter log2(0)
-                    entropie_droite = 0
-                else:
-                    entropie_droite = - proba_droite_yes * np.log2(proba_droite_yes) - proba_droite_no * np.log2(proba_droite_no)
-
-                # Gain d'information
-                gain = entropie_parent - (np.sum(index_gauche) / len(y)) * entropie_gauche - (np.sum(index_droite) / len(y)) * entropie_droite
-
-                # Mise à jour des paramètres
-                if gain > meilleur_gain:
-                    meilleur_gain = gain
-                    meilleur_feature = feature
-                    meilleur_seuil = seuil
-
-        # reinitialisation de l'arbre des arbre enfants
-        arbre_gauche = None
-        arbre_droite = None
-
-        # Conditions de continuite : conditions à respecter pour poursuire la construction de l'arbre
-        if (profondeur < self.profondeur_max and 
-            meilleur_gain > 0 and 
-            len(y) >= self.nb_ex_feuilles_min and 
-            meilleur_feature is not None):
-            
-            index_gauche = X[:, meilleur_feature] <= meilleur_seuil
-            index_droite = X[:, meilleur_feature] > meilleur_seuil
-
-            arbre_gauche = self.Arbre(X[index_gauche], y[index_gauche], profondeur + 1)
-            arbre_droite = self.Arbre(X[index_droite], y[index_droite], profondeur + 1)
-
-        # Décision (classe majoritaire)
-        index_yes = y == 1
-        if np.sum(index_yes) / len(y) > 0.5:
-            decision = 1
-        else:
-            decision = 0
-
-        return {
-            "feature": meilleur_feature,
-            "seuil": meilleur_seuil,
-            "decision": decision,
-            "arbre enfant de gauche": arbre_gauche,
-            "arbre enfant de droite": arbre_droite
-        }
+            # Entropie du parent
+            index_yes = y_noeud == 1       # Index le resultat positif
+            index_no = y_noeud == 0        # Index le resultat négatif
+            proba_parent_yes = np.sum(index_yes) / len(y_noeud)    # Probabilité d'un resultat positif
+            proba_parent_no = np.sum(index_no) / len(y_noeud)      # Probabilité d'un resultat négatif
 
-    def predict(self, X):
+            # Gestion de l'entropie parent (éviter log(0))
+            if proba_parent_yes == 0 or proba_parent_yes == 1:
+                entropie_parent = 0
+            else:
+                entropie_parent = - proba_parent_yes * np.log2(proba_parent_yes) - proba_parent_no * np.log2(proba_parent_no)
 
-        X = np.array(X, dtype=float)     # changer X en tableau de reels
-        predictions = np.array([])       
-        for i in range(X.shape[0]):      # separé le tableau en plusieurs instances 
-            x = X[i, :]
-            predict_forest = np.array([]) 
-
-            for j in range (self.nb_arbre) :    # fait une prediction d'une même instance sur chaque arbre
-                predict_forest = np.append(predict_forest, self.predict_one_tree(x, self.forest[j]))     # prediction de tous les arbres
-                
-            # Décision de la foret
-            index_yes = predict_forest == 1
-            if np.sum(index_yes) / self.nb_arbre > 0.5:
+            # Recherche vectorisée du meilleur split: chaque feature est triée une fois,
+            # les comptes cumulés de positifs donnent l'entropie de tous les seuils d'un coup
+            meilleur_feature, meilleur_seuil, meilleur_gain = meilleur_split_entropie(
+                constructeur.X, y_noeud, entropie_parent, echantillons=echantillons)
+
+            # Décision (classe majoritaire)
+            if np.sum(index_yes) / len(y_noeud) > 0.5:
                 decision = 1
             else:
                 decision = 0
-            
-            predictions = np.append(predictions,decision)
 
-        return predictions
+            noeud = {
+                "feature": meilleur_feature,
+                "seuil": meilleur_seuil,
+                "decision": decision,
+                "arbre enfant de gauche": None,
+                "arbre enfant de droite": None
+            }
+
+            # Conditions de continuite : conditions à respecter pour poursuire la construction de l'arbre
+            if (profondeur < self.profondeur_max and 
+                meilleur_gain > 0 and 
+                len(y_noeud) >= self.nb_ex_feuilles_min and 
+                meilleur_feature is not None):
+                return noeud, (meilleur_feature, meilleur_seuil)
+            return noeud, None
+
+        def attacher(noeud, arbre_gauche, arbre_droite):
+            noeud["arbre enfant de gauche"] = arbre_gauche
+            noeud["arbre enfant de droite"] = arbre_droite
+            return noeud
+
+        return constructeur.construire(creer_noeud, attacher, profondeur=profondeur)
+
+    def predict(self, X):
+
+        # Décision de la foret: vote majoritaire
+        return np.where(self.predict_proba(X) > 0.5, 1.0, 0.0)
+
+    def predict_proba(self, X):
+        """Fraction des arbres qui votent pour la classe 1, pour chaque instance"""
+
+        X = np.array(X, dtype=float)     # changer X en tableau de reels
+        # Tous les arbres empilés en tenseurs de noeuds: toutes les instances descendent
+        # dans tous les arbres en même temps, un niveau par itération
+        tenseur = tenseur_en_cache(self, self.forest[:self.nb_arbre], lire_classification)
+        decisions = tenseur.predict(X)      # shape (n_instances, nb_arbre)
+
+        # Somme des votes sur l'axe des arbres
+        votes_yes = np.sum(decisions == 1, axis=1)
+        return votes_yes / self.nb_arbre
+
+    def apply(self, X):
+        """Numéro de la feuille atteinte dans chaque arbre, shape (n_instances, nb_arbre)"""
+        X = np.array(X, dtype=float)
+        return tenseur_en_cache(self, self.forest[:self.nb_arbre], lire_classification).apply(X)
     
     def predict_one_tree(self, x, noeud):      # prediction d'une instance sur un arbre 
         # Si c'est une feuille, retourner la décision
@@ -208,6 +184,35 @@ class RandomForestClassification :
         
         return self
 
+    def save_binary(self, nom_fichier):
+        """
+        Sauvegarde le modèle au format binaire (.npz, voir format_binaire.py)
+
+        Args:
+            nom_fichier: Chemin du fichier de sortie
+        """
+        sauver_binaire(self, nom_fichier)
+        print(f"✓ Modèle sauvegardé dans '{nom_fichier}'")
+
+    @classmethod
+    def load_binary(cls, nom_fichier, mmap=True):
+        """
+        Charge un modèle sauvegardé par save_binary, sans parsing: les tableaux
+        sont projetés en mémoire et partagés entre les processus qui les lisent
+
+        Args:
+            nom_fichier: Chemin du fichier à charger
+            mmap: projeter les tableaux au lieu de les lire
+
+        Returns:
+            le modèle chargé
+        """
+        modele = charger_binaire(cls, nom_fichier, mmap=mmap)
+        print(f"✓ Modèle chargé depuis '{nom_fichier}'")
+        return modele
 
 
-        
\ No newline at end of file
+def _arbre_echantillonne(X, y, rng, profondeur_max=10, nb_ex_feuilles_min=2):
+    # Fonction de module (et non méthode) pour pouvoir être envoyée aux processus de construire_foret
+    modele = RandomForestClassification(profondeur_max=profondeur_max, nb_ex_feuilles_min=nb_ex_feuilles_min)
+    return modele.arbre_aleatoire(X, y, rng)
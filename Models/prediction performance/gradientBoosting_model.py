@@ -1,6 +1,16 @@
+import sys
+from pathlib import Path
+
 import numpy as np
 import pandas as pd
 
+_MODELS_DIR = str(Path(__file__).resolve().parents[1])  # dossier Models (modules partagés entre les arbres)
+if _MODELS_DIR not in sys.path:
+    sys.path.insert(0, _MODELS_DIR)
+from tree_builder import ConstructeurIndexe
+from node_table import TableNoeuds, lire_regression, tables_en_cache
+from format_binaire import sauver_binaire, charger_binaire
+
 # =================================================================
 # SECTION 1 : LE MODÈLE 
 # =================================================================
@@ -19,27 +29,35 @@ class ENSPD_GradientBoosting_Pure:
         var_enfants = (np.var(y_gauche) * len(y_gauche)) + (np.var(y_droite) * len(y_droite))
         return var_parent - var_enfants
 
-    def _construire_arbre(self, X, y, depth):
-        if depth >= self.max_depth or len(y) <= 2:
-            return {'feuille': True, 'valeur': np.mean(y)}
-
-        m_feat, m_seuil, m_gain = None, None, -1
-        for f in range(X.shape[1]):
-            seuils = np.unique(X[:, f])
-            for s in seuils:
-                g = X[:, f] <= s
-                gain = self._calculer_variance_reduction(y, y[g], y[~g])
-                if gain > m_gain:
-                    m_gain, m_feat, m_seuil = gain, f, s
-        
-        if m_gain <= 0: return {'feuille': True, 'valeur': np.mean(y)}
+    def _construire_arbre(self, X, y, depth, avec_feuilles=False):
+        # avec_feuilles=True: retourne aussi (numero_feuille, feuilles), la feuille atteinte par chaque ligne de X
+        # X partagé par tout l'arbre: chaque noeud ne reçoit que la tranche de ses indices
+        constructeur = ConstructeurIndexe(X)
 
-        indices_g = X[:, m_feat] <= m_seuil
-        return {
-            'feuille': False, 'feature': int(m_feat), 'seuil': float(m_seuil),
-            'gauche': self._construire_arbre(X[indices_g], y[indices_g], depth + 1),
-            'droite': self._construire_arbre(X[~indices_g], y[~indices_g], depth + 1)
-        }
+        def creer_noeud(echantillons, depth):
+            y_noeud = y[echantillons]
+            if depth >= self.max_depth or len(y_noeud) <= 2:
+                return {'feuille': True, 'valeur': np.mean(y_noeud)}, None
+
+            m_feat, m_seuil, m_gain = None, None, -1
+            for f in range(constructeur.X.shape[1]):
+                x = constructeur.X[echantillons, f]  # une colonne du noeud à la fois
+                seuils = np.unique(x)
+                for s in seuils:
+                    g = x <= s
+                    gain = self._calculer_variance_reduction(y_noeud, y_noeud[g], y_noeud[~g])
+                    if gain > m_gain:
+                        m_gain, m_feat, m_seuil = gain, f, s
+
+            if m_gain <= 0: return {'feuille': True, 'valeur': np.mean(y_noeud)}, None
+            return {'feuille': False, 'feature': int(m_feat), 'seuil': float(m_seuil)}, (m_feat, m_seuil)
+
+        def attacher(noeud, gauche, droite):
+            noeud['gauche'], noeud['droite'] = gauche, droite
+            return noeud
+
+        arbre = constructeur.construire(creer_noeud, attacher, profondeur=depth)
+        return (arbre, constructeur.affectation_feuilles()) if avec_feuilles else arbre
 
     def _predire_un(self, x, noeud):
         if noeud['feuille']: return noeud['valeur']
@@ -47,32 +65,66 @@ class ENSPD_GradientBoosting_Pure:
             return self._predire_un(x, noeud['gauche'])
         return self._predire_un(x, noeud['droite'])
 
-    def fit(self, X, y):
-        X, y = np.array(X), np.array(y)
+    def fit(self, X, y, X_val=None, y_val=None, patience=5, tolerance=0.0):
+        # Arrêt précoce: avec un jeu de validation, on arrête d'ajouter des arbres quand la MSE
+        # de validation ne s'améliore plus d'au moins `tolerance` pendant `patience` arbres
+        X, y = np.asarray(X), np.array(y)  # X n'est jamais modifié: pas de copie
         self.moyenne_initiale = float(np.mean(y))
         y_pred = np.full(len(y), self.moyenne_initiale)
+        self.arbres = []
         
         self.historique_erreur = [] 
-        
+        valider = X_val is not None and y_val is not None
+        if valider:
+            X_val, y_val = np.array(X_val), np.array(y_val)
+            y_pred_val = np.full(len(y_val), self.moyenne_initiale)
+            self.historique_validation = []
+            meilleure_perte = np.inf
+            self.meilleur_n_arbres = 0
 
         for i in range(self.n_arbres):
             residus = y - y_pred
-            arbre = self._construire_arbre(X, residus, 0)
-            corrections = np.array([self._predire_un(x, arbre) for x in X])
+            arbre, (numero_feuille, feuilles) = self._construire_arbre(X, residus, 0, avec_feuilles=True)
+            # valeur de la feuille de chaque ligne, connue dès la construction (pas de _predire_un par ligne)
+            corrections = np.array([feuille['valeur'] for feuille in feuilles])[numero_feuille]
             y_pred += self.lr * corrections
             self.arbres.append(arbre)
 
             mse = np.mean((y - y_pred)**2)
             self.historique_erreur.append(mse)
+
+            if valider:
+                y_pred_val += self.lr * TableNoeuds.depuis_arbre(arbre, lire_regression).predict(X_val)
+                perte = np.mean((y_val - y_pred_val)**2)
+                self.historique_validation.append(perte)
+                if perte < meilleure_perte - tolerance:
+                    meilleure_perte = perte
+                    self.meilleur_n_arbres = i + 1
+                elif i + 1 - self.meilleur_n_arbres >= patience:
+                    break
+
+        if valider:
+            # on retire les arbres ajoutés après le meilleur score de validation
+            self.arbres = self.arbres[:self.meilleur_n_arbres]
+            self.historique_erreur = self.historique_erreur[:self.meilleur_n_arbres]
             
 
     def predict(self, X):
         X = np.array(X)
         y_final = np.full(X.shape[0], self.moyenne_initiale)
-        for arbre in self.arbres:
-            y_final += self.lr * np.array([self._predire_un(x, arbre) for x in X])
+        # arbres aplatis en tableaux: toutes les lignes descendent ensemble, un niveau par itération
+        for table in tables_en_cache(self, self.arbres, lire_regression):
+            y_final += self.lr * table.predict(X)
         return y_final
 
+    def staged_predict(self, X):
+        """Génère la prédiction après chaque arbre (calcul incrémental)"""
+        X = np.array(X)
+        y_etape = np.full(X.shape[0], self.moyenne_initiale)
+        for table in tables_en_cache(self, self.arbres, lire_regression):
+            y_etape = y_etape + self.lr * table.predict(X)
+            yield y_etape
+
     def score(self, X, y):
         """Calcule le coefficient de détermination R²"""
         y = np.array(y)
@@ -80,6 +132,16 @@ class ENSPD_GradientBoosting_Pure:
         ss_res = np.sum((y - y_pred)**2)
         ss_tot = np.sum((y - np.mean(y))**2)
         return 1 - (ss_res / ss_tot)
+
+    def save_binary(self, filepath):
+        """Sauvegarde le modèle au format binaire (.npz, voir format_binaire.py)"""
+        sauver_binaire(self, filepath)
+        print(f"✅ Modèle sauvegardé avec succès dans : {filepath}")
+
+    @classmethod
+    def load_binary(cls, filepath, mmap=True):
+        """Charge un modèle sauvegardé par save_binary (tableaux projetés en mémoire)"""
+        return charger_binaire(cls, filepath, mmap=mmap)
         
 import json
 import os
@@ -96,4 +158,4 @@ def save(self, filepath):
         
         with open(filepath, 'w', encoding='utf-8') as f:
             json.dump(export_data, f, indent=4, ensure_ascii=False)
-        print(f"✅ Modèle sauvegardé avec succès dans : {filepath}")
\ No newline at end of file
+        print(f"✅ Modèle sauvegardé avec succès dans : {filepath}")
@@ -0,0 +1,301 @@
+import numpy as np
+
+# Recherche vectorisee du meilleur split pour les arbres de regression.
+# Au lieu de tester chaque valeur unique avec deux masques et deux np.var,
+# on trie chaque feature une seule fois par noeud puis on evalue tous les
+# seuils en une passe grace aux sommes cumulees de y et de y^2.
+# Les fonctions meilleur_split_* recoivent la matrice complete X et les indices
+# des echantillons du noeud (tampon de ConstructeurIndexe): les colonnes sont lues
+# une a une (X[echantillons, j]), la sous-matrice du noeud n'est jamais copiee.
+
+
+def _colonne(X, echantillons, j):
+    # valeurs de la feature j pour les echantillons du noeud (toutes les lignes si echantillons est None)
+    return X[:, j] if echantillons is None else X[echantillons, j]
+
+
+def gains_variance_feature(x, y_centre, variance_parent):
+    """
+    Calcule le gain (reduction de variance) de tous les seuils d'une feature
+
+    Args:
+        x: valeurs de la feature pour les echantillons du noeud
+        y_centre: target du noeud centree sur sa moyenne (stabilite numerique)
+        variance_parent: variance de la target du noeud
+
+    Returns:
+        seuils: valeurs uniques testees (le dernier groupe est exclu, il laisserait la droite vide)
+        gains: gain associe a chaque seuil (X <= seuil a gauche, X > seuil a droite)
+    """
+    n = len(y_centre)
+    ordre = np.argsort(x, kind='stable')
+    x_trie = x[ordre]
+    y_trie = y_centre[ordre]
+    del ordre
+    # dernier indice de chaque groupe de valeurs egales: x_trie[i] < x_trie[i+1]
+    coupures = np.nonzero(x_trie[1:] != x_trie[:-1])[0]
+    if coupures.size == 0:
+        return x_trie[:0], np.empty(0)
+    seuils = x_trie[coupures]
+    del x_trie
+    # calculs en place: au plus quelques tableaux de la taille du noeud en memoire a la fois
+    somme = np.cumsum(y_trie)
+    s_gauche = somme[coupures]
+    s_total = somme[-1]
+    del somme
+    somme_carres = np.cumsum(np.square(y_trie, out=y_trie), out=y_trie)
+    q_gauche = somme_carres[coupures]
+    q_total = somme_carres[-1]
+    del y_trie, somme_carres
+    n_gauche = coupures + 1
+    # somme des carres des ecarts de chaque cote: sum(y^2) - (sum y)^2 / n
+    erreur_apres = s_gauche ** 2
+    erreur_apres /= n_gauche
+    np.subtract(q_gauche, erreur_apres, out=erreur_apres)
+    s_droite = np.subtract(s_total, s_gauche, out=s_gauche)
+    n_droite = np.subtract(n, n_gauche, out=n_gauche)
+    droite = np.square(s_droite, out=s_droite)
+    droite /= n_droite
+    np.subtract(np.subtract(q_total, q_gauche, out=q_gauche), droite, out=droite)
+    erreur_apres += droite
+    erreur_apres /= n
+    gains = np.subtract(variance_parent, erreur_apres, out=erreur_apres)
+    return seuils, gains
+
+
+def meilleur_split_variance(X, y, features=None, variance_parent=None, echantillons=None):
+    """
+    Trouve le split (feature, seuil) qui maximise la reduction de variance
+
+    Donne le meme resultat que la double boucle exhaustive des arbres du projet:
+    les seuils sont les valeurs uniques de la feature, les egalites sont departagees
+    en faveur de la premiere feature puis du plus petit seuil, et le gain retourne
+    est recalcule avec la formule d'origine (np.var) pour les meilleurs candidats.
+
+    Args:
+        X: matrice des features, shape (n_samples, n_features)
+        y: target du noeud, shape (n_echantillons,)
+        features: indices des features a parcourir (toutes par defaut)
+        variance_parent: variance de y si elle est deja calculee
+        echantillons: indices des lignes de X du noeud (toutes par defaut)
+
+    Returns:
+        meilleur_feature, meilleur_seuil, meilleur_gain (None, None, 0 si aucun split)
+    """
+    if features is None:
+        features = range(X.shape[1])
+    if variance_parent is None:
+        variance_parent = np.var(y)
+    y_centre = y - np.mean(y)
+
+    resultats = ((j,) + gains_variance_feature(_colonne(X, echantillons, j), y_centre, variance_parent)
+                 for j in features)
+    n = len(y)
+
+    def gain_exact(j, seuil):
+        # formule d'origine: moyenne ponderee des variances des deux cotes
+        gauche_idx = _colonne(X, echantillons, j) <= seuil
+        y_gauche = y[gauche_idx]
+        y_droite = y[~gauche_idx]
+        erreur_apres = (len(y_gauche) / n) * np.var(y_gauche) + (len(y_droite) / n) * np.var(y_droite)
+        return variance_parent - erreur_apres
+
+    # les sommes cumulees introduisent une petite erreur d'arrondi
+    return _departager_candidats(resultats, 1e-7 * variance_parent + 1e-12, gain_exact)
+
+
+def _departager_candidats(resultats, tolerance, gain_exact):
+    """
+    Choisit le split final parmi les candidats proches du gain maximal
+
+    Les gains vectorises peuvent differer de quelques ulp de ceux de la boucle
+    d'origine: on recalcule exactement les candidats a moins de `tolerance` du
+    maximum, dans l'ordre (feature, seuil croissant), avec une comparaison stricte.
+    `resultats` est parcouru une fois (un generateur suffit): seuls les seuils
+    proches du maximum courant sont gardes, pas les gains de toutes les features.
+    """
+    gain_max = 0
+    candidats = []
+    for j, seuils, gains in resultats:
+        if gains.size and gains.max() > gain_max:
+            gain_max = gains.max()
+        garder = gains >= gain_max - tolerance
+        candidats.append((j, seuils[garder], gains[garder]))
+
+    meilleur_gain = 0
+    meilleur_feature = None
+    meilleur_seuil = None
+    if gain_max <= 0:
+        return meilleur_feature, meilleur_seuil, meilleur_gain
+    for j, seuils, gains in candidats:
+        for k in np.nonzero(gains >= gain_max - tolerance)[0]:
+            gain = gain_exact(j, seuils[k])
+            if gain > meilleur_gain:
+                meilleur_gain = gain
+                meilleur_feature = j
+                meilleur_seuil = seuils[k]
+    return meilleur_feature, meilleur_seuil, meilleur_gain
+
+
+def entropie_binaire(p):
+    """Entropie (en bits) d'une proportion de positifs p, scalaire ou tableau, avec 0*log2(0) = 0"""
+    p = np.asarray(p, dtype=float)
+    q = 1 - p
+    with np.errstate(divide='ignore', invalid='ignore'):
+        entropie = - p * np.log2(p) - q * np.log2(q)
+    return np.where((p == 0) | (p == 1), 0.0, entropie)
+
+
+def gains_entropie_feature(x, positifs, entropie_parent):
+    """
+    Calcule le gain d'information de tous les seuils d'une feature (classification binaire)
+
+    Args:
+        x: valeurs de la feature pour les echantillons du noeud
+        positifs: indicateur (0/1) de la classe positive pour chaque echantillon
+        entropie_parent: entropie du noeud
+
+    Returns:
+        seuils: valeurs uniques testees (X <= seuil a gauche)
+        gains: gain d'information associe a chaque seuil
+    """
+    n = len(x)
+    ordre = np.argsort(x, kind='stable')
+    x_trie = x[ordre]
+    coupures = np.nonzero(x_trie[1:] != x_trie[:-1])[0]
+    if coupures.size == 0:
+        return x_trie[:0], np.empty(0)
+    # nombres cumules de positifs; les negatifs s'en deduisent (n_gauche - positifs)
+    positifs_cumules = np.cumsum(positifs[ordre])
+    n_gauche = coupures + 1
+    n_droite = n - n_gauche
+    positifs_gauche = positifs_cumules[coupures]
+    positifs_droite = positifs_cumules[-1] - positifs_gauche
+    gains = (entropie_parent
+             - (n_gauche / n) * entropie_binaire(positifs_gauche / n_gauche)
+             - (n_droite / n) * entropie_binaire(positifs_droite / n_droite))
+    return x_trie[coupures], gains
+
+
+def meilleur_split_entropie(X, y, entropie_parent, features=None, echantillons=None):
+    """
+    Trouve le split (feature, seuil) qui maximise le gain d'information (classes 0/1)
+
+    Meme resultat que la double boucle exhaustive de DecisionTreeClassification.Arbre:
+    seuils = valeurs uniques, egalites departagees en faveur de la premiere feature
+    puis du plus petit seuil.
+
+    Args:
+        X: matrice des features, shape (n_samples, n_features)
+        y: target binaire du noeud
+        entropie_parent: entropie du noeud
+        features: indices des features a parcourir (toutes par defaut)
+        echantillons: indices des lignes de X du noeud (toutes par defaut)
+
+    Returns:
+        meilleur_feature, meilleur_seuil, meilleur_gain (None, None, 0 si aucun split)
+    """
+    if features is None:
+        features = range(X.shape[1])
+    positifs = (y == 1).astype(float)
+    resultats = ((j,) + gains_entropie_feature(_colonne(X, echantillons, j), positifs, entropie_parent)
+                 for j in features)
+    n = len(y)
+
+    def gain_exact(j, seuil):
+        # formule d'origine, evaluee avec les memes operations scalaires
+        index_gauche = _colonne(X, echantillons, j) <= seuil
+        n_gauche = np.sum(index_gauche)
+        proba_gauche_yes = np.sum(positifs[index_gauche]) / n_gauche
+        proba_droite_yes = np.sum(positifs[~index_gauche]) / (n - n_gauche)
+        entropie_gauche = float(entropie_binaire(proba_gauche_yes))
+        entropie_droite = float(entropie_binaire(proba_droite_yes))
+        return entropie_parent - (n_gauche / n) * entropie_gauche - ((n - n_gauche) / n) * entropie_droite
+
+    return _departager_candidats(resultats, 1e-9, gain_exact)
+
+
+# Mode histogramme (binned) des modeles de boosting.
+# X est quantifie une seule fois au fit en au plus 255 intervalles par feature
+# (matrice uint8), puis chaque noeud construit des histogrammes de gradients et
+# de hessians par np.bincount au lieu de tester chaque seuil avec des masques.
+
+
+def quantifier_features(X, max_bins=255):
+    """
+    Quantifie chaque feature en au plus max_bins intervalles (quantiles)
+
+    Args:
+        X: matrice des features, shape (n_samples, n_features)
+        max_bins: nombre maximal d'intervalles par feature (<= 256 pour tenir en uint8)
+
+    Returns:
+        X_bins: matrice uint8 des numeros d'intervalle, X[i, j] <= bornes[j][k] <=> X_bins[i, j] <= k
+        bornes: liste (une par feature) des bornes superieures des intervalles, hors dernier
+    """
+    if max_bins < 2 or max_bins > 256:
+        raise ValueError("max_bins doit etre compris entre 2 et 256.")
+    X = np.asarray(X, dtype=float)
+    X_bins = np.empty(X.shape, dtype=np.uint8)
+    bornes = []
+    for j in range(X.shape[1]):
+        uniques = np.unique(X[:, j])
+        if len(uniques) <= max_bins:
+            # peu de valeurs distinctes: un intervalle par valeur, aucun seuil perdu
+            bornes_j = uniques[:-1]
+        else:
+            quantiles = np.linspace(0, 1, max_bins + 1)[1:-1]
+            bornes_j = np.unique(np.quantile(X[:, j], quantiles, method='lower'))
+        X_bins[:, j] = np.searchsorted(bornes_j, X[:, j], side='left')
+        bornes.append(bornes_j)
+    return X_bins, bornes
+
+
+def meilleur_split_histogramme(X_bins, bornes, gradients, hessians, reg_lambda=0.0, features=None,
+                               echantillons=None):
+    """
+    Trouve le meilleur split a partir des histogrammes de gradients/hessians du noeud
+
+    Le score d'un split est G_L^2/(H_L+lambda) + G_R^2/(H_R+lambda) - G^2/(H+lambda).
+    Avec hessians = 1 et lambda = 0, ce score divise par n est la reduction de variance.
+
+    Args:
+        X_bins: numeros d'intervalle de toutes les lignes (uint8)
+        bornes: bornes retournees par quantifier_features
+        gradients: gradients (ou residus centres) des echantillons du noeud
+        hessians: hessians des echantillons du noeud
+        reg_lambda: regularisation L2 des feuilles
+        features: indices des features a parcourir (toutes par defaut)
+        echantillons: indices des lignes de X_bins du noeud (toutes par defaut)
+
+    Returns:
+        meilleur_feature, meilleur_bin, meilleur_score (None, None, 0 si aucun split)
+    """
+    if features is None:
+        features = range(X_bins.shape[1])
+    n = len(gradients)
+    G = np.sum(gradients)
+    H = np.sum(hessians)
+    score_parent = G ** 2 / (H + reg_lambda)
+
+    meilleur_score = 0
+    meilleur_feature = None
+    meilleur_bin = None
+    for j in features:
+        n_bins = len(bornes[j]) + 1
+        if n_bins <= 1:
+            continue
+        codes = _colonne(X_bins, echantillons, j)
+        G_L = np.cumsum(np.bincount(codes, weights=gradients, minlength=n_bins))[:-1]
+        H_L = np.cumsum(np.bincount(codes, weights=hessians, minlength=n_bins))[:-1]
+        n_L = np.cumsum(np.bincount(codes, minlength=n_bins))[:-1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scores = G_L ** 2 / (H_L + reg_lambda) + (G - G_L) ** 2 / (H - H_L + reg_lambda) - score_parent
+        # un split doit laisser au moins un echantillon de chaque cote
+        scores = np.where((n_L > 0) & (n_L < n), scores, -np.inf)
+        k = int(np.argmax(scores))
+        if scores[k] > meilleur_score:
+            meilleur_score = scores[k]
+            meilleur_feature = j
+            meilleur_bin = k
+    return meilleur_feature, meilleur_bin, meilleur_score
@@ -0,0 +1,80 @@
+"""
+Arret precoce des modeles de boosting (GradientBoostingRegressor, XGBoostRegressor).
+
+La foret gardee est celle du meilleur score de validation, et en warm start la
+reference est la perte de la foret existante: des arbres qui degradent la
+validation ne sont jamais ajoutes.
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+MODELS = Path(__file__).resolve().parents[1]
+for dossier in (MODELS, MODELS / "optimisation des ressources"):
+    if str(dossier) not in sys.path:
+        sys.path.insert(0, str(dossier))
+
+from GradientBoostingRegressor import GradientBoostingRegressor
+from XGBoostRegressor import XGBoostRegressor
+
+CLASSES = [GradientBoostingRegressor, XGBoostRegressor]
+
+
+def _donnees(graine, n=300):
+    rng = np.random.default_rng(graine)
+    X = rng.normal(size=(n, 3))
+    y = np.sin(2 * X[:, 0]) + X[:, 1] + rng.normal(scale=0.5, size=n)
+    return X, y
+
+
+def _perte(modele, X, y):
+    return np.mean((y - modele.predict(X)) ** 2)
+
+
+@pytest.mark.parametrize("classe", CLASSES)
+def test_garde_le_meilleur_nombre_d_arbres(classe):
+    X, y = _donnees(0)
+    X_val, y_val = _donnees(1, n=150)
+    # arbres profonds et pas d'apprentissage fort: la validation se degrade vite
+    modele = classe(profondeur_max=8, n_trees=40, learning_rate=0.9)
+    modele.fit(X, y, X_val=X_val, y_val=y_val, patience=3)
+    historique = modele.historique_validation
+    assert len(historique) < 40
+    assert modele.meilleur_n_trees == int(np.argmin(historique)) + 1
+    assert len(modele.forest) == modele.meilleur_n_trees
+    assert _perte(modele, X_val, y_val) == pytest.approx(min(historique))
+    etapes = list(modele.staged_predict(X_val))
+    assert len(etapes) == len(modele.forest)
+    np.testing.assert_allclose(etapes[-1], modele.predict(X_val))
+
+
+@pytest.mark.parametrize("classe", CLASSES)
+def test_warm_start_n_ajoute_pas_d_arbre_qui_degrade_la_validation(classe):
+    X, y = _donnees(0)
+    X_val, y_val = _donnees(1, n=150)
+    modele = classe(profondeur_max=3, n_trees=10, learning_rate=0.3)
+    modele.fit(X, y)
+    n_avant, perte_avant = len(modele.forest), _perte(modele, X_val, y_val)
+    predictions_avant = modele.predict(X_val)
+
+    # nouvelles lignes sans lien avec la cible de validation: chaque arbre ajoute la degrade
+    bruit = np.random.default_rng(2).normal(scale=5, size=len(y))
+    modele.continuer(X, bruit, 5, X_val=X_val, y_val=y_val, patience=5)
+    assert all(perte > perte_avant for perte in modele.historique_validation)
+    assert modele.meilleur_n_trees == 0
+    assert len(modele.forest) == n_avant == modele.n_trees
+    np.testing.assert_array_equal(modele.predict(X_val), predictions_avant)
+
+
+@pytest.mark.parametrize("classe", CLASSES)
+def test_warm_start_garde_les_arbres_qui_ameliorent(classe):
+    X, y = _donnees(0)
+    X_val, y_val = _donnees(1, n=150)
+    modele = classe(profondeur_max=3, n_trees=2, learning_rate=0.3)
+    modele.fit(X, y)
+    perte_avant = _perte(modele, X_val, y_val)
+    modele.continuer(X, y, 5, X_val=X_val, y_val=y_val)
+    assert len(modele.forest) == 2 + modele.meilleur_n_trees > 2
+    assert _perte(modele, X_val, y_val) < perte_avant
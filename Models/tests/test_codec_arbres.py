@@ -0,0 +1,146 @@
+"""
+Codec JSON des arbres a objets Node (codec_arbres.py).
+
+Aller-retour sauver_arbres / charger_arbres sans perte (y compris un arbre de
+5000 niveaux, au-dela de la limite de recursion de Python), et lecture des
+fichiers au format imbrique d'origine ('left' / 'right' dans chaque noeud).
+"""
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+
+MODELS = Path(__file__).resolve().parents[1]
+for dossier in (MODELS, MODELS / "optimisation des ressources"):
+    if str(dossier) not in sys.path:
+        sys.path.insert(0, str(dossier))
+
+from codec_arbres import charger_arbres, sauver_arbres
+from DecisionTreeRegressor import decisionTreeRegressor
+from GradientBoostingRegressor import GradientBoostingRegressor, Node
+
+
+def _noeuds(racine, optionnels=()):
+    # parcours prefixe iteratif: (feature, threshold, prediction, optionnels) ou None pour un enfant absent
+    lignes, pile = [], [racine]
+    while pile:
+        node = pile.pop()
+        if node is None:
+            lignes.append(None)
+            continue
+        lignes.append((node.feature, node.threshold, node.prediction)
+                      + tuple(getattr(node, champ, None) for champ in optionnels))
+        pile += [node.right, node.left]
+    return lignes
+
+
+def _ancien_dict(node):
+    # ecriture d'origine des modeles (save avant le format preordre)
+    if node is None:
+        return None
+    return {
+        'feature': int(node.feature) if node.feature is not None else None,
+        'threshold': float(node.threshold) if node.threshold is not None else None,
+        'prediction': float(node.prediction) if node.prediction is not None else None,
+        'left': _ancien_dict(node.left),
+        'right': _ancien_dict(node.right),
+    }
+
+
+def _donnees():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(300, 4))
+    y = X[:, 0] * 2 + np.sin(X[:, 1]) + rng.normal(scale=0.1, size=300)
+    return X, y
+
+
+def _chaine(profondeur):
+    # arbre peigne: chaque noeud interne a une feuille a droite et le reste a gauche
+    racine = node = Node()
+    for i in range(profondeur):
+        node.feature, node.threshold, node.prediction = i % 3, i * 0.5, None
+        node.right = Node()
+        node.right.feature, node.right.threshold, node.right.prediction = None, None, float(i)
+        node.right.left = node.right.right = None
+        node.left = Node()
+        node = node.left
+    node.feature, node.threshold, node.prediction = None, None, -1.0
+    node.left = node.right = None
+    return racine
+
+
+def test_aller_retour_foret(tmp_path):
+    X, y = _donnees()
+    modele = GradientBoostingRegressor(profondeur_max=4, n_trees=5)
+    modele.fit(X, y)
+    chemin = tmp_path / "gb.json"
+    modele.save(str(chemin))
+    json.loads(chemin.read_text(encoding="utf-8"))  # le fichier reste un JSON valide
+    charge = GradientBoostingRegressor.load(str(chemin))
+    assert [_noeuds(a) for a in charge.forest] == [_noeuds(a) for a in modele.forest]
+    np.testing.assert_array_equal(charge.predict(X), modele.predict(X))
+
+
+def test_aller_retour_champs_optionnels_et_valeurs_speciales(tmp_path):
+    racine = _chaine(3)
+    racine.gain = 0.25
+    racine.left.threshold = float("inf")
+    racine.right.prediction = float("nan")
+    chemin = tmp_path / "arbre.json"
+    sauver_arbres(str(chemin), {"n": 1}, [racine, _chaine(1)], optionnels=("gain",))
+    entete, arbres = charger_arbres(str(chemin), Node, optionnels=("gain",))
+    assert entete["n"] == 1
+    # repr: NaN != NaN, mais repr(nan) == 'nan'
+    assert repr(_noeuds(arbres[0], ("gain",))) == repr(_noeuds(racine, ("gain",)))
+    assert _noeuds(arbres[1]) == _noeuds(_chaine(1))
+
+
+def test_arbre_de_5000_niveaux(tmp_path):
+    racine = _chaine(5000)
+    assert 5000 > sys.getrecursionlimit()
+    chemin = tmp_path / "profond.json"
+    sauver_arbres(str(chemin), {"profondeur_max": 5000}, racine, cle="root")
+    _, lu = charger_arbres(str(chemin), Node, cle="root", unique=True)
+    assert _noeuds(lu) == _noeuds(racine)
+    chemin = tmp_path / "foret_profonde.json"
+    sauver_arbres(str(chemin), {}, [racine, _chaine(2)])
+    _, foret = charger_arbres(str(chemin), Node)
+    assert [_noeuds(a) for a in foret] == [_noeuds(racine), _noeuds(_chaine(2))]
+
+
+def test_arbre_unique_absent(tmp_path):
+    chemin = tmp_path / "vide.json"
+    sauver_arbres(str(chemin), {}, None, cle="root")
+    assert charger_arbres(str(chemin), Node, cle="root", unique=True) == ({"format_arbres": "preordre", "champs": ["feature", "threshold", "prediction"]}, None)
+
+
+def test_lecture_ancien_format_foret(tmp_path):
+    X, y = _donnees()
+    modele = GradientBoostingRegressor(profondeur_max=4, n_trees=4)
+    modele.fit(X, y)
+    ancien = {
+        'profondeur_max': modele.profondeur_max,
+        'min_gain': modele.min_gain,
+        'n_trees': modele.n_trees,
+        'learning_rate': modele.learning_rate,
+        'init': float(modele.init),
+        'forest': [_ancien_dict(arbre) for arbre in modele.forest],
+    }
+    chemin = tmp_path / "ancien_gb.json"
+    chemin.write_text(json.dumps(ancien, indent=2), encoding="utf-8")
+    charge = GradientBoostingRegressor.load(str(chemin))
+    assert [_noeuds(a) for a in charge.forest] == [_noeuds(a) for a in modele.forest]
+    np.testing.assert_array_equal(charge.predict(X), modele.predict(X))
+
+
+def test_lecture_ancien_format_arbre_seul(tmp_path):
+    # l'ancien decisionTreeRegressor.save ecrivait la racine seule, sans hyperparametres
+    X, y = _donnees()
+    modele = decisionTreeRegressor()
+    modele.fit(X, y)
+    chemin = tmp_path / "ancien_dtr.json"
+    chemin.write_text(json.dumps(_ancien_dict(modele.root), indent=2), encoding="utf-8")
+    charge = decisionTreeRegressor.load(str(chemin))
+    assert _noeuds(charge.root) == _noeuds(modele.root)
+    np.testing.assert_array_equal(charge.predict(X), modele.predict(X))
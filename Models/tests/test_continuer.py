@@ -0,0 +1,47 @@
+"""
+Reprise d'un modele de boosting (continuer): n arbres puis k de plus donnent la
+meme foret qu'un seul fit de n + k arbres, y compris apres sauvegarde et rechargement.
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+MODELS = Path(__file__).resolve().parents[1]
+for dossier in (MODELS, MODELS / "optimisation des ressources"):
+    if str(dossier) not in sys.path:
+        sys.path.insert(0, str(dossier))
+
+from GradientBoostingRegressor import GradientBoostingRegressor
+from XGBoostRegressor import XGBoostRegressor
+
+
+def _donnees():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(300, 4))
+    y = np.sin(2 * X[:, 0]) + X[:, 1] * X[:, 2] + rng.normal(scale=0.1, size=300)
+    return X, y
+
+
+@pytest.mark.parametrize("classe", [GradientBoostingRegressor, XGBoostRegressor])
+@pytest.mark.parametrize("recharger", [False, True])
+def test_continuer_comme_un_seul_fit(classe, recharger, tmp_path):
+    X, y = _donnees()
+    complet = classe(profondeur_max=3, n_trees=6, learning_rate=0.3)
+    complet.fit(X, y)
+
+    modele = classe(profondeur_max=3, n_trees=4, learning_rate=0.3)
+    modele.fit(X, y)
+    if recharger:
+        modele.save(str(tmp_path / "modele.json"))
+        modele = classe.load(str(tmp_path / "modele.json"))
+    modele.continuer(X, y, 2)
+
+    assert modele.n_trees == len(modele.forest) == 6
+    np.testing.assert_allclose(modele.predict(X), complet.predict(X), rtol=0, atol=1e-12)
+
+
+def test_continuer_sans_foret():
+    with pytest.raises(ValueError):
+        GradientBoostingRegressor().continuer(*_donnees(), 2)
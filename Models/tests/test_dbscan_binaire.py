@@ -0,0 +1,75 @@
+"""
+Format binaire de DBSCAN (save_binary / load_binary).
+
+Aller-retour sans changer labels ni predict (points en float32, labels dans le
+plus petit type entier), et resume des clusters (points coeurs, effectifs,
+centres, bornes) egal a celui recalcule sur les points.
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+MODELS = Path(__file__).resolve().parents[1]
+for dossier in (MODELS, MODELS / "explication des performances"):
+    if str(dossier) not in sys.path:
+        sys.path.insert(0, str(dossier))
+
+from DBSCAN import DBSCAN
+from index_spatial import nombre_voisins
+
+
+@pytest.fixture(scope="module")
+def modele():
+    rng = np.random.default_rng(0)
+    centres = rng.normal(scale=6, size=(3, 4))
+    X = np.vstack([c + rng.normal(scale=0.5, size=(80, 4)) for c in centres] + [rng.uniform(-15, 15, size=(30, 4))])
+    X = X.astype(np.float32).astype(float)  # valeurs exactes en float32: memes distances apres rechargement
+    dbscan = DBSCAN(eps=1.2, min_points=5)
+    dbscan.fit(X)
+    return dbscan
+
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_aller_retour_binaire(modele, tmp_path, mmap):
+    modele.save_binary(str(tmp_path / "dbscan.npz"))
+    charge = DBSCAN.load_binary(str(tmp_path / "dbscan.npz"), mmap=mmap)
+    assert (charge.eps, charge.min_points) == (modele.eps, modele.min_points)
+    assert charge.labels_.dtype == np.int8 and charge.X_.dtype == np.float32
+    np.testing.assert_array_equal(charge.labels_, modele.labels_)
+    np.testing.assert_array_equal(charge.X_, modele.X_)
+
+    nouveaux = np.vstack([modele.X_[::7] + 0.3, np.random.default_rng(1).uniform(-15, 15, size=(50, 4))])
+    np.testing.assert_array_equal(charge.predict(nouveaux), modele.predict(nouveaux))
+
+
+def test_resume_des_clusters(modele, tmp_path):
+    modele.save_binary(str(tmp_path / "dbscan.npz"))
+    charge = DBSCAN.load_binary(str(tmp_path / "dbscan.npz"))
+    X, labels = np.asarray(modele.X_), np.asarray(modele.labels_)
+    n_clusters = labels.max() + 1
+    assert n_clusters >= 3 and (labels == -1).any()
+    np.testing.assert_array_equal(charge.core_mask_, nombre_voisins(X, modele.eps) >= modele.min_points)
+    np.testing.assert_array_equal(charge.cluster_sizes_, np.bincount(labels[labels >= 0], minlength=n_clusters))
+    for c in range(n_clusters):
+        points = X[labels == c]
+        np.testing.assert_allclose(charge.cluster_centers_[c], points.mean(axis=0), rtol=1e-6)
+        np.testing.assert_array_equal(charge.cluster_min_[c], points.min(axis=0))
+        np.testing.assert_array_equal(charge.cluster_max_[c], points.max(axis=0))
+    # tout point coeur appartient a un cluster
+    assert np.all(labels[charge.core_mask_] >= 0)
+
+
+def test_depuis_json_comme_depuis_fit(modele, tmp_path):
+    modele.save(str(tmp_path / "dbscan.json"))
+    depuis_json = DBSCAN().load(str(tmp_path / "dbscan.json"))
+    depuis_json.save_binary(str(tmp_path / "dbscan.npz"))
+    charge = DBSCAN.load_binary(str(tmp_path / "dbscan.npz"))
+    np.testing.assert_array_equal(charge.labels_, modele.labels_)
+    np.testing.assert_array_equal(charge.cluster_sizes_, np.bincount(modele.labels_[modele.labels_ >= 0]))
+
+
+def test_modele_non_entraine_refuse(tmp_path):
+    with pytest.raises(ValueError):
+        DBSCAN().save_binary(str(tmp_path / "dbscan.npz"))
@@ -0,0 +1,53 @@
+"""
+DBSCAN: les recherches de voisins 'brute', 'kdtree', 'grid' et 'chunked'
+donnent exactement les memes labels.
+
+Les jeux de points contiennent des doublons et des distances egales a eps
+(points sur une grille entiere avec eps entier): un voisin a la frontiere ne
+doit etre ni perdu ni ajoute par un index.
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+MODELS = Path(__file__).resolve().parents[1]
+for dossier in (MODELS, MODELS / "explication des performances"):
+    if str(dossier) not in sys.path:
+        sys.path.insert(0, str(dossier))
+
+from DBSCAN import DBSCAN
+from index_spatial import ALGORITHMES
+
+
+def _jeux():
+    rng = np.random.default_rng(0)
+    centres = rng.normal(scale=5, size=(4, 3))
+    amas = np.vstack([c + rng.normal(scale=0.4, size=(60, 3)) for c in centres])
+    bruit = rng.uniform(-12, 12, size=(40, 3))
+    grille = rng.integers(0, 8, size=(300, 2)).astype(float)  # nombreux doublons et distances exactement egales a eps
+    return [
+        (np.vstack([amas, bruit]), 0.8, 5),
+        (grille, 1.0, 4),
+        (grille, 2.0, 10),
+        (rng.normal(size=(250, 6)), 1.5, 3),
+    ]
+
+
+@pytest.mark.parametrize("X, eps, min_points", _jeux())
+def test_labels_identiques_pour_tous_les_algorithmes(X, eps, min_points):
+    reference = DBSCAN(eps=eps, min_points=min_points).fit(X, neighbors_algorithm="brute").labels_
+    assert len(set(reference.tolist()) - {-1}) > 0
+    for algorithme in ALGORITHMES:
+        labels = DBSCAN(eps=eps, min_points=min_points).fit(X, neighbors_algorithm=algorithme).labels_
+        np.testing.assert_array_equal(labels, reference, err_msg=algorithme)
+
+
+def test_chunked_independant_de_la_taille_des_blocs():
+    X, eps, min_points = _jeux()[0]
+    reference = DBSCAN(eps=eps, min_points=min_points).fit(X).labels_
+    for memoire_bloc in (1, 4096, 2**20):
+        modele = DBSCAN(eps=eps, min_points=min_points)
+        labels = modele.fit(X, neighbors_algorithm="chunked", memoire_bloc=memoire_bloc).labels_
+        np.testing.assert_array_equal(labels, reference)
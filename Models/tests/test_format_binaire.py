@@ -0,0 +1,98 @@
+"""
+Format binaire des modeles (format_binaire.py).
+
+Chaque classe a save_binary / load_binary fait l'aller-retour sans changer ses
+predictions, et les arbres charges sont de vrais objets Node / dictionnaires:
+sauvegardes a nouveau en JSON puis recharges, ils predisent toujours pareil.
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+MODELS = Path(__file__).resolve().parents[1]
+for dossier in (MODELS, MODELS / "optimisation des ressources", MODELS / "prediction performance"):
+    if str(dossier) not in sys.path:
+        sys.path.insert(0, str(dossier))
+
+from DecisionTreeRegressor import decisionTreeRegressor
+from Decision_Tree_Classification import DecisionTreeClassification
+from Decision_Tree_Regression import ArbreRegression
+from GradientBoostingRegressor import GradientBoostingRegressor
+from RandomForestRegressor import RandomForestRegressor
+from Random_Forest_Classification import RandomForestClassification
+from XGBoostRegressor import XGBoostRegressor
+from format_binaire import _arbres
+from gradientBoosting_model import ENSPD_GradientBoosting_Pure
+
+
+def _donnees(classification):
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(150, 4))
+    X[:, 3] = rng.integers(0, 3, size=150)
+    y = X[:, 0] + 0.5 * X[:, 3] + rng.normal(scale=0.2, size=150)
+    return X, (y > np.median(y)).astype(int) if classification else y
+
+
+# (fabrique, classification): petits modeles de chaque classe a format binaire
+MODELES = {
+    "decisionTreeRegressor": (lambda: decisionTreeRegressor(profondeur_max=6), False),
+    "GradientBoostingRegressor": (lambda: GradientBoostingRegressor(profondeur_max=3, n_trees=5), False),
+    "XGBoostRegressor": (lambda: XGBoostRegressor(profondeur_max=3, n_trees=5), False),
+    "RandomForestRegressor": (lambda: RandomForestRegressor(profondeur_max=4, n_trees=4, random_state=0), False),
+    "ArbreRegression": (lambda: ArbreRegression(profondeur_max=5), False),
+    "ENSPD_GradientBoosting_Pure": (lambda: ENSPD_GradientBoosting_Pure(n_arbres=5, max_depth=3), False),
+    "DecisionTreeClassification": (lambda: DecisionTreeClassification(profondeur_max=5), True),
+    "RandomForestClassification": (lambda: RandomForestClassification(nb_arbre=5, profondeur_max=4, random_state=0), True),
+}
+
+
+def _sorties(modele, X):
+    sorties = [np.asarray(modele.predict(X), dtype=float)]
+    if hasattr(modele, "predict_proba"):
+        sorties.append(np.asarray(modele.predict_proba(X), dtype=float))
+    return sorties
+
+
+def _charger_json(classe, chemin):
+    # load est une methode de classe pour certains modeles, une methode d'instance pour d'autres
+    modele = classe()
+    charge = modele.load(str(chemin))
+    return modele if charge is None else charge
+
+
+@pytest.mark.parametrize("nom", sorted(MODELES))
+def test_aller_retour_binaire(nom, tmp_path):
+    fabrique, classification = MODELES[nom]
+    X, y = _donnees(classification)
+    modele = fabrique()
+    modele.fit(X, y)
+    attendu = _sorties(modele, X)
+
+    modele.save_binary(str(tmp_path / "modele.npz"))
+    for mmap in (True, False):
+        charge = type(modele).load_binary(str(tmp_path / "modele.npz"), mmap=mmap)
+        assert type(charge) is type(modele)
+        for a, b in zip(attendu, _sorties(charge, X)):
+            np.testing.assert_array_equal(a, b)
+
+    # arbres reconstruits au chargement: meme classe de noeuds que ceux du fit
+    racines, racines_chargees = _arbres(modele)[2], _arbres(charge)[2]
+    assert len(racines) == len(racines_chargees)
+    assert {type(r) for r in racines_chargees} == {type(r) for r in racines}
+
+    if hasattr(modele, "save"):
+        charge.save(str(tmp_path / "modele.json"))
+        depuis_json = _charger_json(type(modele), tmp_path / "modele.json")
+        for a, b in zip(attendu, _sorties(depuis_json, X)):
+            np.testing.assert_array_equal(a, b)
+
+
+def test_mauvaise_classe_refusee(tmp_path):
+    X, y = _donnees(False)
+    modele = decisionTreeRegressor(profondeur_max=3)
+    modele.fit(X, y)
+    modele.save_binary(str(tmp_path / "modele.npz"))
+    with pytest.raises(ValueError):
+        XGBoostRegressor.load_binary(str(tmp_path / "modele.npz"))
@@ -0,0 +1,60 @@
+"""
+Memoire de construction des arbres: X n'est jamais copie par noeud.
+
+Chaque noeud lit ses colonnes une a une dans X (X[echantillons, j]); une copie
+X[echantillons] a la racine couterait a elle seule X.nbytes. Le pic mesure par
+tracemalloc pendant fit doit donc rester loin sous la taille de X (arbre peu
+profond: l'arbre lui-meme est negligeable).
+"""
+import sys
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+MODELS = Path(__file__).resolve().parents[1]
+for dossier in (MODELS, MODELS / "optimisation des ressources", MODELS / "prediction performance"):
+    if str(dossier) not in sys.path:
+        sys.path.insert(0, str(dossier))
+
+from DecisionTreeRegressor import decisionTreeRegressor
+from GradientBoostingRegressor import GradientBoostingRegressor
+from XGBoostRegressor import XGBoostRegressor
+from Decision_Tree_Classification import DecisionTreeClassification
+from gradientBoosting_model import ENSPD_GradientBoosting_Pure
+from Decision_Tree_Regression import ArbreRegression
+
+
+def _donnees(classification=False):
+    rng = np.random.default_rng(0)
+    # peu de valeurs distinctes et une cible en escalier: arbres courts, boucles rapides
+    X = rng.integers(0, 16, size=(20000, 32)).astype(float)
+    y = (X[:, 0] > 7) * 2.0 + (X[:, 1] > 3)
+    if classification:
+        y = (y > 1).astype(int)
+    return X, y
+
+
+def _pic_fit(modele, X, y):
+    tracemalloc.start()
+    try:
+        modele.fit(X, y)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.mark.parametrize("fabrique, classification", [
+    (lambda: decisionTreeRegressor(profondeur_max=4), False),
+    (lambda: GradientBoostingRegressor(profondeur_max=3, n_trees=2), False),
+    (lambda: GradientBoostingRegressor(profondeur_max=3, n_trees=2, binned=True), False),
+    (lambda: XGBoostRegressor(profondeur_max=3, n_trees=2), False),
+    (lambda: ArbreRegression(profondeur_max=3), False),
+    (lambda: ENSPD_GradientBoosting_Pure(n_arbres=2, max_depth=3), True),
+    (lambda: DecisionTreeClassification(profondeur_max=4), True),
+])
+def test_pic_memoire_sous_la_taille_de_X(fabrique, classification):
+    X, y = _donnees(classification)
+    pic = _pic_fit(fabrique(), X, y)
+    assert pic < X.nbytes / 2, f"pic {pic / 2**20:.2f} Mo pour X de {X.nbytes / 2**20:.2f} Mo"
@@ -0,0 +1,82 @@
+"""
+Forme compacte float32 des modeles (modele_compact.py) et lignes de verification
+communes (description_arbres.py).
+
+compacter() predit a la precision float32 pres comme le modele d'origine, et les
+lignes de donnees_verification atteignent toutes les feuilles de chaque arbre.
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+MODELS = Path(__file__).resolve().parents[1]
+for dossier in (MODELS, MODELS / "optimisation des ressources", MODELS / "prediction performance"):
+    if str(dossier) not in sys.path:
+        sys.path.insert(0, str(dossier))
+
+from DecisionTreeRegressor import decisionTreeRegressor
+from Decision_Tree_Classification import DecisionTreeClassification
+from Decision_Tree_Regression import ArbreRegression
+from GradientBoostingRegressor import GradientBoostingRegressor
+from RandomForestRegressor import RandomForestRegressor
+from Random_Forest_Classification import RandomForestClassification
+from XGBoostRegressor import XGBoostRegressor
+from description_arbres import decrire, donnees_verification
+from gradientBoosting_model import ENSPD_GradientBoosting_Pure
+from modele_compact import TOLERANCE_DEFAUT, compacter
+from node_table import tables_en_cache
+
+MODELES = {
+    "decisionTreeRegressor": (lambda: decisionTreeRegressor(profondeur_max=6), False),
+    "GradientBoostingRegressor": (lambda: GradientBoostingRegressor(profondeur_max=3, n_trees=8), False),
+    "XGBoostRegressor": (lambda: XGBoostRegressor(profondeur_max=3, n_trees=8), False),
+    "RandomForestRegressor": (lambda: RandomForestRegressor(profondeur_max=5, n_trees=4, random_state=0), False),
+    "ArbreRegression": (lambda: ArbreRegression(profondeur_max=5), False),
+    "ENSPD_GradientBoosting_Pure": (lambda: ENSPD_GradientBoosting_Pure(n_arbres=8, max_depth=3), False),
+    "DecisionTreeClassification": (lambda: DecisionTreeClassification(profondeur_max=5), True),
+    "RandomForestClassification": (lambda: RandomForestClassification(nb_arbre=5, profondeur_max=4, random_state=0), True),
+}
+
+
+def _modele(nom):
+    fabrique, classification = MODELES[nom]
+    rng = np.random.default_rng(0)
+    # echelle des targets loin de 1: l'ecart float32 n'est pas masque par le max(1, |y|) de la tolerance
+    X = rng.normal(scale=100.0, size=(200, 4))
+    y = 1000.0 * np.tanh(X[:, 0] / 100.0) + X[:, 1] + rng.normal(size=200)
+    modele = fabrique()
+    modele.fit(X, (y > np.median(y)).astype(int) if classification else y)
+    return modele, rng.normal(scale=100.0, size=(500, 4))
+
+
+@pytest.mark.parametrize("nom", sorted(MODELES))
+def test_compact_dans_la_tolerance_float32(nom):
+    modele, X = _modele(nom)
+    compact = compacter(modele)
+    assert compact.rapport["ecart_max"] <= TOLERANCE_DEFAUT
+    assert compact.rapport["ratio"] > 1
+
+    reference = np.asarray(modele.predict(X), dtype=float)
+    obtenu = compact.predict(X)
+    np.testing.assert_allclose(obtenu, reference, rtol=1e-6 * len(decrire(modele)[0]), atol=1e-6)
+    if compact.mode == "vote":  # predict_proba compact: forets de classification seulement
+        np.testing.assert_allclose(compact.predict_proba(X), modele.predict_proba(X), atol=1e-6)
+
+
+def test_ecart_au_dela_de_la_tolerance_refuse():
+    modele, _ = _modele("GradientBoostingRegressor")
+    with pytest.raises(ValueError):
+        compacter(modele, tolerance=0.0)
+
+
+@pytest.mark.parametrize("nom", ["GradientBoostingRegressor", "DecisionTreeClassification", "ArbreRegression"])
+@pytest.mark.parametrize("voisins_exacts", [False, True])
+def test_donnees_verification_atteignent_chaque_feuille(nom, voisins_exacts):
+    modele, _ = _modele(nom)
+    arbres, lire, _, _, _ = decrire(modele)
+    tables = tables_en_cache(modele, arbres, lire)
+    X = donnees_verification(tables, n_lignes=16, voisins_exacts=voisins_exacts)
+    for table in tables:
+        assert set(table.apply(X).tolist()) == set(np.flatnonzero(table.left < 0).tolist())
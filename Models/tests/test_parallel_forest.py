@@ -0,0 +1,109 @@
+"""
+Construction parallele des forets (parallel_forest.py).
+
+La foret ne depend que de random_state, pas de n_jobs, et la memoire partagee
+de X et y est liberee meme quand un processus echoue.
+"""
+import sys
+from functools import partial
+from multiprocessing import shared_memory
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+MODELS = Path(__file__).resolve().parents[1]
+for dossier in (MODELS, MODELS / "optimisation des ressources", MODELS / "prediction performance"):
+    if str(dossier) not in sys.path:
+        sys.path.insert(0, str(dossier))
+
+import parallel_forest
+from parallel_forest import construire_foret
+from RandomForestRegressor import RandomForestRegressor
+from Random_Forest_Classification import RandomForestClassification
+
+
+def _tirage(X, y, rng):
+    # "arbre" minimal: depend des donnees partagees et du generateur de l'arbre
+    lignes = rng.choice(len(X), size=5)
+    return float(X[lignes].sum() + y[lignes].sum())
+
+
+def _echec(X, y, rng, graine_en_echec):
+    if rng.integers(100) == graine_en_echec:
+        raise RuntimeError("echec dans un processus")
+    return 0.0
+
+
+def _noeuds(racine):
+    lignes, pile = [], [racine]
+    while pile:
+        node = pile.pop()
+        if node is None:
+            lignes.append(None)
+        elif isinstance(node, dict):
+            lignes.append((node["feature"], node["seuil"], node["decision"]))
+            pile += [node["arbre enfant de droite"], node["arbre enfant de gauche"]]
+        else:
+            lignes.append((node.feature, node.threshold, node.prediction))
+            pile += [node.right, node.left]
+    return lignes
+
+
+def _donnees():
+    rng = np.random.default_rng(0)
+    X = rng.integers(0, 6, size=(150, 4)).astype(float)
+    y = X[:, 0] + (X[:, 1] > 2) + rng.normal(scale=0.1, size=150)
+    return X, y
+
+
+def test_meme_graine_meme_resultat_quel_que_soit_n_jobs():
+    X, y = _donnees()
+    sequentiel = construire_foret(_tirage, X, y, 12, n_jobs=1, random_state=7)
+    for n_jobs in (2, 3):
+        assert construire_foret(_tirage, X, y, 12, n_jobs=n_jobs, random_state=7) == sequentiel
+    assert construire_foret(_tirage, X, y, 12, n_jobs=1, random_state=8) != sequentiel
+
+
+def test_foret_regression_independante_de_n_jobs():
+    X, y = _donnees()
+    forets = []
+    for n_jobs in (1, 2):
+        modele = RandomForestRegressor(profondeur_max=4, n_trees=4, n_jobs=n_jobs, random_state=0)
+        modele.fit(X, y)
+        forets.append(modele)
+    assert [_noeuds(a) for a in forets[0].forest] == [_noeuds(a) for a in forets[1].forest]
+    np.testing.assert_array_equal(forets[0].predict(X), forets[1].predict(X))
+
+
+def test_foret_classification_independante_de_n_jobs():
+    X, y = _donnees()
+    y = (y > np.median(y)).astype(float)
+    forets = []
+    for n_jobs in (1, 2):
+        modele = RandomForestClassification(nb_arbre=4, profondeur_max=4, n_jobs=n_jobs, random_state=0)
+        modele.fit(X, y)
+        forets.append(modele)
+    assert [_noeuds(a) for a in forets[0].forest] == [_noeuds(a) for a in forets[1].forest]
+    np.testing.assert_array_equal(forets[0].predict(X), forets[1].predict(X))
+
+
+def test_memoire_partagee_liberee_apres_une_erreur(monkeypatch):
+    noms = []
+    creer = parallel_forest._vers_memoire_partagee
+
+    def creer_et_noter(tableau):
+        shm, description = creer(tableau)
+        noms.append(shm.name)
+        return shm, description
+
+    monkeypatch.setattr(parallel_forest, "_vers_memoire_partagee", creer_et_noter)
+    X, y = _donnees()
+    # premier tirage de la graine de l'un des arbres: cet arbre echoue dans son processus
+    graine_en_echec = int(np.random.default_rng(np.random.SeedSequence(3).spawn(8)[5]).integers(100))
+    with pytest.raises(RuntimeError, match="echec dans un processus"):
+        construire_foret(partial(_echec, graine_en_echec=graine_en_echec), X, y, 8, n_jobs=2, random_state=3)
+    assert len(noms) == 2
+    for nom in noms:
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=nom)
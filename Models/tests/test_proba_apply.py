@@ -0,0 +1,128 @@
+"""
+predict_proba et apply des arbres de classification (DecisionTreeClassification,
+RandomForestClassification).
+
+apply donne le numero (prefixe) de la feuille atteinte; pour l'arbre seul,
+predict_proba est la frequence de la classe 1 parmi les lignes d'entrainement de
+cette feuille, et predict la classe majoritaire. Pour la foret, predict_proba est
+la fraction des arbres qui votent 1, lue sur les feuilles donnees par apply.
+"""
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+MODELS = Path(__file__).resolve().parents[1]
+for dossier in (MODELS, MODELS / "prediction performance"):
+    if str(dossier) not in sys.path:
+        sys.path.insert(0, str(dossier))
+
+from Decision_Tree_Classification import DecisionTreeClassification
+from Random_Forest_Classification import RandomForestClassification
+from node_table import TableNoeuds, lire_classification
+
+
+@pytest.fixture(scope="module")
+def donnees():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(300, 4))
+    y = ((X[:, 0] + 0.5 * rng.normal(size=300)) > 0).astype(int)  # classes bruitees: feuilles impures
+    return X, y, rng.normal(size=(200, 4))
+
+
+def _noeuds_prefixes(racine):
+    noeuds, pile = [], [racine]
+    while pile:
+        noeud = pile.pop()
+        noeuds.append(noeud)
+        if noeud["arbre enfant de gauche"] is not None:
+            pile += [noeud["arbre enfant de droite"], noeud["arbre enfant de gauche"]]
+    return noeuds
+
+
+def test_arbre_proba_frequence_de_la_feuille(donnees):
+    X, y, _ = donnees
+    modele = DecisionTreeClassification(profondeur_max=3, nb_ex_feuilles_min=20)
+    modele.fit(X, y)
+    table = TableNoeuds.depuis_arbre(modele.racine, lire_classification)
+    feuilles = modele.apply(X)
+    assert np.all(table.left[feuilles] < 0)
+    proba = modele.predict_proba(X)
+    impures = 0
+    for feuille in np.unique(feuilles):
+        lignes = feuilles == feuille
+        frequence = y[lignes].mean()
+        np.testing.assert_allclose(proba[lignes], frequence)
+        np.testing.assert_array_equal(modele.predict(X[lignes]), float(frequence > 0.5))
+        impures += 0 < frequence < 1
+    assert impures > 0  # des probabilites autres que 0 / 1
+
+
+def test_arbre_apply_et_proba_hors_entrainement(donnees):
+    X, y, X_test = donnees
+    modele = DecisionTreeClassification(profondeur_max=4)
+    modele.fit(X, y)
+    table = TableNoeuds.depuis_arbre(modele.racine, lire_classification)
+    feuilles = modele.apply(X_test)
+    np.testing.assert_array_equal(feuilles, table.apply(X_test))
+    probas_feuilles = np.array([noeud.get("proba", np.nan) for noeud in _noeuds_prefixes(modele.racine)])
+    np.testing.assert_array_equal(modele.predict_proba(X_test), probas_feuilles[feuilles])
+    np.testing.assert_array_equal(modele.apply(X_test[0]), feuilles[:1])
+
+
+def test_arbre_sans_frequences_retourne_la_decision(donnees, tmp_path):
+    # modele sauvegarde avant predict_proba: pas de cle 'proba' dans les noeuds
+    X, y, X_test = donnees
+    modele = DecisionTreeClassification(profondeur_max=4)
+    modele.fit(X, y)
+    for noeud in _noeuds_prefixes(modele.racine):
+        del noeud["proba"]
+    modele.save(str(tmp_path / "dtc.json"))
+    with open(tmp_path / "dtc.json", encoding="utf-8") as f:
+        assert "proba" not in json.dumps(json.load(f))
+    ancien = DecisionTreeClassification()
+    ancien.load(str(tmp_path / "dtc.json"))
+    np.testing.assert_array_equal(ancien.predict_proba(X_test), ancien.predict(X_test))
+
+
+def test_arbre_proba_conservee_par_save_load(donnees, tmp_path):
+    X, y, X_test = donnees
+    modele = DecisionTreeClassification(profondeur_max=4)
+    modele.fit(X, y)
+    modele.save(str(tmp_path / "dtc.json"))
+    charge = DecisionTreeClassification()
+    charge.load(str(tmp_path / "dtc.json"))
+    np.testing.assert_array_equal(charge.predict_proba(X_test), modele.predict_proba(X_test))
+    np.testing.assert_array_equal(charge.apply(X_test), modele.apply(X_test))
+
+
+def test_foret_apply_et_votes(donnees):
+    X, y, X_test = donnees
+    modele = RandomForestClassification(nb_arbre=9, profondeur_max=4, random_state=0)
+    modele.fit(X, y)
+    feuilles = modele.apply(X_test)
+    assert feuilles.shape == (len(X_test), modele.nb_arbre)
+    decisions = np.empty(feuilles.shape)
+    for a, arbre in enumerate(modele.forest[:modele.nb_arbre]):
+        table = TableNoeuds.depuis_arbre(arbre, lire_classification)
+        np.testing.assert_array_equal(feuilles[:, a], table.apply(X_test))
+        assert np.all(table.left[feuilles[:, a]] < 0)
+        decisions[:, a] = table.value[feuilles[:, a]]
+        np.testing.assert_array_equal(decisions[:, a], [modele.predict_one_tree(x, arbre) for x in X_test])
+    proba = modele.predict_proba(X_test)
+    np.testing.assert_array_equal(proba, np.sum(decisions == 1, axis=1) / modele.nb_arbre)
+    np.testing.assert_array_equal(np.round(proba * modele.nb_arbre), proba * modele.nb_arbre)
+    assert len(np.unique(proba)) > 2  # des votes partages, pas seulement 0 / 1
+
+
+def test_foret_proba_conservee_par_save_load(donnees, tmp_path):
+    X, y, X_test = donnees
+    modele = RandomForestClassification(nb_arbre=7, profondeur_max=4, random_state=1)
+    modele.fit(X, y)
+    modele.save(str(tmp_path / "rfc.json"))
+    charge = RandomForestClassification()
+    charge.load(str(tmp_path / "rfc.json"))
+    np.testing.assert_array_equal(charge.predict_proba(X_test), modele.predict_proba(X_test))
+    np.testing.assert_array_equal(charge.apply(X_test), modele.apply(X_test))
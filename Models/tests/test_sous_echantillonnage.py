@@ -0,0 +1,87 @@
+"""
+Sous-echantillonnage des lignes (subsample) et des colonnes (colsample_bytree)
+de GradientBoostingRegressor.
+
+Meme random_state: meme foret, exacte et binned, y compris apres save / load.
+Fractions a 1: aucun tirage, la foret ne depend pas de random_state.
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+MODELS = Path(__file__).resolve().parents[1]
+for dossier in (MODELS, MODELS / "optimisation des ressources"):
+    if str(dossier) not in sys.path:
+        sys.path.insert(0, str(dossier))
+
+from GradientBoostingRegressor import GradientBoostingRegressor
+
+
+@pytest.fixture(scope="module")
+def donnees():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(300, 6))
+    y = X[:, 0] * 2 + np.sin(X[:, 1]) + X[:, 4] * X[:, 5] + rng.normal(scale=0.1, size=300)
+    return X, y
+
+
+def _foret(X, y, **parametres):
+    modele = GradientBoostingRegressor(n_trees=6, learning_rate=0.3, **parametres)
+    modele.fit(X, y)
+    return modele
+
+
+def _splits(racine):
+    splits, pile = [], [racine]
+    while pile:
+        node = pile.pop()
+        if node.left is not None:
+            splits.append((node.feature, node.threshold))
+            pile += [node.right, node.left]
+    return splits
+
+
+@pytest.mark.parametrize("binned", [False, True])
+def test_meme_graine_meme_foret(donnees, binned):
+    X, y = donnees
+    parametres = dict(subsample=0.7, colsample_bytree=0.5, random_state=42, binned=binned)
+    a, b = _foret(X, y, **parametres), _foret(X, y, **parametres)
+    assert [_splits(t) for t in a.forest] == [_splits(t) for t in b.forest]
+    np.testing.assert_array_equal(a.predict(X), b.predict(X))
+
+
+def test_autre_graine_autre_foret(donnees):
+    X, y = donnees
+    a = _foret(X, y, subsample=0.7, colsample_bytree=0.5, random_state=1)
+    b = _foret(X, y, subsample=0.7, colsample_bytree=0.5, random_state=2)
+    assert not np.array_equal(a.predict(X), b.predict(X))
+
+
+def test_fractions_a_un_sans_tirage(donnees):
+    X, y = donnees
+    reference = _foret(X, y).predict(X)
+    for graine in (None, 0, 7):
+        np.testing.assert_array_equal(_foret(X, y, random_state=graine).predict(X), reference)
+
+
+def test_colonnes_tirees_par_arbre(donnees):
+    # colsample_bytree=0.5 sur 6 colonnes: chaque arbre ne coupe que sur 3 features au plus
+    X, y = donnees
+    modele = _foret(X, y, colsample_bytree=0.5, random_state=3)
+    utilisees = [{f for f, _ in _splits(t)} for t in modele.forest]
+    assert all(len(u) <= 3 for u in utilisees)
+    assert len(set().union(*utilisees)) > 3  # mais pas les memes pour tous les arbres
+
+
+def test_hyperparametres_conserves_par_save_load(donnees, tmp_path):
+    X, y = donnees
+    modele = _foret(X, y, subsample=0.8, colsample_bytree=0.5, random_state=5)
+    modele.save(str(tmp_path / "gb.json"))
+    charge = GradientBoostingRegressor.load(str(tmp_path / "gb.json"))
+    assert (charge.subsample, charge.colsample_bytree, charge.random_state) == (0.8, 0.5, 5)
+    np.testing.assert_array_equal(charge.predict(X), modele.predict(X))
+    # la graine sauvegardee suffit pour reentrainer la meme foret
+    charge.fit(X, y)
+    np.testing.assert_array_equal(charge.predict(X), modele.predict(X))
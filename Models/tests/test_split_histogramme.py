@@ -0,0 +1,109 @@
+"""
+Splits par histogrammes (quantifier_features / meilleur_split_histogramme) et
+mode binned de GradientBoostingRegressor.
+
+Quand chaque feature a au plus max_bins valeurs distinctes, la quantification ne
+perd aucun seuil: le split des histogrammes (hessians a 1, lambda nul) est celui
+de la recherche exacte meilleur_split_variance, et le boosting binned construit
+les memes arbres que le boosting exact.
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+MODELS = Path(__file__).resolve().parents[1]
+for dossier in (MODELS, MODELS / "optimisation des ressources"):
+    if str(dossier) not in sys.path:
+        sys.path.insert(0, str(dossier))
+
+from GradientBoostingRegressor import GradientBoostingRegressor
+from split_search import meilleur_split_histogramme, meilleur_split_variance, quantifier_features
+
+
+def _peu_de_valeurs(graine, n=300, n_features=5, n_valeurs=7):
+    rng = np.random.default_rng(graine)
+    X = rng.integers(0, n_valeurs, size=(n, n_features)) * 0.5 - 1.0
+    y = X[:, 0] * 2 - X[:, 2] ** 2 + rng.normal(scale=0.3, size=n)
+    return X, y
+
+
+def _splits(racine, profondeur_max=np.inf):
+    # (feature, seuil) des noeuds internes jusqu'a profondeur_max, en ordre prefixe
+    splits, pile = [], [(racine, 0)]
+    while pile:
+        node, profondeur = pile.pop()
+        if node.left is None or profondeur > profondeur_max:
+            continue
+        splits.append((node.feature, node.threshold))
+        pile += [(node.right, profondeur + 1), (node.left, profondeur + 1)]
+    return splits
+
+
+@pytest.mark.parametrize("max_bins", [4, 16, 255])
+def test_codes_respectent_les_bornes(max_bins):
+    rng = np.random.default_rng(0)
+    X = np.column_stack([rng.integers(0, 3, 500), rng.normal(size=500), rng.integers(0, 40, 500)]).astype(float)
+    X_bins, bornes = quantifier_features(X, max_bins)
+    for j in range(X.shape[1]):
+        assert len(bornes[j]) <= max_bins - 1
+        # X[i, j] <= bornes[j][k] <=> X_bins[i, j] <= k
+        for k, borne in enumerate(bornes[j]):
+            np.testing.assert_array_equal(X[:, j] <= borne, X_bins[:, j] <= k)
+        uniques = np.unique(X[:, j])
+        if len(uniques) <= max_bins:
+            np.testing.assert_array_equal(bornes[j], uniques[:-1])  # aucun seuil perdu
+
+
+def test_max_bins_hors_limites():
+    with pytest.raises(ValueError):
+        quantifier_features(np.zeros((3, 2)), max_bins=257)
+
+
+@pytest.mark.parametrize("graine", range(8))
+def test_meme_split_que_la_recherche_exacte(graine):
+    X, y = _peu_de_valeurs(graine)
+    X_bins, bornes = quantifier_features(X)
+    rng = np.random.default_rng(100 + graine)
+    echantillons = np.sort(rng.choice(len(y), size=180, replace=False))
+    features = np.array([4, 0, 2, 3])
+    for ech in (None, echantillons):
+        y_noeud = y if ech is None else y[ech]
+        for feats in (None, features):
+            f_exact, seuil_exact, gain_exact = meilleur_split_variance(X, y_noeud, features=feats, echantillons=ech)
+            f, k, score = meilleur_split_histogramme(X_bins, bornes, y_noeud - np.mean(y_noeud), np.ones(len(y_noeud)),
+                                                     features=feats, echantillons=ech)
+            assert f == f_exact
+            assert bornes[f][k] == seuil_exact
+            assert score / len(y_noeud) == pytest.approx(gain_exact, rel=1e-9)
+
+
+@pytest.mark.parametrize("graine", range(3))
+def test_boosting_binned_memes_arbres(graine):
+    X, y = _peu_de_valeurs(graine)
+    exact = GradientBoostingRegressor(profondeur_max=4, n_trees=6, learning_rate=0.3)
+    exact.fit(X, y)
+    binned = GradientBoostingRegressor(profondeur_max=4, n_trees=6, learning_rate=0.3, binned=True)
+    binned.fit(X, y)
+    assert len(binned.forest) == len(exact.forest)
+    # les arbres descendent jusqu'a la profondeur 10 (valeur par defaut de build_tree): dans les
+    # petits noeuds, deux features peuvent separer les memes lignes a l'arrondi pres et l'egalite
+    # n'est pas forcement departagee pareil; les premiers niveaux sont identiques
+    for a, b in zip(binned.forest, exact.forest):
+        assert _splits(a, 3) == _splits(b, 3)
+    # meme partition des lignes d'entrainement: memes predictions sur X
+    np.testing.assert_allclose(binned.predict(X), exact.predict(X), rtol=1e-9, atol=1e-12)
+
+
+def test_binned_seuils_parmi_les_bornes():
+    # beaucoup de valeurs distinctes: les seuils du mode binned sont des bornes de quantiles
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(400, 3))
+    y = np.sin(X[:, 0]) + X[:, 1]
+    modele = GradientBoostingRegressor(profondeur_max=3, n_trees=3, binned=True, max_bins=16)
+    modele.fit(X, y)
+    _, bornes = quantifier_features(X, 16)
+    for arbre in modele.forest:
+        for feature, seuil in _splits(arbre):
+            assert seuil in bornes[feature]
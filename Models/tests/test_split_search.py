@@ -0,0 +1,159 @@
+"""
+Recherche vectorisee des splits: memes arbres que la double boucle exhaustive.
+
+Les boucles de reference ci-dessous reprennent celles d'origine de
+decisionTreeRegressor.build_tree (variance) et DecisionTreeClassification.Arbre
+(entropie): chaque valeur unique de chaque feature est testee avec deux masques,
+mise a jour stricte (gain > meilleur_gain). Les donnees sont choisies pour
+multiplier les egalites (peu de valeurs distinctes, features dupliquees).
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+MODELS = Path(__file__).resolve().parents[1]
+for dossier in (MODELS, MODELS / "optimisation des ressources", MODELS / "prediction performance"):
+    if str(dossier) not in sys.path:
+        sys.path.insert(0, str(dossier))
+
+import DecisionTreeRegressor as module_dtr
+import Decision_Tree_Classification as module_dtc
+from split_search import meilleur_split_entropie, meilleur_split_variance
+
+
+def split_variance_exhaustif(X, y, features=None, variance_parent=None, echantillons=None):
+    if echantillons is not None:
+        X = X[echantillons]
+    if variance_parent is None:
+        variance_parent = np.var(y)
+    meilleur_gain, meilleur_feature, meilleur_seuil = 0, None, None
+    for j in range(X.shape[1]) if features is None else features:
+        for seuil in np.unique(X[:, j]):
+            gauche_idx = X[:, j] <= seuil
+            droite_idx = X[:, j] > seuil
+            if np.sum(gauche_idx) == 0 or np.sum(droite_idx) == 0:
+                continue
+            y_gauche = y[gauche_idx]
+            y_droite = y[droite_idx]
+            erreur_apres = (len(y_gauche) / len(y)) * np.var(y_gauche) + (len(y_droite) / len(y)) * np.var(y_droite)
+            gain = variance_parent - erreur_apres
+            if gain > meilleur_gain:
+                meilleur_gain, meilleur_feature, meilleur_seuil = gain, j, seuil
+    return meilleur_feature, meilleur_seuil, meilleur_gain
+
+
+def _entropie(index, y):
+    p = np.sum(y[index] == 1) / np.sum(index)
+    if p == 0 or p == 1:
+        return 0
+    return - p * np.log2(p) - (1 - p) * np.log2(1 - p)
+
+
+def split_entropie_exhaustif(X, y, entropie_parent, features=None, echantillons=None):
+    if echantillons is not None:
+        X = X[echantillons]
+    meilleur_gain, meilleur_feature, meilleur_seuil = 0, None, None
+    for j in range(X.shape[1]) if features is None else features:
+        for seuil in np.unique(X[:, j]):
+            index_gauche = X[:, j] <= seuil
+            index_droite = X[:, j] > seuil
+            if np.sum(index_gauche) == 0 or np.sum(index_droite) == 0:
+                continue
+            gain = (entropie_parent
+                    - (np.sum(index_gauche) / len(y)) * _entropie(index_gauche, y)
+                    - (np.sum(index_droite) / len(y)) * _entropie(index_droite, y))
+            if gain > meilleur_gain:
+                meilleur_gain, meilleur_feature, meilleur_seuil = gain, j, seuil
+    return meilleur_feature, meilleur_seuil, meilleur_gain
+
+
+def _donnees(graine, n=300, n_features=5, n_valeurs=4):
+    rng = np.random.default_rng(graine)
+    X = rng.integers(0, n_valeurs, size=(n, n_features)).astype(float)
+    X[:, -1] = X[:, 0]  # feature dupliquee: egalite exacte entre deux features
+    y = X[:, 0] + 0.5 * X[:, 1] + rng.integers(0, 2, size=n)
+    return X, y
+
+
+def _noeuds_node(racine):
+    # parcours prefixe iteratif d'un arbre de Node
+    lignes, pile = [], [racine]
+    while pile:
+        node = pile.pop()
+        if node is None:
+            lignes.append(None)
+            continue
+        lignes.append((node.feature, node.threshold, node.prediction))
+        pile += [node.right, node.left]
+    return lignes
+
+
+def _noeuds_dict(racine):
+    lignes, pile = [], [racine]
+    while pile:
+        noeud = pile.pop()
+        if noeud is None:
+            lignes.append(None)
+            continue
+        lignes.append((noeud["feature"], noeud["seuil"], noeud["decision"], noeud["proba"]))
+        pile += [noeud["arbre enfant de droite"], noeud["arbre enfant de gauche"]]
+    return lignes
+
+
+@pytest.mark.parametrize("graine", range(6))
+def test_split_variance_identique_a_la_boucle(graine):
+    X, y = _donnees(graine)
+    echantillons = np.random.default_rng(graine).choice(len(X), size=120, replace=False)
+    for kwargs in ({}, {"echantillons": echantillons}, {"features": [3, 1, 4]}):
+        y_noeud = y if "echantillons" not in kwargs else y[echantillons]
+        attendu = split_variance_exhaustif(X, y_noeud, **kwargs)
+        obtenu = meilleur_split_variance(X, y_noeud, **kwargs)
+        assert obtenu[:2] == attendu[:2]
+        assert obtenu[2] == attendu[2]
+
+
+@pytest.mark.parametrize("graine", range(6))
+def test_split_entropie_identique_a_la_boucle(graine):
+    X, y = _donnees(graine)
+    y = (y > np.median(y)).astype(float)
+    echantillons = np.random.default_rng(graine).choice(len(X), size=120, replace=False)
+    for kwargs in ({}, {"echantillons": echantillons}, {"features": [3, 1, 4]}):
+        y_noeud = y if "echantillons" not in kwargs else y[echantillons]
+        p = np.mean(y_noeud)
+        entropie_parent = 0 if p in (0, 1) else - p * np.log2(p) - (1 - p) * np.log2(1 - p)
+        attendu = split_entropie_exhaustif(X, y_noeud, entropie_parent, **kwargs)
+        obtenu = meilleur_split_entropie(X, y_noeud, entropie_parent, **kwargs)
+        assert obtenu[:2] == attendu[:2]
+        assert obtenu[2] == attendu[2]
+
+
+def test_aucun_split_sur_feature_constante():
+    X = np.ones((10, 3))
+    y = np.arange(10.0)
+    assert meilleur_split_variance(X, y) == (None, None, 0)
+    assert meilleur_split_entropie(X, (y > 4).astype(float), 1.0) == (None, None, 0)
+
+
+@pytest.mark.parametrize("graine", range(3))
+def test_arbre_regression_identique_a_la_boucle(graine, monkeypatch):
+    X, y = _donnees(graine, n=200)
+    modele = module_dtr.decisionTreeRegressor()
+    modele.fit(X, y)
+    monkeypatch.setattr(module_dtr, "meilleur_split_variance", split_variance_exhaustif)
+    reference = module_dtr.decisionTreeRegressor()
+    reference.fit(X, y)
+    assert _noeuds_node(modele.root) == _noeuds_node(reference.root)
+
+
+@pytest.mark.parametrize("graine", range(3))
+def test_arbre_classification_identique_a_la_boucle(graine, monkeypatch):
+    X, y = _donnees(graine, n=200)
+    y = (y > np.median(y)).astype(float)
+    modele = module_dtc.DecisionTreeClassification(profondeur_max=8)
+    modele.fit(X, y)
+    monkeypatch.setattr(module_dtc, "meilleur_split_entropie", split_entropie_exhaustif)
+    reference = module_dtc.DecisionTreeClassification(profondeur_max=8)
+    reference.fit(X, y)
+    assert _noeuds_dict(modele.racine) == _noeuds_dict(reference.racine)
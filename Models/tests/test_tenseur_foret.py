@@ -0,0 +1,89 @@
+"""
+Evaluation d'une foret entiere en tenseurs de noeuds (node_table.TenseurForet).
+
+Le tenseur donne, arbre par arbre, la meme feuille et la meme valeur que la table
+de chaque arbre (arbres de tailles differentes, feuille seule, lignes NaN, toutes
+tailles de blocs), et le vote de RandomForestClassification est la somme des
+votes des arbres parcourus un par un.
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+MODELS = Path(__file__).resolve().parents[1]
+for dossier in (MODELS, MODELS / "prediction performance"):
+    if str(dossier) not in sys.path:
+        sys.path.insert(0, str(dossier))
+
+from Random_Forest_Classification import RandomForestClassification
+from node_table import TableNoeuds, TenseurForet, lire_classification
+
+
+def _arbre(rng, profondeur, n_features):
+    # arbre de classification aleatoire (dictionnaires), profondeurs inegales
+    racine = {}
+    pile = [(racine, 0)]
+    while pile:
+        noeud, p = pile.pop()
+        feuille = p >= profondeur or rng.random() < 0.25
+        noeud.update({"feature": None if feuille else int(rng.integers(n_features)),
+                      "seuil": None if feuille else float(rng.normal()),
+                      "decision": int(rng.integers(2)),
+                      "arbre enfant de gauche": None, "arbre enfant de droite": None})
+        if not feuille:
+            noeud["arbre enfant de gauche"], noeud["arbre enfant de droite"] = {}, {}
+            pile += [(noeud["arbre enfant de gauche"], p + 1), (noeud["arbre enfant de droite"], p + 1)]
+    return racine
+
+
+@pytest.fixture(scope="module")
+def foret():
+    rng = np.random.default_rng(0)
+    arbres = [_arbre(rng, int(rng.integers(0, 9)), 5) for _ in range(30)]
+    arbres.append({"feature": None, "seuil": None, "decision": 1,
+                   "arbre enfant de gauche": None, "arbre enfant de droite": None})  # feuille seule
+    X = rng.normal(size=(700, 5))
+    X[::13, 2] = np.nan
+    return arbres, X
+
+
+@pytest.mark.parametrize("taille_bloc", [1, 7, 256, 1024])
+def test_meme_feuille_et_valeur_que_chaque_table(foret, taille_bloc):
+    arbres, X = foret
+    tables = [TableNoeuds.depuis_arbre(a, lire_classification) for a in arbres]
+    tenseur = TenseurForet(tables)
+    feuilles = tenseur.apply(X, taille_bloc=taille_bloc)
+    assert feuilles.shape == (len(X), len(arbres))
+    for a, table in enumerate(tables):
+        np.testing.assert_array_equal(feuilles[:, a], table.apply(X))
+    np.testing.assert_array_equal(tenseur.predict(X), np.column_stack([t.predict(X) for t in tables]))
+
+
+def test_somme_des_votes(foret):
+    arbres, X = foret
+    tables = [TableNoeuds.depuis_arbre(a, lire_classification) for a in arbres]
+    votes = np.sum(TenseurForet(tables).predict(X) == 1, axis=1)
+    np.testing.assert_array_equal(votes, sum((t.predict(X) == 1).astype(int) for t in tables))
+
+
+def test_ligne_unique(foret):
+    arbres, X = foret
+    tables = [TableNoeuds.depuis_arbre(a, lire_classification) for a in arbres]
+    np.testing.assert_array_equal(TenseurForet(tables).predict(X[0]), TenseurForet(tables).predict(X[:1]))
+
+
+def test_foret_de_classification_vote_des_arbres():
+    rng = np.random.default_rng(1)
+    X = rng.normal(size=(250, 4))
+    y = ((X[:, 0] + X[:, 1] * X[:, 2]) > 0).astype(int)
+    modele = RandomForestClassification(nb_arbre=15, profondeur_max=5, random_state=0)
+    modele.fit(X, y)
+    X_test = rng.normal(size=(120, 4))
+
+    votes = np.array([[modele.predict_one_tree(x, arbre) for arbre in modele.forest[:modele.nb_arbre]]
+                      for x in X_test])
+    proba = np.sum(votes == 1, axis=1) / modele.nb_arbre
+    np.testing.assert_array_equal(modele.predict_proba(X_test), proba)
+    np.testing.assert_array_equal(modele.predict(X_test), np.where(proba > 0.5, 1.0, 0.0))
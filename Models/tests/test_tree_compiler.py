@@ -0,0 +1,51 @@
+"""
+Modules compiles (tree_compiler.py): predictions identiques au modele, petits
+lots servis par le module, grands lots par le predict vectorise.
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+MODELS = Path(__file__).resolve().parents[1]
+for dossier in (MODELS, MODELS / "optimisation des ressources"):
+    if str(dossier) not in sys.path:
+        sys.path.insert(0, str(dossier))
+
+from GradientBoostingRegressor import GradientBoostingRegressor
+from tree_compiler import LIGNES_MAX_COMPILE, ModeleCompile, compiler
+
+
+@pytest.fixture
+def modele_compile(tmp_path):
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(400, 4))
+    y = X[:, 0] * 2 + np.sin(X[:, 1])
+    modele = GradientBoostingRegressor(profondeur_max=4, n_trees=5)
+    modele.fit(X, y)
+    return ModeleCompile(modele, compiler(modele, dossier_cache=tmp_path)), tmp_path
+
+
+def test_predictions_identiques_petits_et_grands_lots(modele_compile):
+    modele, _ = modele_compile
+    X = np.random.default_rng(1).normal(size=(2 * LIGNES_MAX_COMPILE, 4))
+    for n in (1, 10, LIGNES_MAX_COMPILE, 2 * LIGNES_MAX_COMPILE):
+        np.testing.assert_array_equal(modele.predict(X[:n]), modele.modele.predict(X[:n]))
+    np.testing.assert_array_equal(modele.predict(X[0]), modele.modele.predict(X[:1]))
+
+
+def test_grand_lot_par_le_predict_vectorise(modele_compile, monkeypatch):
+    modele, _ = modele_compile
+    appels = []
+    monkeypatch.setattr(modele.module, "predict_one", lambda x: appels.append(x) or 0.0)
+    X = np.zeros((LIGNES_MAX_COMPILE + 1, 4))
+    modele.predict(X)
+    assert appels == []
+    modele.predict(X[:3])
+    assert len(appels) == 3
+
+
+def test_pas_de_fichier_temporaire_restant(modele_compile):
+    _, dossier = modele_compile
+    assert [f.suffix for f in dossier.iterdir()] == [".py"]
@@ -0,0 +1,147 @@
+"""
+Simplification des arbres (tree_simplifier.py).
+
+L'arbre simplifie predit exactement comme l'original (lignes NaN comprises) et
+n'a jamais plus de noeuds, pour les arbres a objets Node et a dictionnaires.
+Le parcours est iteratif: un arbre de 5000 niveaux se simplifie aussi.
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+MODELS = Path(__file__).resolve().parents[1]
+for dossier in (MODELS, MODELS / "optimisation des ressources", MODELS / "prediction performance"):
+    if str(dossier) not in sys.path:
+        sys.path.insert(0, str(dossier))
+
+from DecisionTreeRegressor import Node, decisionTreeRegressor
+from Decision_Tree_Classification import DecisionTreeClassification
+from node_table import TableNoeuds, lire_classification, lire_node, lire_proba
+from tree_simplifier import _taille, simplifier, simplifier_arbre, representation_de
+
+
+def _arbre_node(rng, profondeur):
+    # arbre aleatoire a seuils entiers peu nombreux: beaucoup de branches inaccessibles et de feuilles egales
+    racine = Node()
+    pile = [(racine, 0)]
+    while pile:
+        node, p = pile.pop()
+        if p >= profondeur or rng.random() < 0.15:
+            node.prediction = float(rng.integers(0, 2))
+            continue
+        node.feature, node.threshold, node.prediction = int(rng.integers(0, 3)), float(rng.integers(0, 4)), 0.0
+        node.left, node.right = Node(), Node()
+        pile += [(node.left, p + 1), (node.right, p + 1)]
+    return racine
+
+
+def _arbre_classification(rng, profondeur):
+    racine = {}
+    pile = [(racine, 0)]
+    while pile:
+        noeud, p = pile.pop()
+        feuille = p >= profondeur or rng.random() < 0.15
+        decision = int(rng.integers(0, 2))
+        noeud.update({"feature": None if feuille else int(rng.integers(0, 3)),
+                      "seuil": None if feuille else float(rng.integers(0, 4)),
+                      "decision": decision, "proba": float(decision),
+                      "arbre enfant de gauche": None, "arbre enfant de droite": None})
+        if not feuille:
+            noeud["arbre enfant de gauche"], noeud["arbre enfant de droite"] = {}, {}
+            pile += [(noeud["arbre enfant de gauche"], p + 1), (noeud["arbre enfant de droite"], p + 1)]
+    return racine
+
+
+def _grille():
+    # toutes les combinaisons de valeurs autour des seuils, plus des NaN
+    valeurs = np.array([-1.0, 0.0, 0.5, 1.0, 1.5, 2.0, 2.5, 3.0, 4.0, np.nan])
+    return np.array(np.meshgrid(valeurs, valeurs, valeurs)).reshape(3, -1).T
+
+
+@pytest.mark.parametrize("graine", range(10))
+def test_arbre_node_memes_predictions_et_moins_de_noeuds(graine):
+    rng = np.random.default_rng(graine)
+    racine = _arbre_node(rng, 8)
+    representation = representation_de(racine)
+    avant = TableNoeuds.depuis_arbre(racine, lire_node).predict(_grille())
+    n_avant, _ = _taille(racine, representation)
+
+    statistiques = {}
+    nouvelle = simplifier_arbre(racine, representation, statistiques)
+
+    np.testing.assert_array_equal(TableNoeuds.depuis_arbre(nouvelle, lire_node).predict(_grille()), avant)
+    n_apres, _ = _taille(nouvelle, representation)
+    assert n_apres <= n_avant
+    if statistiques["branches_inaccessibles"] or statistiques["fusions"]:
+        assert n_apres < n_avant
+
+
+@pytest.mark.parametrize("graine", range(5))
+def test_arbre_classification_memes_decisions_et_probas(graine):
+    rng = np.random.default_rng(graine)
+    modele = DecisionTreeClassification()
+    modele.arbre = _arbre_classification(rng, 7)
+    grille = _grille()
+    avant = [TableNoeuds.depuis_arbre(modele.arbre, lire).predict(grille) for lire in (lire_classification, lire_proba)]
+
+    rapport = simplifier(modele)
+
+    apres = [TableNoeuds.depuis_arbre(modele.arbre, lire).predict(grille) for lire in (lire_classification, lire_proba)]
+    for a, b in zip(avant, apres):
+        np.testing.assert_array_equal(a, b)
+    assert rapport["noeuds_apres"] <= rapport["noeuds_avant"]
+
+
+def test_branche_inaccessible_et_feuilles_egales():
+    # x0 <= 1 puis x0 <= 2: le second test est toujours vrai; ses deux feuilles restantes sont egales
+    def feuille(valeur):
+        node = Node()
+        node.prediction = valeur
+        return node
+
+    def interne(feature, seuil, gauche, droite):
+        node = Node()
+        node.feature, node.threshold, node.left, node.right = feature, seuil, gauche, droite
+        return node
+
+    racine = interne(0, 2.0, interne(1, 0.0, feuille(1.0), feuille(1.0)), feuille(3.0))
+    racine = interne(0, 1.0, interne(0, 2.0, racine.left, feuille(9.0)), feuille(3.0))
+    statistiques = {}
+    nouvelle = simplifier_arbre(racine, statistiques=statistiques)
+    assert statistiques == {"branches_inaccessibles": 1, "fusions": 1}
+    assert (nouvelle.feature, nouvelle.threshold) == (0, 1.0)
+    assert (nouvelle.left.left, nouvelle.left.prediction) == (None, 1.0)
+
+
+def test_modele_entraine_inchange_en_prediction():
+    rng = np.random.default_rng(0)
+    X = rng.integers(0, 4, size=(200, 3)).astype(float)
+    y = X[:, 0] + 2 * (X[:, 1] > 1) + rng.normal(scale=0.1, size=200)
+    modele = decisionTreeRegressor()
+    modele.fit(X, y)
+    avant = modele.predict(_grille())
+    rapport = simplifier(modele)
+    np.testing.assert_array_equal(modele.predict(_grille()), avant)
+    assert rapport["noeuds_apres"] <= rapport["noeuds_avant"]
+
+
+def test_arbre_profond_sans_recursion():
+    # peigne de 5000 niveaux: le noeud k teste x0 <= -k; apres le premier enfant droit (x0 > 0),
+    # tous les tests suivants sont faux et le peigne se reduit a la racine et ses deux feuilles
+    profondeur = 5000
+    racine = node = Node()
+    for k in range(profondeur):
+        node.feature, node.threshold = 0, float(-k)
+        node.left, node.right = Node(), Node()
+        node.left.prediction = float(k)
+        node = node.right
+    node.prediction = float(profondeur)
+    modele = decisionTreeRegressor()
+    modele.root = racine
+    X = np.array([[0.5], [-3.5], [-10_000.0], [np.nan]])
+    avant = modele.predict(X)
+    rapport = simplifier(modele)
+    np.testing.assert_array_equal(modele.predict(X), avant)
+    assert (rapport["noeuds_avant"], rapport["noeuds_apres"]) == (2 * profondeur + 1, 3)
@@ -0,0 +1,87 @@
+import numpy as np
+
+# Coeur commun de construction des arbres, sans copie des donnees a chaque niveau.
+# La matrice X est gardee une seule fois (contigue) et un unique tampon d'indices
+# est partitionne en place, comme le tableau `samples` des implementations CART
+# classiques: un noeud correspond a la tranche indices[debut:fin] et ses deux
+# enfants aux tranches [debut:milieu] et [milieu:fin]. Les recursions ne recoivent
+# plus X[gauche_idx] / y[gauche_idx] mais seulement (debut, fin).
+
+
+class ConstructeurIndexe:
+    """
+    Fait croitre un arbre sur une matrice X partagee et un tampon d'indices partitionne en place
+
+    La forme des noeuds (objets Node, dictionnaires...) et les criteres de split restent
+    propres a chaque modele: ils sont fournis par les fonctions creer_noeud et attacher.
+    """
+
+    def __init__(self, X):
+        self.X = np.ascontiguousarray(X)
+        self.indices = np.arange(self.X.shape[0])
+        self.feuilles = []  # (noeud, debut, fin) de chaque feuille, dans l'ordre de construction
+
+    def partitionner(self, debut, fin, feature, seuil):
+        """
+        Reordonne indices[debut:fin] en place: X[:, feature] <= seuil a gauche, le reste a droite
+
+        La partition est stable: dans chaque enfant les indices restent croissants, donc
+        y[echantillons] est dans le meme ordre que l'ancien y[gauche_idx].
+
+        Returns:
+            milieu: debut de la tranche de l'enfant droit
+        """
+        segment = self.indices[debut:fin]
+        gauche = self.X[segment, feature] <= seuil
+        n_gauche = int(np.count_nonzero(gauche))
+        segment[:] = np.concatenate((segment[gauche], segment[~gauche]))
+        return debut + n_gauche
+
+    def construire(self, creer_noeud, attacher, debut=0, fin=None, profondeur=0):
+        """
+        Construit recursivement le sous-arbre de la tranche indices[debut:fin]
+
+        Args:
+            creer_noeud: fonction (echantillons, profondeur) -> (noeud, split), ou split vaut
+                None pour une feuille, sinon (feature, seuil). `echantillons` est une vue sur
+                le tampon: elle ne doit pas etre conservee apres l'appel.
+            attacher: fonction (noeud, gauche, droite) -> noeud interne complet
+            debut, fin: tranche du tampon d'indices (tout le tampon par defaut)
+            profondeur: profondeur du noeud
+
+        Returns:
+            le noeud racine du sous-arbre
+        """
+        if fin is None:
+            fin = len(self.indices)
+        noeud, split = creer_noeud(self.indices[debut:fin], profondeur)
+        if split is None:
+            self.feuilles.append((noeud, debut, fin))
+            return noeud
+        milieu = self.partitionner(debut, fin, split[0], split[1])
+        gauche = self.construire(creer_noeud, attacher, debut, milieu, profondeur + 1)
+        droite = self.construire(creer_noeud, attacher, milieu, fin, profondeur + 1)
+        return attacher(noeud, gauche, droite)
+
+    def affectation_feuilles(self):
+        """
+        Feuille atteinte par chaque ligne d'entrainement, connue sans re-parcourir l'arbre
+
+        A la fin de la construction, la tranche indices[debut:fin] d'une feuille contient
+        exactement les lignes qui y arrivent: il suffit d'une affectation par feuille.
+
+        Returns:
+            numero_feuille: tableau (n_samples,) du numero de feuille de chaque ligne
+            feuilles: liste des noeuds feuilles, indexee par numero_feuille
+        """
+        numero_feuille = np.empty(len(self.indices), dtype=np.intp)
+        for k, (_, debut, fin) in enumerate(self.feuilles):
+            numero_feuille[self.indices[debut:fin]] = k
+        return numero_feuille, [noeud for noeud, _, _ in self.feuilles]
+
+
+def attacher_node(node, gauche, droite):
+    # fonction attacher des arbres a objets Node (attributs left / right)
+    node.left = gauche
+    node.right = droite
+    return node
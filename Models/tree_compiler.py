@@ -0,0 +1,218 @@
+import hashlib
+import importlib.util
+import json
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+
+_MODELS_DIR = str(Path(__file__).resolve().parent)
+if _MODELS_DIR not in sys.path:
+    sys.path.insert(0, _MODELS_DIR)
+from node_table import tables_en_cache
+from description_arbres import decrire, donnees_verification
+
+# Compilation ahead-of-time des arbres en modules Python.
+# Un arbre seul ou un boosting deja entraine (decisionTreeRegressor,
+# GradientBoostingRegressor, DecisionTreeClassification..., voir
+# description_arbres.decrire) est traduit en une fonction
+# predict_one(x) faite uniquement de if/else imbriques sur des constantes:
+# plus de parcours de noeuds, d'attributs ni de tableaux a l'execution, ce qui
+# ramene le score d'une ligne a quelques microsecondes. Le module genere est
+# ecrit dans un cache disque dont la cle est le hash du JSON de l'artefact, et
+# simplement importe aux demarrages suivants. ModeleCompile sert le module a la
+# place du modele pour les petits lots (voir App/ml_utils/predictor.py, qui
+# compile au chargement): le module appelle predict_one ligne par ligne, les
+# grands lots restent plus rapides avec le parcours vectorise des tables.
+
+DOSSIER_CACHE = Path(__file__).resolve().parents[1] / "Artifacts" / "compiles"
+PROFONDEUR_MAX_COMPILABLE = 90  # limite d'indentation du tokenizer Python (100 niveaux)
+VERSION_COMPILATEUR = 1  # a incrementer si le code genere change: invalide le cache
+# au-dela, ModeleCompile.predict passe par le predict vectorise du modele: le module compile est
+# plus rapide jusqu'a ~256 lignes (arbre des salles) et ~1000 (foret des enseignants), puis jusqu'a
+# 2-12x plus lent sur 5000 lignes (Training&Saving/benchmark_compilation.py)
+LIGNES_MAX_COMPILE = 256
+
+
+def _decrire_modele(modele):
+    """
+    Ramene un modele a (tables, init, learning_rate)
+
+    Returns:
+        tables: TableNoeuds des arbres a additionner
+        init: valeur de depart (0 pour un arbre seul)
+        learning_rate: facteur applique a chaque feuille (None pour un arbre seul)
+    """
+    arbres, lire, mode, init, learning_rate = decrire(modele)
+    if mode not in ("arbre", "somme"):
+        raise TypeError(f"Modèle non compilable: {type(modele).__name__} "
+                        "(un arbre seul ou un boosting attendu, pas une forêt à moyenne ou à vote)")
+    return tables_en_cache(modele, arbres, lire), init, learning_rate
+
+
+def cle_artifact(chemin_artifact):
+    """Hash sha256 du contenu de l'artefact (cle du cache)"""
+    return hashlib.sha256(Path(chemin_artifact).read_bytes()).hexdigest()
+
+
+def cle_modele(modele):
+    """Hash sha256 des arbres d'un modele en memoire (quand il n'y a pas d'artefact sur disque)"""
+    tables, init, learning_rate = _decrire_modele(modele)
+    contenu = {
+        "classe": type(modele).__name__,
+        "init": init,
+        "learning_rate": learning_rate,
+        "arbres": [[t.feature.tolist(), t.threshold.tolist(), t.left.tolist(), t.right.tolist(),
+                    t.value.tolist()] for t in tables],
+    }
+    return hashlib.sha256(json.dumps(contenu).encode("utf-8")).hexdigest()
+
+
+def generer_code(modele, cle=""):
+    """
+    Genere le source du module compile
+
+    Chaque arbre devient un bloc de if/else imbriques. Pour le boosting, les feuilles
+    contiennent directement learning_rate * valeur (meme produit flottant que predict),
+    ajoute a F dans l'ordre des arbres: le resultat est identique a predict.
+    """
+    tables, init, learning_rate = _decrire_modele(modele)
+    for table in tables:
+        if table.profondeur > PROFONDEUR_MAX_COMPILABLE:
+            raise ValueError(f"Arbre trop profond pour être compilé ({table.profondeur} niveaux, "
+                             f"maximum {PROFONDEUR_MAX_COMPILABLE}).")
+
+    lignes = [
+        f'"""Module genere par tree_compiler a partir de {type(modele).__name__} - ne pas modifier."""',
+        "",
+        f"CLE = {cle!r}",
+        f"VERSION_COMPILATEUR = {VERSION_COMPILATEUR}",
+        f"CLASSE = {type(modele).__name__!r}",
+        "",
+        "",
+        "def predict_one(x):",
+    ]
+
+    def emettre(table, numero, indentation, feuille):
+        # parcours recursif de la table (profondeur bornee par PROFONDEUR_MAX_COMPILABLE)
+        marge = "    " * indentation
+        if table.left[numero] < 0:
+            lignes.append(marge + feuille(table.value[numero]))
+            return
+        lignes.append(f"{marge}if x[{int(table.feature[numero])}] <= {float(table.threshold[numero])!r}:")
+        emettre(table, int(table.left[numero]), indentation + 1, feuille)
+        lignes.append(f"{marge}else:")
+        emettre(table, int(table.right[numero]), indentation + 1, feuille)
+
+    if learning_rate is None:
+        emettre(tables[0], 0, 1, lambda valeur: f"return {float(valeur)!r}")
+    else:
+        lignes.append(f"    F = {init!r}")
+        for table in tables:
+            emettre(table, 0, 1, lambda valeur: f"F += {float(learning_rate * valeur)!r}")
+        lignes.append("    return F")
+
+    lignes += [
+        "",
+        "",
+        "def predict(X):",
+        "    return [predict_one(x) for x in X]",
+        "",
+    ]
+    return "\n".join(lignes)
+
+
+def _importer(chemin, cle):
+    spec = importlib.util.spec_from_file_location(f"arbre_compile_{cle[:16]}", chemin)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def verifier_equivalence(modele, module, X=None):
+    """Compare le module compile au predict de reference; leve ValueError au premier ecart"""
+    if X is None:
+        # valeurs juste autour des seuils comprises: le module doit reproduire predict exactement
+        X = donnees_verification(_decrire_modele(modele)[0], n_lignes=512, voisins_exacts=True)
+    X = np.asarray(X, dtype=float)
+    reference = np.asarray(modele.predict(X), dtype=float)
+    compile_ = np.array([module.predict_one(x) for x in X], dtype=float)
+    ecarts = np.nonzero(reference != compile_)[0]
+    if ecarts.size:
+        i = int(ecarts[0])
+        raise ValueError(f"Le module compilé diffère du modèle sur {ecarts.size} ligne(s) "
+                         f"(ligne {i}: {float(compile_[i])!r} au lieu de {float(reference[i])!r}).")
+
+
+def compiler(modele, chemin_artifact=None, dossier_cache=None, verifier=True, X_verification=None):
+    """
+    Retourne le module compile du modele, depuis le cache disque s'il existe
+
+    Args:
+        modele: arbre seul ou boosting charge (decisionTreeRegressor, GradientBoostingRegressor,
+            XGBoostRegressor, DecisionTreeClassification, ArbreRegression, ENSPD_GradientBoosting_Pure)
+        chemin_artifact: artefact (JSON ou .npz) dont le modele a ete charge; son hash sert de cle de cache
+            (sinon la cle est le hash des arbres du modele)
+        dossier_cache: dossier des modules generes (Artifacts/compiles par defaut)
+        verifier: comparer le module au predict de reference avant de l'utiliser
+        X_verification: lignes de verification (par defaut: generees autour des seuils)
+
+    Returns:
+        module avec predict_one(x) -> float et predict(X) -> liste
+    """
+    cle = cle_artifact(chemin_artifact) if chemin_artifact is not None else cle_modele(modele)
+    dossier = Path(dossier_cache) if dossier_cache is not None else DOSSIER_CACHE
+    chemin = dossier / f"{type(modele).__name__}_{cle[:16]}.py"
+
+    module = None
+    if chemin.exists():
+        module = _importer(chemin, cle)
+        if getattr(module, "CLE", None) != cle or getattr(module, "VERSION_COMPILATEUR", None) != VERSION_COMPILATEUR:
+            module = None  # collision de prefixe ou ancien compilateur: on regenere
+    if module is None:
+        dossier.mkdir(parents=True, exist_ok=True)
+        # nom propre au processus: deux workers qui compilent le meme artefact n'ecrivent pas le meme fichier
+        temporaire = chemin.with_name(f"{chemin.name}.{os.getpid()}.tmp")
+        temporaire.write_text(generer_code(modele, cle), encoding="utf-8")
+        temporaire.replace(chemin)  # ecriture atomique: un autre processus ne lit jamais un module partiel
+        module = _importer(chemin, cle)
+
+    if verifier:
+        try:
+            verifier_equivalence(modele, module, X_verification)
+        except ValueError:
+            chemin.unlink(missing_ok=True)  # ne pas reutiliser un module faux au prochain demarrage
+            raise
+    return module
+
+
+class ModeleCompile:
+    """
+    Modele dont predict execute le module compile
+
+    Les lots de plus de lignes_max lignes (scores de toutes les salles ou de tous
+    les enseignants) sont predits par le predict vectorise du modele d'origine,
+    identique au module compile (verifie par compiler) mais plus rapide sur de
+    grands lots. Les autres attributs (forest, root, init...) sont ceux du modele
+    d'origine, et classe garde son nom de classe (comme ModeleCompact).
+    """
+
+    def __init__(self, modele, module, lignes_max=LIGNES_MAX_COMPILE):
+        self.modele = modele
+        self.module = module
+        self.lignes_max = lignes_max
+        self.classe = type(modele).__name__
+
+    def __getattr__(self, nom):
+        # appele seulement pour les attributs absents de ModeleCompile
+        return getattr(self.__dict__["modele"], nom)
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=float)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if len(X) > self.lignes_max:
+            return np.asarray(self.modele.predict(X), dtype=float)
+        predict_one = self.module.predict_one
+        return np.fromiter((predict_one(x) for x in X.tolist()), dtype=float, count=len(X))
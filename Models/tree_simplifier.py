@@ -0,0 +1,194 @@
+import copy
+import sys
+from pathlib import Path
+
+import numpy as np
+
+_MODELS_DIR = str(Path(__file__).resolve().parent)
+if _MODELS_DIR not in sys.path:
+    sys.path.insert(0, _MODELS_DIR)
+from node_table import TableNoeuds, representation_de
+from description_arbres import donnees_verification
+
+# Simplification des arbres apres entrainement (simplify), sans re-entrainer.
+# Deux reecritures qui ne changent aucune prediction:
+#  - branche inaccessible: les seuils des ancetres bornent chaque feature sur le
+#    chemin (x <= haute apres un enfant gauche, x > basse apres un enfant droit);
+#    un noeud dont le test est toujours vrai (seuil >= haute) ou toujours faux
+#    (seuil <= basse) est remplace par le seul enfant atteignable;
+#  - sous-arbre uniforme: un noeud dont les deux enfants sont des feuilles
+#    identiques (meme valeur pour toutes les lectures: decision et probabilite pour
+#    la classification) est remplace par l'une d'elles. Applique de bas en haut,
+#    cela fusionne tout sous-arbre dont les feuilles predisent la meme chose.
+# Une ligne NaN part toujours a droite (x <= seuil est faux): elle ne peut pas
+# passer par un enfant gauche, et les reecritures restent exactes pour elle.
+
+
+def _racines(modele):
+    """Liste des (lire_racine, ecrire_racine) des arbres du modele"""
+    for attribut in ("forest", "arbres"):
+        arbres = getattr(modele, attribut, None)
+        if isinstance(arbres, list):
+            return [(lambda i=i: arbres[i], lambda r, i=i: arbres.__setitem__(i, r)) for i in range(len(arbres))]
+    for attribut in ("root", "racine", "arbre"):
+        if getattr(modele, attribut, None) is not None:
+            return [(lambda a=attribut: getattr(modele, a), lambda r, a=attribut: setattr(modele, a, r))]
+    raise TypeError(f"Modèle à arbres non reconnu ou non entraîné: {type(modele).__name__}")
+
+
+def _taille(racine, representation):
+    # (nombre de noeuds, profondeur), parcours iteratif
+    n, profondeur_max = 0, 0
+    pile = [(racine, 0)]
+    while pile:
+        noeud, profondeur = pile.pop()
+        n += 1
+        profondeur_max = max(profondeur_max, profondeur)
+        _, _, gauche, droite, _ = representation.lire(noeud)
+        if gauche is not None or droite is not None:
+            pile.append((gauche, profondeur + 1))
+            pile.append((droite, profondeur + 1))
+    return n, profondeur_max
+
+
+# operations de la pile de simplifier_arbre
+_ENTRER, _BORNE, _SORTIR = 0, 1, 2
+_ABSENTE = object()  # feature sans borne sur le chemin
+
+
+def simplifier_arbre(racine, representation=None, statistiques=None):
+    """
+    Simplifie un arbre en place et retourne sa nouvelle racine
+
+    Parcours iteratif (pile explicite, comme codec_arbres): la profondeur de l'arbre
+    n'est pas limitee par la pile d'appels de Python.
+
+    Args:
+        racine: noeud racine (objet Node ou dictionnaire)
+        representation: acces aux noeuds (deduit de la racine par defaut)
+        statistiques: dictionnaire dont les compteurs 'branches_inaccessibles' et
+            'fusions' sont incrementes
+    """
+    representation = representation or representation_de(racine)
+    statistiques = statistiques if statistiques is not None else {}
+    statistiques.setdefault("branches_inaccessibles", 0)
+    statistiques.setdefault("fusions", 0)
+
+    # basse / haute: bornes (basse exclue, haute incluse) de chaque feature sur le chemin courant,
+    # posees a la descente et restaurees a la remontee (pas de copie des dictionnaires par noeud)
+    basse, haute = {}, {}
+    resultat = [None]
+    # (_ENTRER, noeud, place, cote): simplifier le sous-arbre et ranger sa racine dans place[cote]
+    # (_BORNE, bornes, f, valeur): bornes[f] = valeur (_ABSENTE: retirer la borne)
+    # (_SORTIR, cadre): enfants simplifies, fusion eventuelle du noeud
+    pile = [(_ENTRER, racine, resultat, 0)]
+    while pile:
+        operation = pile.pop()
+        if operation[0] == _BORNE:
+            _, bornes, f, valeur = operation
+            if valeur is _ABSENTE:
+                bornes.pop(f, None)
+            else:
+                bornes[f] = valeur
+        elif operation[0] == _ENTRER:
+            _, noeud, place, cote = operation
+            while True:
+                f, seuil, gauche, droite, _ = representation.lire(noeud)
+                if gauche is None and droite is None:
+                    break
+                if seuil >= haute.get(f, np.inf):
+                    statistiques["branches_inaccessibles"] += 1
+                    noeud = gauche  # x <= haute <= seuil: toujours a gauche
+                elif seuil <= basse.get(f, -np.inf):
+                    statistiques["branches_inaccessibles"] += 1
+                    noeud = droite  # x > basse >= seuil: toujours a droite
+                else:
+                    break
+            if gauche is None and droite is None:
+                place[cote] = noeud
+                continue
+            cadre = [noeud, None, None, place, cote]  # enfants simplifies ranges en cadre[1] / cadre[2]
+            # depile dans l'ordre inverse: gauche (haute[f] = seuil), puis droite (basse[f] = seuil), puis sortie
+            pile.append((_SORTIR, cadre))
+            pile.append((_BORNE, basse, f, basse.get(f, _ABSENTE)))
+            pile.append((_ENTRER, droite, cadre, 2))
+            pile.append((_BORNE, basse, f, seuil))
+            pile.append((_BORNE, haute, f, haute.get(f, _ABSENTE)))
+            pile.append((_ENTRER, gauche, cadre, 1))
+            haute[f] = seuil
+        else:
+            noeud, gauche, droite, place, cote = operation[1]
+            feuille_gauche = representation.lire(gauche)[2:4] == (None, None)
+            feuille_droite = representation.lire(droite)[2:4] == (None, None)
+            if feuille_gauche and feuille_droite and representation.cle_feuille(gauche) == representation.cle_feuille(droite):
+                statistiques["fusions"] += 1
+                place[cote] = gauche  # les deux feuilles predisent la meme chose: le test est inutile
+            else:
+                representation.ecrire(noeud, gauche, droite)
+                place[cote] = noeud
+    return resultat[0]
+
+
+def _copier_arbre(racine, representation):
+    # copie des noeuds (iterative, sans copy.deepcopy): les valeurs des feuilles ne sont jamais modifiees
+    copie = copy.copy(racine)
+    pile = [copie]
+    while pile:
+        noeud = pile.pop()
+        _, _, gauche, droite, _ = representation.lire(noeud)
+        if gauche is None and droite is None:
+            continue
+        gauche, droite = copy.copy(gauche), copy.copy(droite)
+        representation.ecrire(noeud, gauche, droite)
+        pile.append(gauche)
+        pile.append(droite)
+    return copie
+
+
+def simplifier(modele, verifier=True):
+    """
+    Simplifie en place les arbres d'un modele charge (simplify) et retourne un rapport
+
+    Fonctionne avec les modeles a objets Node (decisionTreeRegressor,
+    GradientBoostingRegressor, XGBoostRegressor, RandomForestRegressor) et a
+    dictionnaires (DecisionTreeClassification, RandomForestClassification,
+    ArbreRegression, ENSPD_GradientBoosting_Pure). Les predictions sont inchangees;
+    save() ecrit ensuite les arbres simplifies.
+
+    Args:
+        modele: modele entraine ou charge
+        verifier: comparer chaque arbre simplifie a l'original (toutes les lectures
+            des feuilles) avant de le remplacer; leve ValueError en cas d'ecart
+
+    Returns:
+        dict: noeuds_avant, noeuds_apres, noeuds_supprimes, profondeur_avant,
+        profondeur_apres, profondeur_supprimee, branches_inaccessibles, fusions
+    """
+    rapport = {"noeuds_avant": 0, "noeuds_apres": 0, "profondeur_avant": 0, "profondeur_apres": 0,
+               "branches_inaccessibles": 0, "fusions": 0}
+    for lire_racine, ecrire_racine in _racines(modele):
+        racine = lire_racine()
+        representation = representation_de(racine)
+        n, profondeur = _taille(racine, representation)
+        rapport["noeuds_avant"] += n
+        rapport["profondeur_avant"] = max(rapport["profondeur_avant"], profondeur)
+
+        # on travaille sur une copie: l'arbre du modele n'est remplace qu'une fois verifie
+        nouvelle = simplifier_arbre(_copier_arbre(racine, representation), representation, rapport)
+        if verifier:
+            for lire in representation.lectures:
+                avant = TableNoeuds.depuis_arbre(racine, lire)
+                apres = TableNoeuds.depuis_arbre(nouvelle, lire)
+                X = donnees_verification([avant], voisins_exacts=True)
+                if not np.array_equal(avant.predict(X), apres.predict(X), equal_nan=True):
+                    raise ValueError(f"La simplification a changé les prédictions d'un arbre de {type(modele).__name__}.")
+        # nouvelle racine: les caches de node_table, compares par identite aux racines, seront recalcules
+        ecrire_racine(nouvelle)
+
+        n, profondeur = _taille(nouvelle, representation)
+        rapport["noeuds_apres"] += n
+        rapport["profondeur_apres"] = max(rapport["profondeur_apres"], profondeur)
+
+    rapport["noeuds_supprimes"] = rapport["noeuds_avant"] - rapport["noeuds_apres"]
+    rapport["profondeur_supprimee"] = rapport["profondeur_avant"] - rapport["profondeur_apres"]
+    return rapport
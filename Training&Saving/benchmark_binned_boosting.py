@@ -0,0 +1,90 @@
+"""
+Benchmark du mode histogramme (binned=True) des modeles de boosting.
+
+Entraine GradientBoostingRegressor et XGBoostRegressor sur les features du
+modele enseignants (jointure teachers x resources x courses, comme dans
+App/ml_utils/data_prep.prepare_teachers), en mode exact puis en mode
+histogramme, et affiche le temps d'entrainement, le pic memoire (tracemalloc)
+et le R2 sur un jeu de test. Avec --subsample / --colsample-bytree, ajoute une
+ligne GradientBoostingRegressor echantillonne (temps moyen par arbre).
+
+Usage:
+    python "Training&Saving/benchmark_binned_boosting.py" --n-trees 10
+    python "Training&Saving/benchmark_binned_boosting.py" --subsample 0.5 --colsample-bytree 0.8
+"""
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "Models" / "optimisation des ressources"))
+sys.path.insert(0, str(ROOT / "App"))
+
+from GradientBoostingRegressor import GradientBoostingRegressor
+from XGBoostRegressor import XGBoostRegressor
+from ml_utils.data_prep import prepare_teachers
+
+FEATURES = ["Anciennete", "Score_appreciation", "score_niveau", "score_heure", "score_pse"]
+
+
+def charger_donnees():
+    data_dir = ROOT / "Datasets"
+    teachers = pd.read_csv(data_dir / "teachers.csv")
+    resources = pd.read_csv(data_dir / "resources.csv")
+    courses = pd.read_csv(data_dir / "courses.csv")
+    df = prepare_teachers(teachers, resources, courses)
+    return df[FEATURES].to_numpy(dtype=float), df["Score"].to_numpy(dtype=float)
+
+
+def mesurer(model, X_train, y_train, X_test, y_test):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    model.fit(X_train, y_train)
+    duree = time.perf_counter() - t0
+    _, pic = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return duree, pic / 1e6, model.score(X_test, y_test)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n-trees", type=int, default=10)
+    parser.add_argument("--max-bins", type=int, default=255)
+    parser.add_argument("--subsample", type=float, default=1.0)
+    parser.add_argument("--colsample-bytree", type=float, default=1.0)
+    args = parser.parse_args()
+
+    X, y = charger_donnees()
+    rng = np.random.default_rng(0)
+    indices = rng.permutation(len(X))
+    split = int(0.8 * len(X))
+    X_train, X_test = X[indices[:split]], X[indices[split:]]
+    y_train, y_test = y[indices[:split]], y[indices[split:]]
+    print(f"Donnees: {len(X_train)} lignes d'entrainement, {len(X_test)} de test, {X.shape[1]} features")
+
+    for nom, classe in [("GradientBoostingRegressor", GradientBoostingRegressor), ("XGBoostRegressor", XGBoostRegressor)]:
+        exact = mesurer(classe(n_trees=args.n_trees), X_train, y_train, X_test, y_test)
+        binned = mesurer(classe(n_trees=args.n_trees, binned=True, max_bins=args.max_bins),
+                         X_train, y_train, X_test, y_test)
+        print(f"\n{nom}")
+        print(f"  exact  : {exact[0]:7.3f} s  pic {exact[1]:7.2f} Mo  R2 test {exact[2]:.5f}")
+        print(f"  binned : {binned[0]:7.3f} s  pic {binned[1]:7.2f} Mo  R2 test {binned[2]:.5f}")
+        print(f"  acceleration x{exact[0] / binned[0]:.1f}, ecart R2 {binned[2] - exact[2]:+.5f}")
+
+    if args.subsample < 1.0 or args.colsample_bytree < 1.0:
+        complet = GradientBoostingRegressor(n_trees=args.n_trees)
+        echantillonne = GradientBoostingRegressor(n_trees=args.n_trees, subsample=args.subsample,
+                                                  colsample_bytree=args.colsample_bytree, random_state=0)
+        print(f"\nGradientBoostingRegressor subsample={args.subsample} colsample_bytree={args.colsample_bytree}")
+        for nom, model in [("complet", complet), ("echantillonne", echantillonne)]:
+            duree, pic, r2 = mesurer(model, X_train, y_train, X_test, y_test)
+            print(f"  {nom:13s}: {np.mean(model.temps_par_arbre):7.3f} s/arbre  pic {pic:7.2f} Mo  R2 test {r2:.5f}")
+
+
+if __name__ == "__main__":
+    main()
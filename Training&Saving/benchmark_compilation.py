@@ -0,0 +1,72 @@
+"""
+Benchmark des modules compiles (Models/tree_compiler.py) face au predict vectorise.
+
+Charge les modeles servis par l'application (arbre des salles, foret des
+enseignants), les compile, puis mesure pour chaque taille de lot le temps du
+module compile (predict_one ligne par ligne) et celui du predict vectorise du
+modele (tables de noeuds). Le croisement des deux courbes fixe
+tree_compiler.LIGNES_MAX_COMPILE: au-dela, ModeleCompile.predict passe par le
+predict vectorise.
+
+Usage:
+    python "Training&Saving/benchmark_compilation.py"
+    python "Training&Saving/benchmark_compilation.py" --tailles 1 16 256 5000
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "Models"))
+sys.path.insert(0, str(ROOT / "App"))
+
+from tree_compiler import LIGNES_MAX_COMPILE, compiler
+from ml_utils.data_prep import ROOM_FEATURES, TEACHER_FEATURES
+from ml_utils.predictor import load_room_model, load_teacher_model
+
+MODELES = [
+    ("salles", load_room_model, "decision_tree_class_model.json", len(ROOM_FEATURES)),
+    ("enseignants", load_teacher_model, "gradient_boosting_regressor_model_teachers.json", len(TEACHER_FEATURES)),
+]
+
+
+def chronometrer(fonction, X, duree_min=0.2):
+    # temps moyen d'un appel, repete pendant au moins duree_min secondes
+    fonction(X)
+    n, t0 = 0, time.perf_counter()
+    while True:
+        fonction(X)
+        n += 1
+        ecoule = time.perf_counter() - t0
+        if ecoule >= duree_min:
+            return ecoule / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modeles", default=str(ROOT / "Artifacts" / "meilleurs models"))
+    parser.add_argument("--tailles", type=int, nargs="+", default=[1, 4, 16, 64, 128, 256, 512, 1024, 5000])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"LIGNES_MAX_COMPILE = {LIGNES_MAX_COMPILE}")
+    for nom, charger, fichier, n_features in MODELES:
+        modele = charger(str(Path(args.modeles) / fichier))
+        with tempfile.TemporaryDirectory() as dossier:
+            module = compiler(modele, dossier_cache=dossier)
+        predict_compile = lambda X: [module.predict_one(x) for x in X.tolist()]
+        X = rng.uniform(0, 5, size=(max(args.tailles), n_features))
+        print(f"\n{nom} ({type(modele).__name__})")
+        print("  lignes   compile (ms)   vectorise (ms)   compile / vectorise")
+        for n in args.tailles:
+            t_compile = chronometrer(predict_compile, X[:n])
+            t_vectorise = chronometrer(modele.predict, X[:n])
+            print(f"  {n:6d}   {t_compile * 1e3:12.3f}   {t_vectorise * 1e3:14.3f}   {t_compile / t_vectorise:8.2f}")
+
+
+if __name__ == "__main__":
+    main()
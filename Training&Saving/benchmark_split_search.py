@@ -0,0 +1,121 @@
+"""
+Benchmark de la recherche de split de decisionTreeRegressor.
+
+Compare l'ancienne recherche exhaustive (deux masques + np.var par valeur unique)
+a la recherche vectorisee par sommes cumulees, sur les donnees de salles
+(Datasets/resources.csv), et verifie que les deux arbres sont identiques.
+
+Usage:
+    python "Training&Saving/benchmark_split_search.py" --n 2000
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "Models" / "optimisation des ressources"))
+sys.path.insert(0, str(ROOT / "App"))
+
+from DecisionTreeRegressor import Node, decisionTreeRegressor
+from ml_utils.data_prep import prepare_resources
+
+FEATURES = ["Nb_personnes", "Capacite", "End_Type_ressource", "End_Type_cours",
+            "End_Videoprojecteur", "End_besoin_projecteur"]
+
+
+def build_tree_reference(X, y, seuil_min_gain=0.0001, profondeur_max=20, profondeur=0):
+    # ancienne implementation, conservee ici comme reference
+    node = Node()
+    node.prediction = np.mean(y)
+    variance_parent = np.var(y)
+    meilleur_gain = 0
+    meilleur_feature = None
+    meilleur_seuil = None
+    if profondeur >= profondeur_max or len(y) <= 1 or variance_parent == 0:
+        return node
+    for j in range(X.shape[1]):
+        for seuil in np.unique(X[:, j]):
+            gauche_idx = X[:, j] <= seuil
+            droite_idx = X[:, j] > seuil
+            if np.sum(gauche_idx) == 0 or np.sum(droite_idx) == 0:
+                continue
+            y_gauche = y[gauche_idx]
+            y_droite = y[droite_idx]
+            erreur_apres = (len(y_gauche) / len(y)) * np.var(y_gauche) + (len(y_droite) / len(y)) * np.var(y_droite)
+            gain = variance_parent - erreur_apres
+            if gain > meilleur_gain:
+                meilleur_gain = gain
+                meilleur_feature = j
+                meilleur_seuil = seuil
+    node.feature = meilleur_feature
+    node.threshold = meilleur_seuil
+    if meilleur_gain < seuil_min_gain or meilleur_feature is None:
+        return node
+    gauche_idx = X[:, node.feature] <= node.threshold
+    droite_idx = X[:, node.feature] > node.threshold
+    node.left = build_tree_reference(X[gauche_idx], y[gauche_idx], seuil_min_gain, profondeur_max, profondeur + 1)
+    node.right = build_tree_reference(X[droite_idx], y[droite_idx], seuil_min_gain, profondeur_max, profondeur + 1)
+    return node
+
+
+def arbres_identiques(a, b):
+    # comparaison iterative noeud par noeud (feature, seuil, prediction)
+    pile = [(a, b)]
+    n_noeuds = 0
+    while pile:
+        u, v = pile.pop()
+        if u is None or v is None:
+            if u is not v:
+                return False, n_noeuds
+            continue
+        n_noeuds += 1
+        if u.feature != v.feature or u.threshold != v.threshold or u.prediction != v.prediction:
+            return False, n_noeuds
+        pile.append((u.left, v.left))
+        pile.append((u.right, v.right))
+    return True, n_noeuds
+
+
+def charger_donnees(n):
+    df = pd.read_csv(ROOT / "Datasets" / "resources.csv")
+    if n:
+        df = df.sample(n=min(n, len(df)), random_state=0).reset_index(drop=True)
+    df = prepare_resources(df)
+    return df[FEATURES].to_numpy(dtype=float), df["Score"].to_numpy(dtype=float)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=2000, help="nombre de lignes (0 = tout le fichier)")
+    parser.add_argument("--sans-reference", action="store_true", help="ne pas executer l'ancienne implementation")
+    args = parser.parse_args()
+
+    X, y = charger_donnees(args.n)
+    print(f"Donnees: {X.shape[0]} lignes, {X.shape[1]} features")
+
+    model = decisionTreeRegressor()
+    t0 = time.perf_counter()
+    model.fit(X, y)
+    t_nouveau = time.perf_counter() - t0
+    print(f"Recherche vectorisee : {t_nouveau:.3f} s")
+
+    if args.sans_reference:
+        return
+    t0 = time.perf_counter()
+    reference = build_tree_reference(X, y)
+    t_reference = time.perf_counter() - t0
+    print(f"Recherche exhaustive : {t_reference:.3f} s")
+    print(f"Acceleration         : x{t_reference / t_nouveau:.1f}")
+
+    identiques, n_noeuds = arbres_identiques(reference, model.root)
+    print(f"Arbres identiques    : {identiques} ({n_noeuds} noeuds compares)")
+    if not identiques:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Reprise (warm start) d'un modele de boosting deja sauvegarde.
+
+Charge le JSON d'un GradientBoostingRegressor ou d'un XGBoostRegressor, calcule
+la prediction courante de la foret sur les donnees enseignants (jointure
+teachers x resources x courses, comme App/ml_utils/data_prep.prepare_teachers),
+ajoute --n-trees arbres entraines sur les residus (continuer) puis sauvegarde
+l'ensemble etendu dans un nouveau fichier: <modele>_<n>arbres.json a cote du
+modele, sauf --sortie. Remplace le re-entrainement complet quand seules de
+nouvelles lignes sont arrivees.
+
+Si le manifeste des artefacts (Artifacts/manifest.json) sert le modele etendu,
+son entree est deplacee sur le nouveau fichier et le manifeste est rafraichi
+(hash, format), apres verification de la classe et des features du modele.
+
+Usage:
+    python "Training&Saving/continuer_boosting.py" \
+        --modele "Artifacts/meilleurs models/gradient_boosting_regressor_model_teachers.json" --n-trees 5
+    python "Training&Saving/continuer_boosting.py" --classe xgb --modele xgb.json --sortie xgb_v2.json
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "Models" / "optimisation des ressources"))
+sys.path.insert(0, str(ROOT / "App"))
+
+from GradientBoostingRegressor import GradientBoostingRegressor
+from XGBoostRegressor import XGBoostRegressor
+from ml_utils.data_prep import TEACHER_FEATURES, prepare_teachers
+from ml_utils.manifest import Manifest, refresh
+
+CLASSES = {"gb": GradientBoostingRegressor, "xgb": XGBoostRegressor}
+
+
+def charger_donnees(data_dir):
+    teachers = pd.read_csv(data_dir / "teachers.csv")
+    resources = pd.read_csv(data_dir / "resources.csv")
+    courses = pd.read_csv(data_dir / "courses.csv")
+    df = prepare_teachers(teachers, resources, courses)
+    return df[TEACHER_FEATURES].to_numpy(dtype=float), df["Score"].to_numpy(dtype=float)
+
+
+def sortie_par_defaut(modele, n_arbres):
+    return modele.with_name(f"{modele.stem}_{n_arbres}arbres{modele.suffix}")
+
+
+def mettre_a_jour_manifeste(manifeste, modele, sortie, model):
+    """Deplace sur sortie l'entree du manifeste qui sert modele (JSON ou jumeau .npz); None si aucune"""
+    if not manifeste.exists():
+        return None
+    source = modele.resolve().with_suffix(".json")
+    noms = [nom for nom, entree in manifeste.entries().items() if entree.path.resolve().with_suffix(".json") == source]
+    if not noms:
+        return None
+    entrees = refresh(manifeste, paths={nom: sortie for nom in noms})
+    for nom in noms:
+        entrees[nom].check_model(model)
+    manifeste.write(entrees)
+    return noms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modele", required=True, type=Path, help="JSON du modele a etendre")
+    parser.add_argument("--classe", choices=sorted(CLASSES), default="gb")
+    parser.add_argument("--n-trees", type=int, default=5, help="nombre d'arbres a ajouter")
+    parser.add_argument("--donnees", default=str(ROOT / "Datasets"), help="dossier des CSV")
+    parser.add_argument("--sortie", type=Path, default=None,
+                        help="fichier de sortie (par defaut: <modele>_<n>arbres.json, jamais ecrase)")
+    parser.add_argument("--manifeste", type=Path, default=None, help="par defaut: Artifacts/manifest.json")
+    parser.add_argument("--sans-manifeste", action="store_true", help="ne pas mettre a jour le manifeste")
+    args = parser.parse_args()
+
+    model = CLASSES[args.classe].load(str(args.modele))
+    n_avant = len(model.forest)
+    sortie = args.sortie or sortie_par_defaut(args.modele, n_avant + args.n_trees)
+    if args.sortie is None and sortie.exists():
+        sys.exit(f"{sortie} existe déjà: choisir un autre fichier avec --sortie")
+    X, y = charger_donnees(Path(args.donnees))
+
+    t0 = time.perf_counter()
+    model.continuer(X, y, args.n_trees)
+    duree = time.perf_counter() - t0
+    model.save(str(sortie))
+
+    print(f"Donnees: {len(X)} lignes, {X.shape[1]} features")
+    print(f"Arbres: {n_avant} -> {len(model.forest)} en {duree:.2f} s, R2 {model.score(X, y):.5f}")
+    print(f"Sauvegarde: {sortie}")
+
+    if not args.sans_manifeste:
+        manifeste = Manifest(args.manifeste)
+        noms = mettre_a_jour_manifeste(manifeste, args.modele, sortie, model)
+        if noms:
+            print(f"Manifeste mis à jour ({', '.join(noms)} -> {sortie.name}): {manifeste.path}")
+        else:
+            print(f"{args.modele} n'est pas servi par le manifeste: non modifié")
+
+
+if __name__ == "__main__":
+    main()
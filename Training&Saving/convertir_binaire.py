@@ -0,0 +1,166 @@
+"""
+Conversion des modeles sauvegardes en JSON vers le format binaire .npz.
+
+Pour chaque JSON de Artifacts/ et Artifacts/meilleurs models/ (ou des fichiers
+donnes), reconnait la classe du modele a ses cles, le charge, l'ecrit a cote au
+format binaire (meme nom, extension .npz, voir Models/format_binaire.py) puis
+recharge le .npz et verifie que les predictions sont identiques. Affiche les
+tailles et les temps de chargement JSON / binaire. Le serveur (model_registry)
+utilise ensuite le .npz a la place du JSON tant qu'il n'est pas plus ancien.
+Les JSON de regression logistique (pas de format binaire) sont ignores.
+
+Les statistiques d'entrainement des noeuds (gain, n_echantillons, variance...)
+ne sont pas conservees: seuls les champs utilises par predict le sont.
+
+Usage:
+    python "Training&Saving/convertir_binaire.py"
+    python "Training&Saving/convertir_binaire.py" --classe dtc Artifacts/model_decision_tree_classification.json
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "Models"))
+sys.path.insert(0, str(ROOT / "Models" / "optimisation des ressources"))
+sys.path.insert(0, str(ROOT / "Models" / "prediction performance"))
+sys.path.insert(0, str(ROOT / "Models" / "explication des performances"))
+
+from DecisionTreeRegressor import decisionTreeRegressor
+from GradientBoostingRegressor import GradientBoostingRegressor
+from XGBoostRegressor import XGBoostRegressor
+from RandomForestRegressor import RandomForestRegressor
+from Decision_Tree_Classification import DecisionTreeClassification
+from Random_Forest_Classification import RandomForestClassification
+from Decision_Tree_Regression import ArbreRegression
+from gradientBoosting_model import ENSPD_GradientBoosting_Pure
+from DBSCAN import DBSCAN
+from description_arbres import decrire, donnees_verification
+from node_table import TableNoeuds
+
+CLASSES = {
+    "dtr": decisionTreeRegressor,
+    "gb": GradientBoostingRegressor,
+    "xgb": XGBoostRegressor,
+    "rfr": RandomForestRegressor,
+    "dtc": DecisionTreeClassification,
+    "rfc": RandomForestClassification,
+    "ar": ArbreRegression,
+    "enspd": ENSPD_GradientBoosting_Pure,
+    "dbscan": DBSCAN,
+}
+DOSSIERS = [ROOT / "Artifacts", ROOT / "Artifacts" / "meilleurs models"]
+
+
+def detecter(donnees):
+    """Cle de CLASSES correspondant aux cles d'un JSON de modele"""
+    cles = set(donnees)
+    if "racine" in cles:
+        return "dtc"
+    if "forest" in cles:
+        if "nb_arbre" in cles:
+            return "rfc"
+        if "init" in cles:
+            return "xgb" if "reg_lambda" in cles else "gb"
+        return "rfr"
+    if "arbre" in cles:
+        return "ar"
+    if "arbres" in cles and "moyenne_initiale" in cles:
+        return "enspd"
+    if "weights" in cles:
+        return "reglog"
+    if "eps" in cles:
+        return "dbscan"
+    if "root" in cles or {"feature", "threshold", "left", "right"} <= cles:
+        return "dtr"  # format preordre (codec_arbres) ou ancien arbre imbrique
+    raise ValueError(f"Classe de modèle non reconnue (clés: {sorted(cles)})")
+
+
+def charger_json(cle, chemin, donnees):
+    if cle == "enspd":  # pas de methode load: attributs de save()
+        modele = ENSPD_GradientBoosting_Pure(n_arbres=len(donnees["arbres"]), lr=donnees["lr"])
+        modele.moyenne_initiale = donnees["moyenne_initiale"]
+        modele.arbres = donnees["arbres"]
+        return modele
+    # load est une classmethod qui retourne le modele pour certaines classes,
+    # une methode qui remplit l'instance (et retourne self) pour les autres
+    modele = CLASSES[cle]()
+    charge = modele.load(str(chemin))
+    return charge if charge is not None else modele
+
+
+def verifier(cle, reference, binaire):
+    """Leve ValueError si le modele binaire ne predit pas exactement comme le modele JSON (DBSCAN: memes labels et points)"""
+    if cle == "dbscan":  # points stockes en float32
+        identiques = (np.array_equal(np.asarray(reference.labels_), binaire.labels_)
+                      and np.array_equal(np.asarray(reference.X_, dtype=np.float32), binaire.X_))
+    else:
+        arbres, lire, _, _, _ = decrire(reference)
+        X = donnees_verification([TableNoeuds.depuis_arbre(a, lire) for a in arbres], voisins_exacts=True)
+        largeur = max(X.shape[1], getattr(reference, "n_features", 0) or 0)
+        X = np.pad(X, ((0, 0), (0, largeur - X.shape[1])))
+        identiques = np.array_equal(np.asarray(reference.predict(X), dtype=float),
+                                    np.asarray(binaire.predict(X), dtype=float), equal_nan=True)
+        if identiques and hasattr(reference, "predict_proba"):
+            identiques = np.array_equal(reference.predict_proba(X), binaire.predict_proba(X), equal_nan=True)
+    if not identiques:
+        raise ValueError("Prédictions différentes après conversion.")
+
+
+def chronometrer(charger, repetitions=5):
+    # meilleur temps sur quelques chargements (ms)
+    meilleur = np.inf
+    for _ in range(repetitions):
+        t0 = time.perf_counter()
+        charger()
+        meilleur = min(meilleur, time.perf_counter() - t0)
+    return 1000 * meilleur
+
+
+def convertir(chemin, cle=None):
+    with open(chemin, "r", encoding="utf-8") as f:
+        donnees = json.load(f)
+    cle = cle or detecter(donnees)
+    nom = chemin.relative_to(ROOT) if chemin.is_relative_to(ROOT) else chemin
+    if cle == "reglog":
+        # RegressionLogistique n'a pas de save_binary / load_binary: son JSON reste l'artefact
+        print(f"{nom} [reglog]: ignore (pas de format binaire)")
+        return
+    sortie = chemin.with_suffix(".npz")
+    reference = charger_json(cle, chemin, donnees)
+    reference.save_binary(str(sortie))
+    binaire = CLASSES[cle].load_binary(str(sortie))
+    verifier(cle, reference, binaire)
+    duree_json = chronometrer(lambda: charger_json(cle, chemin, json.load(open(chemin, "r", encoding="utf-8"))))
+    duree_binaire = chronometrer(lambda: CLASSES[cle].load_binary(str(sortie)))
+    print(f"{nom} [{cle}]: "
+          f"{chemin.stat().st_size / 1024:.0f} Ko -> {sortie.stat().st_size / 1024:.0f} Ko, "
+          f"chargement {duree_json:.1f} ms -> {duree_binaire:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("fichiers", nargs="*", type=Path,
+                        help="JSON a convertir (par defaut: Artifacts/ et Artifacts/meilleurs models/)")
+    parser.add_argument("--classe", choices=sorted(CLASSES), default=None,
+                        help="classe du modele (par defaut: reconnue aux cles du JSON)")
+    args = parser.parse_args()
+
+    # manifest.json (empreintes des artefacts, voir App/ml_utils/manifest.py) n'est pas un modele
+    fichiers = args.fichiers or sorted(p for dossier in DOSSIERS for p in dossier.glob("*.json") if p.name != "manifest.json")
+    echecs = 0
+    for chemin in fichiers:
+        try:
+            convertir(chemin.resolve(), args.classe)
+        except (ValueError, KeyError, TypeError) as e:
+            echecs += 1
+            print(f"{chemin}: non converti ({e})")
+    sys.exit(1 if echecs else 0)
+
+
+if __name__ == "__main__":
+    main()
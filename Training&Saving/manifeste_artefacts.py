@@ -0,0 +1,62 @@
+"""
+Mise a jour du manifeste des artefacts (Artifacts/manifest.json).
+
+Recalcule le chemin, le format et le sha256 de chaque modele servi par
+l'application (App/ml_utils/manifest.py) a partir des fichiers presents, puis
+charge chaque modele pour verifier sa classe et ses features (les colonnes que
+construit l'application, dans l'ordre) avant d'ecrire le manifeste. A lancer apres chaque deploiement d'un artefact
+re-entraine ou converti (convertir_binaire.py): le serveur refuse un artefact
+dont le hash ne correspond pas au manifeste.
+
+Usage:
+    python "Training&Saving/manifeste_artefacts.py"
+    python "Training&Saving/manifeste_artefacts.py" --json      # ignorer les jumeaux binaires .npz
+    python "Training&Saving/manifeste_artefacts.py" --verifier  # controle seul, sans ecrire
+"""
+import argparse
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "App"))
+
+from ml_utils.dbscan_analyzer import load_dbscan_model
+from ml_utils.manifest import Manifest, refresh
+from ml_utils.model_registry import _file_hash
+from ml_utils.predictor import load_room_model, load_teacher_model
+
+CHARGEURS = {"rooms": load_room_model, "teachers": load_teacher_model, "dbscan": load_dbscan_model}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--manifeste", type=Path, default=None, help="par defaut: Artifacts/manifest.json")
+    parser.add_argument("--json", action="store_true", help="pointer sur les JSON meme si un .npz a jour existe")
+    parser.add_argument("--verifier", action="store_true", help="verifier le manifeste existant sans l'ecrire")
+    args = parser.parse_args()
+
+    manifeste = Manifest(args.manifeste)
+    entrees = manifeste.entries() if args.verifier else refresh(manifeste, prefer_binary=not args.json)
+    echecs = 0
+    for nom, entree in sorted(entrees.items()):
+        try:
+            if args.verifier and _file_hash(entree.path) != entree.sha256:
+                raise ValueError("sha256 différent du manifeste")
+            modele = CHARGEURS[nom](str(entree.path)) if nom in CHARGEURS else None
+            if modele is None:
+                raise ValueError("chargement impossible")
+            entree.check_model(modele)
+            print(f"{nom}: {entree.model_class} {entree.path.relative_to(manifeste.path.parent)} "
+                  f"[{entree.format}] {entree.sha256[:12]} ({len(entree.features)} features)")
+        except (ValueError, KeyError, OSError) as e:
+            echecs += 1
+            print(f"{nom}: invalide ({e})")
+    if echecs:
+        sys.exit(1)
+    if not args.verifier:
+        manifeste.write(entrees)
+        print(f"Manifeste écrit: {manifeste.path}")
+
+
+if __name__ == "__main__":
+    main()
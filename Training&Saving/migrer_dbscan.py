@@ -0,0 +1,116 @@
+"""
+Migration du modele DBSCAN JSON vers le format binaire compact.
+
+Charge Artifacts/meilleurs models/DBSCAN.json (ou le fichier donne), calcule le
+resume des clusters (masque des points coeurs, effectifs, centres et bornes de
+chaque cluster) puis ecrit DBSCAN.npz a cote: points en float32, labels dans le
+plus petit type entier suffisant (voir DBSCAN.save_binary). Le .npz est
+recharge et compare au JSON: memes labels, memes points (en float32) et memes
+predictions sur les points d'entrainement.
+
+Avec --echelle N, mesure aussi les temps de chargement JSON / binaire d'un jeu
+de reference synthetique de N points (copies bruitees des points du modele,
+qui gardent leur label et leur statut de point coeur), sans toucher aux
+artefacts.
+
+Apres migration, rafraichir le manifeste pour que le serveur serve le .npz:
+    python "Training&Saving/manifeste_artefacts.py"
+
+Usage:
+    python "Training&Saving/migrer_dbscan.py"
+    python "Training&Saving/migrer_dbscan.py" --echelle 100000
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "Models" / "explication des performances"))
+
+from DBSCAN import DBSCAN
+
+MODELE = ROOT / "Artifacts" / "meilleurs models" / "DBSCAN.json"
+
+
+def charger_json(chemin):
+    modele = DBSCAN().load(str(chemin))
+    modele.X_ = np.asarray(modele.X_, dtype=float)
+    modele.labels_ = np.asarray(modele.labels_, dtype=int)
+    return modele
+
+
+def verifier(reference, binaire):
+    """Leve ValueError si le modele binaire differe du modele JSON"""
+    if not np.array_equal(reference.labels_, binaire.labels_):
+        raise ValueError("Labels différents après migration.")
+    if not np.array_equal(reference.X_.astype(np.float32), binaire.X_):
+        raise ValueError("Points différents après migration.")
+    if not np.array_equal(reference.predict(reference.X_), binaire.predict(reference.X_)):
+        raise ValueError("Prédictions différentes après migration.")
+
+
+def chronometrer(charger, repetitions=3):
+    # meilleur temps sur quelques chargements (ms)
+    meilleur = np.inf
+    for _ in range(repetitions):
+        t0 = time.perf_counter()
+        charger()
+        meilleur = min(meilleur, time.perf_counter() - t0)
+    return 1000 * meilleur
+
+
+def echelle(reference, n, graine=0):
+    """Temps de chargement JSON / binaire d'un modele synthetique de n points"""
+    rng = np.random.default_rng(graine)
+    source = rng.integers(0, len(reference.X_), size=n)
+    modele = DBSCAN(eps=reference.eps, min_points=reference.min_points)
+    modele.X_ = reference.X_[source] + rng.normal(scale=0.01, size=(n, reference.X_.shape[1]))
+    modele.labels_ = reference.labels_[source]
+    # statut de point coeur recopie: le recalcul exact est quadratique en n
+    modele.resumer_clusters(core_mask=reference.core_mask_[source])
+
+    with tempfile.TemporaryDirectory() as dossier:
+        chemin_json, chemin_npz = Path(dossier) / "DBSCAN.json", Path(dossier) / "DBSCAN.npz"
+        modele.save(str(chemin_json))
+        modele.save_binary(str(chemin_npz))
+        duree_json = chronometrer(lambda: charger_json(chemin_json))
+        duree_binaire = chronometrer(lambda: DBSCAN.load_binary(str(chemin_npz)))
+        print(f"{n} points: {chemin_json.stat().st_size / 2**20:.1f} Mo -> {chemin_npz.stat().st_size / 2**20:.1f} Mo, "
+              f"chargement {duree_json:.1f} ms -> {duree_binaire:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("modele", nargs="?", type=Path, default=MODELE, help="JSON du modele DBSCAN")
+    parser.add_argument("--sortie", type=Path, default=None, help="fichier .npz (par defaut: a cote du JSON)")
+    parser.add_argument("--echelle", type=int, default=None,
+                        help="mesurer aussi le chargement d'un jeu synthetique de N points")
+    args = parser.parse_args()
+
+    sortie = args.sortie or args.modele.with_suffix(".npz")
+    reference = charger_json(args.modele)
+    reference.save_binary(str(sortie))
+    binaire = DBSCAN.load_binary(str(sortie))
+    try:
+        verifier(reference, binaire)
+    except ValueError as e:
+        sortie.unlink()
+        print(f"{args.modele}: non migré ({e})")
+        sys.exit(1)
+
+    n_clusters = len(binaire.cluster_sizes_)
+    print(f"{args.modele.name} -> {sortie.name}: {len(binaire.X_)} points, {n_clusters} clusters, "
+          f"{int(np.count_nonzero(binaire.core_mask_))} points coeurs, labels en {binaire.labels_.dtype}, "
+          f"{args.modele.stat().st_size / 1024:.1f} Ko -> {sortie.stat().st_size / 1024:.1f} Ko")
+    print('Rafraîchir le manifeste: python "Training&Saving/manifeste_artefacts.py"')
+
+    if args.echelle:
+        echelle(reference, args.echelle)
+
+
+if __name__ == "__main__":
+    main()
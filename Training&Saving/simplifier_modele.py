@@ -0,0 +1,73 @@
+"""
+Simplification d'un modele a arbres deja sauvegarde, sans re-entrainement.
+
+Charge le JSON du modele, fusionne les sous-arbres dont toutes les feuilles
+predisent la meme valeur, supprime les branches inaccessibles compte tenu des
+seuils des ancetres (Models/tree_simplifier.py), affiche le nombre de noeuds et
+la profondeur retires puis sauvegarde le modele simplifie. Les predictions sont
+identiques.
+
+Usage:
+    python "Training&Saving/simplifier_modele.py" --classe dtr \
+        --modele "Artifacts/meilleurs models/decision_tree_class_model.json" --sortie arbre_simplifie.json
+    python "Training&Saving/simplifier_modele.py" --classe dtc --modele Artifacts/model_decision_tree_classification.json
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "Models"))
+sys.path.insert(0, str(ROOT / "Models" / "optimisation des ressources"))
+sys.path.insert(0, str(ROOT / "Models" / "prediction performance"))
+
+from DecisionTreeRegressor import decisionTreeRegressor
+from GradientBoostingRegressor import GradientBoostingRegressor
+from XGBoostRegressor import XGBoostRegressor
+from RandomForestRegressor import RandomForestRegressor
+from Decision_Tree_Classification import DecisionTreeClassification
+from Random_Forest_Classification import RandomForestClassification
+from Decision_Tree_Regression import ArbreRegression
+from tree_simplifier import simplifier
+
+CLASSES = {
+    "dtr": decisionTreeRegressor,
+    "gb": GradientBoostingRegressor,
+    "xgb": XGBoostRegressor,
+    "rfr": RandomForestRegressor,
+    "dtc": DecisionTreeClassification,
+    "rfc": RandomForestClassification,
+    "ar": ArbreRegression,
+}
+
+
+def charger(classe, chemin):
+    # load est une classmethod qui retourne le modele pour certaines classes,
+    # une methode qui remplit l'instance (et retourne self) pour les autres
+    model = classe()
+    charge = model.load(chemin)
+    return charge if charge is not None else model
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modele", required=True, help="JSON du modele a simplifier")
+    parser.add_argument("--classe", choices=sorted(CLASSES), required=True)
+    parser.add_argument("--sortie", default=None, help="fichier de sortie (par defaut: ecrase --modele)")
+    args = parser.parse_args()
+
+    model = charger(CLASSES[args.classe], args.modele)
+    t0 = time.perf_counter()
+    rapport = simplifier(model)
+    duree = time.perf_counter() - t0
+
+    print(f"Noeuds: {rapport['noeuds_avant']} -> {rapport['noeuds_apres']} "
+          f"({rapport['noeuds_supprimes']} supprimes: {rapport['fusions']} fusions, "
+          f"{rapport['branches_inaccessibles']} branches inaccessibles) en {duree:.2f} s")
+    print(f"Profondeur: {rapport['profondeur_avant']} -> {rapport['profondeur_apres']}")
+    model.save(args.sortie or args.modele)
+
+
+if __name__ == "__main__":
+    main()